@@ -0,0 +1,108 @@
+"""Bytes per record of DNSReccordNode/DomainNode on a scaled-up scan.
+
+Usage: python benchmarks/memory.py [--scale 1000]
+
+Every line of data/dnsr.out.jsonl and data/dns.out.jsonl is parsed `scale`
+times with a distinct host, and the traced allocation of the kept objects is
+compared against the previous plain `__dict__` classes.
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dns_reccord_node import DNSReccordNode  # noqa: E402
+from domain_node import DomainNode  # noqa: E402
+
+DATA = Path(__file__).resolve().parent.parent.parent / "data"
+
+
+class DictDNSReccordNode:
+    """The original `__dict__` based record, kept for comparison."""
+    def __init__(self, host, status_code, a, aaaa, mx, ns, txt, cname, soa, ptr, spf, dkim, dmarc, timestamp):
+        self.host = host
+        self.status_code = status_code
+        self.a = a
+        self.aaaa = aaaa
+        self.mx = mx
+        self.ns = ns
+        self.txt = txt
+        self.cname = cname
+        self.soa = soa
+        self.ptr = ptr
+        self.spf = spf
+        self.dkim = dkim
+        self.dmarc = dmarc
+        self.timestamp = timestamp
+
+
+class DictDomainNode:
+    def __init__(self, host, _input, source, is_implicit=False, is_root=False):
+        self.host = host
+        self.input = _input
+        self.source = source
+        self.is_implicit = is_implicit
+        self.is_root = False
+
+
+def _dict_dnsr(line: bytes):
+    data = json.loads(line)
+    return DictDNSReccordNode(
+        host=data['host'],
+        status_code=data.get('status_code'),
+        a=data.get('a', []),
+        aaaa=data.get('aaaa', []),
+        mx=data.get('mx', []),
+        ns=data.get('ns', []),
+        txt=data.get('txt', []),
+        cname=data.get('cname', []),
+        soa=data.get('soa', []),
+        ptr=data.get('ptr', []),
+        spf=data.get('spf', []),
+        dkim=data.get('dkim', []),
+        dmarc=data.get('dmarc', []),
+        timestamp=data.get('timestamp'),
+    )
+
+
+def _dict_domain(line: bytes):
+    data = json.loads(line)
+    return DictDomainNode(data['host'], data['input'], data['source'])
+
+
+def _scaled_lines(path: Path, scale: int):
+    lines = [line for line in path.read_bytes().splitlines() if line.strip()]
+    for i in range(scale):
+        prefix = b'"host":"n%d.' % i
+        for line in lines:
+            yield line.replace(b'"host":"', prefix, 1)
+
+
+def bytes_per_record(path: Path, scale: int, build) -> tuple[int, float]:
+    tracemalloc.start()
+    kept = [build(line) for line in _scaled_lines(path, scale)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(kept), size / len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000)
+    args = parser.parse_args()
+
+    cases = [
+        ("DNSReccordNode", DATA / "dnsr.out.jsonl", _dict_dnsr, DNSReccordNode.from_json_bytes),
+        ("DomainNode", DATA / "dns.out.jsonl", _dict_domain, DomainNode.from_json_bytes),
+    ]
+    for name, path, before, after in cases:
+        count, old = bytes_per_record(path, args.scale, before)
+        _, new = bytes_per_record(path, args.scale, after)
+        print(f"[i] {name}: {count} records, {old:.0f} -> {new:.0f} bytes/record ({1 - new / old:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
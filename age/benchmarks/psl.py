@@ -0,0 +1,72 @@
+"""Parent chain resolution: split/join per host vs the cached PSL trie.
+
+Usage: python benchmarks/psl.py [--hosts 10000000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dns_utils import get_parent_domain_naive  # noqa: E402
+from domain_node import DomainNode  # noqa: E402
+from psl import PublicSuffixList  # noqa: E402
+
+ROOTS = ["tesla.com", "bbc.co.uk", "example.com.au", "heise.de", "fefe.de", "city.kobe.jp", "pages.github.io"]
+WORDS = ["api", "stg", "prd", "www", "mail", "vpn", "cdn", "github", "akamai", "eu", "ap", "npm", "auth", "shop"]
+
+
+def synthetic_hosts(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(count):
+        root = rng.choice(ROOTS)
+        labels = [f"{rng.choice(WORDS)}{i % 997}"] + rng.sample(WORDS, rng.randint(0, 4))
+        yield ".".join(labels + [root]), root
+
+
+def naive_chains(pairs):
+    chains = []
+    for host, root in pairs:
+        chain = [host]
+        while host != root:
+            host = get_parent_domain_naive(host)
+            chain.append(host)
+        chains.append(chain)
+    return chains
+
+
+def implicit_node_chains(pairs):
+    return [[node.host for node in DomainNode(host, root, "bench").get_implicit_nodes()] for host, root in pairs]
+
+
+def timed(name, func, arg, count):
+    start = time.perf_counter()
+    result = func(arg)
+    elapsed = time.perf_counter() - start
+    rate = f"  {count / elapsed:12.0f} hosts/sec" if count > 1 else ""
+    print(f"[i] {name:<28} {elapsed:7.2f}s{rate}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    pairs = list(synthetic_hosts(args.hosts))
+    hosts = [host for host, _ in pairs]
+    psl = timed("load bundled PSL", lambda _: PublicSuffixList.load(), None, 1)
+
+    expected = timed("get_parent_domain_naive", naive_chains, pairs, args.hosts)
+    timed("DomainNode.get_implicit_nodes", implicit_node_chains, pairs, args.hosts)
+    chains = timed("psl.parent_chains", psl.parent_chains, hosts, args.hosts)
+    print(f"[i] {psl.cache_info()}")
+
+    mismatches = sum(1 for a, b in zip(expected, chains) if tuple(a) != b)
+    print(f"[i] chains differing from the input based split: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
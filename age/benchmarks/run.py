@@ -0,0 +1,119 @@
+"""Ingest and query benchmark with a throughput regression gate.
+
+Usage:
+    python benchmarks/run.py --hosts 1000 100000 --backend sqlite --out bench.json
+    python benchmarks/run.py --hosts 100000 --baseline bench.json --max-regression 10
+
+Each stage is timed per dataset size and reported as items/sec. With
+--baseline the run fails (exit 1) if any stage is more than
+--max-regression percent slower than in the baseline file.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dns_utils import eat_dns_file, eat_dnsr_file  # noqa: E402
+from domain_tree import DomainTree  # noqa: E402
+from graph_store import open_graph  # noqa: E402
+from synth import generate  # noqa: E402
+
+
+def timed(results: dict, stage: str, func):
+    start = time.perf_counter()
+    items = func()
+    seconds = time.perf_counter() - start
+    results[stage] = {"seconds": seconds, "items": items, "rate": items / seconds if seconds > 0 else 0.0}
+    print(f"[i] {stage:<18} {items:>10} items {seconds:8.2f}s {results[stage]['rate']:12.0f}/sec")
+
+
+def open_backend(backend: str, workdir: Path):
+    if backend == "sqlite":
+        return open_graph("sqlite", path=str(workdir / "bench.sqlite"))
+    return open_graph(backend)
+
+
+def bench_size(hosts: int, backend: str, workdir: Path, workers) -> dict:
+    dns_path, dnsr_path = generate(workdir, hosts)
+    results = {}
+    print(f"--- {hosts} hosts, backend {backend}")
+
+    timed(results, "parse_dns", lambda: sum(1 for _ in eat_dns_file(str(dns_path), workers=workers)))
+    timed(results, "parse_dnsr", lambda: sum(1 for _ in eat_dnsr_file(str(dnsr_path), workers=workers)))
+    timed(results, "implicit_chains",
+          lambda: sum(len(domain.get_implicit_nodes()) for domain in eat_dns_file(str(dns_path), workers=workers)))
+
+    def build_tree():
+        tree = DomainTree()
+        tree.add_all(eat_dns_file(str(dns_path), workers=workers))
+        return len(tree)
+    timed(results, "domain_tree", build_tree)
+
+    graph = open_backend(backend, workdir)
+    try:
+        graph.reset()
+        graph.ensure_schema()
+        timed(results, "write_domains", lambda: sum(graph.sync_domain_nodes(eat_dns_file(str(dns_path), workers=workers))))
+        timed(results, "write_dnsr", lambda: graph.sync_dnsr_nodes(eat_dnsr_file(str(dnsr_path), workers=workers)))
+        # counted in queries, the row counts are reported by the dump
+        timed(results, "count", lambda: len([graph.count_domain_node(), graph.count_domain_relationships()]))
+        timed(results, "dump_domains", lambda: len(graph.dump_domains_host()))
+    finally:
+        graph.close()
+    return results
+
+
+def check_regressions(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    failures = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            before = baseline.get("results", {}).get(size, {}).get(stage)
+            if not before or not before["rate"]:
+                continue
+            drop = 100.0 * (1 - current["rate"] / before["rate"])
+            if drop > max_regression:
+                failures.append(f"{size} hosts {stage}: {before['rate']:.0f}/sec -> {current['rate']:.0f}/sec (-{drop:.1f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "age"])
+    parser.add_argument("--workdir", type=Path, default=Path(tempfile.gettempdir()) / "graph_py_bench")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes, default: auto")
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="allowed throughput drop in percent")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {str(hosts): bench_size(hosts, args.backend, args.workdir, args.workers) for hosts in args.hosts},
+    }
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"[+] Results written to {args.out}")
+
+    if args.baseline:
+        failures = check_regressions(report["results"], json.loads(args.baseline.read_text()), args.max_regression)
+        for failure in failures:
+            print(f"[-] Regression: {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"[i] No stage regressed by more than {args.max_regression}%")
+
+
+if __name__ == "__main__":
+    main()
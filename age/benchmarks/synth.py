@@ -0,0 +1,98 @@
+"""Synthetic subfinder/dnsx output shaped like data/dns.out.jsonl and dnsr.out.jsonl.
+
+Usage: python benchmarks/synth.py --hosts 1000000 --out /tmp/bench
+
+Labels are drawn from the sample scan, depth is geometric (most hosts sit
+directly under the root, a few are 4-6 levels deep) and new hosts prefer
+popular parents, which gives the long-tailed fan-out of real scans.
+"""
+import argparse
+import json
+import random
+from collections import deque
+from pathlib import Path
+
+DATA = Path(__file__).resolve().parent.parent.parent / "data"
+MAX_PARENTS = 100_000
+SOURCES = ["anubis", "alienvault", "crtsh", "hackertarget", "rapiddns", "digitorus"]
+
+
+def _sample_labels() -> list[str]:
+    labels = set()
+    with open(DATA / "dns.out.jsonl", "rb") as f:
+        for line in f:
+            host, root = (json.loads(line)[key] for key in ("host", "input"))
+            labels.update(host[:-len(root) - 1].split("."))
+    labels.discard("")
+    return sorted(labels)
+
+
+def _sample_dnsr() -> list[dict]:
+    with open(DATA / "dnsr.out.jsonl", "rb") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def generate(out: Path, hosts: int, roots: int = 10, seed: int = 1) -> tuple[Path, Path]:
+    """Write `hosts` subfinder lines plus one dnsx record per distinct host.
+
+    Only a bounded window of recent hosts and parents is kept, so 10^7 hosts
+    generate in constant memory. Files are named after all the parameters
+    and reused by later calls with the same ones.
+    """
+    out.mkdir(parents=True, exist_ok=True)
+    name = f"{hosts}.r{roots}.s{seed}.jsonl"
+    dns_path, dnsr_path = out / f"dns.{name}", out / f"dnsr.{name}"
+    if dns_path.exists() and dnsr_path.exists():
+        return dns_path, dnsr_path
+
+    rng = random.Random(seed)
+    labels = _sample_labels()
+    templates = _sample_dnsr()
+    root_names = [f"org{i}.com" for i in range(roots)]
+    parents = [(root, root) for root in root_names]
+    recent = deque(maxlen=10000)
+
+    # written under temporary names, so an interrupted run is never reused
+    dns_tmp, dnsr_tmp = dns_path.with_suffix(".tmp"), dnsr_path.with_suffix(".tmp")
+    with open(dns_tmp, "w") as dns, open(dnsr_tmp, "w") as dnsr:
+        for i in range(hosts):
+            # duplicates, as subfinder reports hosts once per source
+            if recent and rng.random() < 0.1:
+                host, root = rng.choice(recent)
+            else:
+                if rng.random() < 0.3:
+                    parent, root = parents[min(int(rng.paretovariate(0.5)) - 1, len(parents) - 1)]
+                else:
+                    parent = root = rng.choice(root_names)
+                host = f"{rng.choice(labels)}{i}.{parent}"
+                recent.append((host, root))
+                if rng.random() < 0.2:
+                    if len(parents) < MAX_PARENTS:
+                        parents.append((host, root))
+                    else:
+                        parents[rng.randrange(roots, MAX_PARENTS)] = (host, root)
+
+                record = dict(rng.choice(templates))
+                record["host"] = host
+                if "a" in record:
+                    record["a"] = [f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"]
+                dnsr.write(json.dumps(record) + "\n")
+            dns.write(json.dumps({"host": host, "input": root, "source": rng.choice(SOURCES)}) + "\n")
+    dnsr_tmp.replace(dnsr_path)
+    dns_tmp.replace(dns_path)
+    return dns_path, dnsr_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--out", type=Path, default=Path("/tmp/graph_py_bench"))
+    parser.add_argument("--roots", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for path in generate(args.out, args.hosts, roots=args.roots, seed=args.seed):
+        print(f"[+] {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import logging
+import os
+from dataclasses import dataclass, asdict
+
+log = logging.getLogger(__name__)
+
+# columns of the ingest_checkpoint table, in insert order
+CHECKPOINT_COLUMNS = ("name", "path", "size", "inode", "offset", "lines", "malformed", "records")
+
+
+@dataclass
+class Checkpoint:
+    """How far the ingest `name` got in `path`.
+
+    The readers advance it after every record they hand out, and the graph
+    backends store it in the same transaction as each committed batch, so
+    the stored offset never runs ahead of the data in the graph.
+    """
+    name: str
+    path: str
+    size: int
+    inode: int
+    offset: int = 0
+    lines: int = 0
+    malformed: int = 0
+    records: int = 0
+
+    @classmethod
+    def for_file(cls, name: str, path: str) -> "Checkpoint":
+        st = os.stat(path)
+        return cls(name=name, path=os.path.abspath(path), size=st.st_size, inode=st.st_ino)
+
+    def same_file(self, other: "Checkpoint") -> bool:
+        """True if `other` is this file, unchanged or only appended to since."""
+        return self.inode == other.inode and self.path == other.path and other.size >= self.offset
+
+    def advance(self, offset: int, stats: dict):
+        self.offset = offset
+        self.records += 1
+        self.lines = stats["lines"]
+        self.malformed = stats["malformed"]
+
+    def row(self) -> tuple:
+        values = asdict(self)
+        return tuple(values[column] for column in CHECKPOINT_COLUMNS)
+
+
+def open_checkpoint(store, name: str, path: str, resume: bool = False) -> Checkpoint:
+    """A checkpoint for ingesting `path`, continuing the stored one when `resume` is set and it still fits."""
+    checkpoint = Checkpoint.for_file(name, path)
+    if not resume:
+        return checkpoint
+    saved = store.load_checkpoint(name)
+    if saved is None or not saved.same_file(checkpoint):
+        log.warning("[-] No usable checkpoint for %s, reading %s from the start", name, path)
+        return checkpoint
+    checkpoint.offset = saved.offset
+    checkpoint.lines = saved.lines
+    checkpoint.malformed = saved.malformed
+    checkpoint.records = saved.records
+    log.info("[i] Resuming %s at byte %d of %d (%d records done)",
+             name, checkpoint.offset, checkpoint.size, checkpoint.records)
+    return checkpoint
@@ -1,23 +1,73 @@
+import sys
+from jsonl_reader import loads
+
+# shared by every record that has no values of a given type
+EMPTY = ()
+
+_RECORD_TYPES = ("a", "aaaa", "mx", "ns", "txt", "cname", "soa", "ptr", "spf", "dkim", "dmarc")
+
+
+# identical SOA answers repeat across every host of a zone, share one copy
+_SOA_CACHE = {}
+_SOA_CACHE_SIZE = 65536
+
+
+def _values(values) -> tuple:
+    return tuple(values) if values else EMPTY
+
+
+def _names(values) -> tuple:
+    return tuple(map(sys.intern, values)) if values else EMPTY
+
+
+def _soa(values) -> tuple:
+    if not values:
+        return EMPTY
+    shared = []
+    for soa in values:
+        if not isinstance(soa, dict):
+            shared.append(soa)
+            continue
+        key = tuple(soa.items())
+        cached = _SOA_CACHE.get(key)
+        if cached is None:
+            if len(_SOA_CACHE) >= _SOA_CACHE_SIZE:
+                _SOA_CACHE.clear()
+            cached = _SOA_CACHE[key] = soa
+        shared.append(cached)
+    return tuple(shared)
+
+
 class DNSReccordNode:
-    def __init__(self, host: str, status_code: int, a: list[str], aaaa: list[str], 
+    __slots__ = ("host", "status_code") + _RECORD_TYPES + ("timestamp",)
+
+    def __init__(self, host: str, status_code: str, a: list[str], aaaa: list[str], 
                  mx: list[str], ns: list[str], txt: list[str], cname: list[str], 
                  soa: list[str], ptr: list[str], spf: list[str], dkim: list[str], 
                  dmarc: list[str], timestamp: str):
         self.host = host
-        self.status_code = status_code
-        self.a = a
-        self.aaaa = aaaa
-        self.mx = mx
-        self.ns = ns
-        self.txt = txt
-        self.cname = cname
-        self.soa = soa
-        self.ptr = ptr
-        self.spf = spf
-        self.dkim = dkim
-        self.dmarc = dmarc
+        self.status_code = sys.intern(status_code) if isinstance(status_code, str) else status_code
+        self.a = _values(a)
+        self.aaaa = _values(aaaa)
+        self.mx = _names(mx)
+        self.ns = _names(ns)
+        self.txt = _values(txt)
+        self.cname = _names(cname)
+        self.soa = _soa(soa)
+        self.ptr = _values(ptr)
+        self.spf = _values(spf)
+        self.dkim = _values(dkim)
+        self.dmarc = _values(dmarc)
         self.timestamp = timestamp
 
+    @classmethod
+    def from_json_bytes(cls, line: bytes):
+        data = loads(line)
+        get = data.get
+        return cls(data['host'], get('status_code'),
+                   *(get(record_type) for record_type in _RECORD_TYPES),
+                   get('timestamp'))
+
     def __repr__(self):
         return (
             f"DNSReccordNode("
@@ -34,6 +84,5 @@ class DNSReccordNode:
             f"spf={self.spf}, "
             f"dkim={self.dkim}, "
             f"dmarc={self.dmarc}, "
-            f"timestamp={self.timestamp}, "
+            f"timestamp={self.timestamp})"
         )
-
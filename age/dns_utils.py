@@ -1,8 +1,11 @@
-import json
+import logging
 from itertools import islice
+from jsonl_reader import iter_records, loads
 from domain_node import DomainNode
 from dns_reccord_node import DNSReccordNode
 
+log = logging.getLogger(__name__)
+
 def get_parent_domain_naive(domain: str) -> str:
     """Get the immediate parent domain by removing leftmost part.
     This function is naive, it does not handle multi levels TLDS
@@ -12,56 +15,80 @@ def get_parent_domain_naive(domain: str) -> str:
         raise ValueError(f"Domain {domain} has no parent")
     return '.'.join(parts[1:])
 
-def eat_dns_file(infile="../data/dns.out.jsonl", max=0):
-    with open(infile, 'r') as f:
-        lines = islice(f, max) if max > 0 else f
-        for line in lines:
-            try:
-                data = json.loads(line.strip())
-                yield DomainNode(data['host'], data['input'], data['source'])
-            except json.JSONDecodeError:
-                print(f"Error decoding JSON: {line}")
-            except KeyError as e:
-                print(f"Missing field {e} in line: {line.strip()}")
-
-
-def eat_dnsr_file(infile="../data/dnsr.out.jsonl", max=0):
-    with open(infile, 'r') as f:
-        lines = islice(f, max) if max > 0 else f
-        for line in lines:
-            try:
-                data = json.loads(line.strip())
-                # Create the main domain node with required host field
-                if 'host' not in data:
-                    print(f"Skipping record - no host field: {line.strip()}")
-                    continue
-                    
-                domain = DNSReccordNode(
-                    host=data['host'],
-                    status_code=data.get('status_code'),
-                    a=data.get('a', []),
-                    aaaa=data.get('aaaa', []),
-                    mx=data.get('mx', []),
-                    ns=data.get('ns', []),
-                    txt=data.get('txt', []),
-                    cname=data.get('cname', []),
-                    soa=data.get('soa', []),
-                    ptr=data.get('ptr', []),
-                    spf=data.get('spf', []),
-                    dkim=data.get('dkim', []),
-                    dmarc=data.get('dmarc', []),
-                    timestamp=data.get('timestamp')
-                )
-                
-                yield domain
-                
-            except json.JSONDecodeError:
-                print(f"Error decoding JSON: {line}")
+DEFAULT_DNS_FILE = "../data/dns.out.jsonl"
+DEFAULT_DNSR_FILE = "../data/dnsr.out.jsonl"
+
+DNSR_FIELDS = ("host", "status_code", "a", "aaaa", "mx", "ns", "txt", "cname",
+               "soa", "ptr", "spf", "dkim", "dmarc", "timestamp")
+_LIST_FIELDS = DNSR_FIELDS[2:-1]
+
+
+def parse_dns_line(line: bytes) -> tuple:
+    """Parse one subfinder JSONL line into a (host, input, source) tuple."""
+    data = loads(line)
+    return data['host'], data['input'], data['source']
+
+
+def parse_dnsr_line(line: bytes) -> tuple:
+    """Parse one dnsx JSONL line into a tuple ordered like DNSR_FIELDS."""
+    data = loads(line)
+    return (data['host'], data.get('status_code'),
+            *(data.get(field, []) for field in _LIST_FIELDS),
+            data.get('timestamp'))
+
+
+def _report_malformed(infile, stats):
+    if stats["malformed"]:
+        log.warning("[-] Skipped %d malformed of %d lines in %s", stats['malformed'], stats['lines'], infile)
+
+
+def _checkpointed(records, checkpoint, stats):
+    """Unwrap (offset, record) pairs, advancing `checkpoint` before each record is handed on."""
+    for offset, record in records:
+        checkpoint.advance(offset, stats)
+        yield record
+
+
+def _read(infile, parse_line, max, workers, stats, checkpoint):
+    if checkpoint is None:
+        records = iter_records(infile, parse_line, workers=1 if max > 0 else workers, stats=stats)
+    else:
+        stats.setdefault("lines", checkpoint.lines)
+        stats.setdefault("malformed", checkpoint.malformed)
+        records = _checkpointed(iter_records(infile, parse_line, workers=1 if max > 0 else workers, stats=stats,
+                                             start=checkpoint.offset, offsets=True), checkpoint, stats)
+    return islice(records, max) if max > 0 else records
+
+
+def eat_dns_file(infile=DEFAULT_DNS_FILE, max=0, workers=None, stats=None, checkpoint=None):
+    stats = {} if stats is None else stats
+    for host, _input, source in _read(infile, parse_dns_line, max, workers, stats, checkpoint):
+        yield DomainNode(host, _input, source)
+    _report_malformed(infile, stats)
+
+
+def eat_dnsr_file(infile=DEFAULT_DNSR_FILE, max=0, workers=None, stats=None, checkpoint=None):
+    stats = {} if stats is None else stats
+    for record in _read(infile, parse_dnsr_line, max, workers, stats, checkpoint):
+        yield DNSReccordNode(*record)
+    _report_malformed(infile, stats)
 
 def eat_dnsr_cmd(infile="../out/dns.txt", max=0) -> set[str]:
     with open(infile, 'r') as f:
         return {line.strip() for line in f}
 
-def output_domains(domains_text: list[str], filename: str = "../out/dns.txt"):
+def output_domains(domains_text, filename: str = "../out/dns.txt") -> int:
+    """Stream hosts to `filename`, one per line, skipping repeats of the previous host.
+
+    Graph hosts are unique already, so no set of everything seen is kept and
+    memory stays flat for any number of hosts. Returns the number of lines.
+    """
+    written = 0
+    previous = None
     with open(filename, "w") as f:
-        f.write("\n".join(set(domains_text))+"\n")
+        for host in domains_text:
+            if host != previous:
+                f.write(host + "\n")
+                written += 1
+                previous = host
+    return written
@@ -1,10 +1,22 @@
+import sys
+from jsonl_reader import loads
+
+
 class DomainNode:
+    __slots__ = ("host", "input", "source", "is_implicit", "is_root")
+
     def __init__(self, host, _input, source, is_implicit=False, is_root=False):
         self.host = host
-        self.input = _input
-        self.source = source
+        # input and source repeat on every line of a scan, keep one copy each
+        self.input = sys.intern(_input)
+        self.source = sys.intern(source)
         self.is_implicit = is_implicit
-        self.is_root = False
+        self.is_root = is_root
+
+    @classmethod
+    def from_json_bytes(cls, line: bytes):
+        data = loads(line)
+        return cls(data['host'], data['input'], data['source'])
 
     def get_implicit_nodes(self):
         parts = self.host.split('.')
@@ -36,4 +48,4 @@ class DomainNode:
             f"source={self.source}, "
             f"is_implicit={self.is_implicit}, "
             f"is_root={self.is_root})"
-        ) 
\ No newline at end of file
+        ) 
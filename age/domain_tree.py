@@ -0,0 +1,262 @@
+from array import array
+from domain_node import DomainNode
+from psl import registrable_domain
+
+_IN_GRAPH = 1   # node is part of an ingested chain (root or below)
+_EXPLICIT = 2   # host was reported by a scanner, not only implied
+_ROOT = 4       # host is the input/root domain of a scan
+_PENDING = 8    # node row is queued for the next drain()
+
+_LABEL_BITS = 32
+
+
+class DomainTree:
+    """Deduplicating in-memory domain hierarchy keyed by reversed labels.
+
+    Every distinct suffix is one integer node id. Per node state lives in
+    parallel arrays, the children of all nodes share one dict keyed by
+    `parent_id << 32 | label_id`, and labels and inputs are interned once in
+    a common string table. This keeps the cost per host to a few machine
+    words, so tens of millions of hosts fit in memory.
+
+    `add()` only queues what the graph does not have yet; `drain()` hands the
+    queued node rows and edges to the graph writer in the format of
+    `NetGraph._write_domain_batch`.
+    """
+    __slots__ = ("_strings", "_string_ids", "_source_names", "_source_ids",
+                 "_parent", "_label", "_flags", "_source", "_input", "_extra_sources", "_children",
+                 "_pending_nodes", "_pending_edges", "_size", "_version", "_view", "_detached")
+
+    def __init__(self):
+        self._strings = []
+        self._string_ids = {}
+        # sources are few, so they get their own small ids usable as bit positions
+        self._source_names = []
+        self._source_ids = {}
+        # node 0 is the synthetic root above all TLDs
+        self._parent = array("l", [-1])
+        self._label = array("l", [-1])
+        self._flags = array("B", [0])
+        self._source = array("l", [-1])
+        self._input = array("l", [-1])
+        self._extra_sources = {}
+        self._children = {}
+        self._pending_nodes = []
+        self._pending_edges = []
+        self._size = 0
+        # bumped whenever a node joins the graph or becomes a root, invalidates `_view`
+        self._version = 0
+        self._view = None
+        # in-graph nodes whose parent is not in the graph yet, by parent id
+        self._detached = {}
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _source_id(self, source: str) -> int:
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = len(self._source_names)
+            self._source_names.append(source)
+            self._source_ids[source] = source_id
+        return source_id
+
+    def _child(self, parent: int, label: str) -> int:
+        key = parent << _LABEL_BITS | self._intern(label)
+        node = self._children.get(key)
+        if node is None:
+            node = len(self._parent)
+            self._children[key] = node
+            self._parent.append(parent)
+            self._label.append(self._string_ids[label])
+            self._flags.append(0)
+            self._source.append(-1)
+            self._input.append(-1)
+        return node
+
+    def _find(self, host: str) -> int:
+        node = 0
+        for label in reversed(host.split('.')):
+            label_id = self._string_ids.get(label)
+            if label_id is None:
+                return -1
+            node = self._children.get(node << _LABEL_BITS | label_id, -1)
+            if node < 0:
+                return -1
+        return node
+
+    def host(self, node: int) -> str:
+        labels = []
+        while node > 0:
+            labels.append(self._strings[self._label[node]])
+            node = self._parent[node]
+        return '.'.join(labels)
+
+    def add(self, domain: DomainNode) -> bool:
+        """Insert a domain and its implicit parent chain.
+
+        Returns True if anything new (node, edge, source or explicit flag)
+        was queued for the graph.
+        """
+        host, root = domain.host, domain.input
+        if host != root and not host.endswith('.' + root):
+            # input does not cover the host, fall back to the PSL
+            root = registrable_domain(host) or host
+        labels = host.split('.')
+        root_depth = root.count('.') + 1
+        source_id = self._source_id(domain.source)
+        input_id = self._intern(domain.input)
+        queued = len(self._pending_nodes)
+
+        node = 0
+        for depth, label in enumerate(reversed(labels), start=1):
+            parent = node
+            node = self._child(node, label)
+            if depth < root_depth:
+                continue
+            flags = self._flags[node]
+            if not flags & _IN_GRAPH:
+                self._flags[node] = flags | _IN_GRAPH
+                self._input[node] = input_id
+                self._size += 1
+                self._version += 1
+                self._link(parent, node)
+                self._queue(node)
+            if depth == root_depth and not flags & _ROOT:
+                self._flags[node] |= _ROOT
+                self._version += 1
+                self._queue(node)
+
+        if domain.is_implicit:
+            # e.g. a parent row read back from the graph, only its chain is known
+            return len(self._pending_nodes) > queued
+        if not self._flags[node] & _EXPLICIT:
+            self._flags[node] |= _EXPLICIT
+            self._source[node] = source_id
+            self._queue(node)
+        elif self._source[node] != source_id:
+            known = self._extra_sources.get(node, 0)
+            if not known >> source_id & 1:
+                self._extra_sources[node] = known | 1 << source_id
+                return True
+
+        return len(self._pending_nodes) > queued
+
+    def _link(self, parent: int, node: int):
+        """Queue the edges of a node that just joined the graph.
+
+        Inputs can overlap, so either end may join first: the edge to the
+        parent is queued now if the parent is in the graph, else once it joins.
+        Only an input's root can wait, and only for a parent that can be an
+        input itself: public suffixes like `com` never join, and waiting on
+        them would keep one entry per root for the tree's lifetime.
+        """
+        if self._flags[parent] & _IN_GRAPH:
+            self._pending_edges.append(node)
+        elif parent > 0 and registrable_domain(self.host(parent)) is not None:
+            self._detached.setdefault(parent, []).append(node)
+        self._pending_edges.extend(self._detached.pop(node, ()))
+
+    def _queue(self, node: int):
+        if not self._flags[node] & _PENDING:
+            self._flags[node] |= _PENDING
+            self._pending_nodes.append(node)
+
+    def add_all(self, domains) -> int:
+        """Stream domains (e.g. `eat_dns_file()` output) into the tree."""
+        return sum(1 for domain in domains if self.add(domain))
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending_nodes)
+
+    def drain(self):
+        """Return and forget the queued node rows and (parent, child) edges."""
+        nodes = []
+        for node in self._pending_nodes:
+            flags = self._flags[node]
+            self._flags[node] = flags & ~_PENDING
+            explicit = bool(flags & _EXPLICIT)
+            nodes.append({
+                "host": self.host(node),
+                "source": self._source_names[self._source[node]] if explicit else "implicit",
+                "is_implicit": not explicit,
+                "is_root": bool(flags & _ROOT),
+                "input": self._strings[self._input[node]],
+            })
+        edges = [(self.host(self._parent[node]), self.host(node)) for node in self._pending_edges]
+        self._pending_nodes = []
+        self._pending_edges = []
+        return nodes, edges
+
+    def sources(self, host: str) -> set[str]:
+        """All sources that reported `host` explicitly."""
+        node = self._find(host)
+        if node < 0 or not self._flags[node] & _EXPLICIT:
+            return set()
+        found = {self._source_names[self._source[node]]}
+        mask = self._extra_sources.get(node, 0)
+        while mask:
+            bit = mask & -mask
+            found.add(self._source_names[bit.bit_length() - 1])
+            mask ^= bit
+        return found
+
+    def node(self, host: str) -> int:
+        """Node id of `host`, or -1 if the tree has never seen it."""
+        return self._find(host)
+
+    def _views(self):
+        """(child lists, subtree sizes, roots) of the graph part of the tree.
+
+        Built in one pass over all nodes on first use and rebuilt only after a
+        node joined the graph or became a root, so repeated walks (e.g. the
+        level of detail of a visualization) do not rescan the whole tree.
+        """
+        if self._view is None or self._view[0] != self._version:
+            flags, parent = self._flags, self._parent
+            lists = {}
+            for child in range(1, len(parent)):
+                if flags[child] & _IN_GRAPH:
+                    lists.setdefault(parent[child], []).append(child)
+            # children are always created after their parent, so one reverse
+            # pass over the node ids adds every subtree into its parent
+            sizes = array("l", (1 if node_flags & _IN_GRAPH else 0 for node_flags in flags))
+            for node in range(len(sizes) - 1, 0, -1):
+                sizes[parent[node]] += sizes[node]
+            roots = [node for node, node_flags in enumerate(flags) if node_flags & _ROOT]
+            self._view = (self._version, lists, sizes, roots)
+        return self._view[1:]
+
+    def roots(self) -> list[int]:
+        return list(self._views()[2])
+
+    def parent(self, node: int) -> int:
+        return self._parent[node]
+
+    def is_root(self, node: int) -> bool:
+        return bool(self._flags[node] & _ROOT)
+
+    def children(self, node: int) -> list[int]:
+        """Child node ids of `node` that are part of the graph."""
+        return list(self._views()[0].get(node, ()))
+
+    def subtree_size(self, node: int) -> int:
+        """Number of graph nodes in the subtree of `node`, itself included."""
+        return self._views()[1][node]
+
+    def subtree_sizes(self) -> array:
+        """`subtree_size` of every node, indexed by node id."""
+        return array("l", self._views()[1])
+
+    def __contains__(self, host: str) -> bool:
+        node = self._find(host)
+        return node > 0 and bool(self._flags[node] & _IN_GRAPH)
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,134 @@
+import logging
+import os
+import time
+from graph_store import DEFAULT_ITERSIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ROW_GROUP = 100_000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _schemas() -> dict:
+    """Table name -> (arrow schema, GraphStore iterator name)."""
+    labels = pa.dictionary(pa.int32(), pa.string())
+    values = pa.list_(pa.string())
+    return {
+        "domain": (pa.schema([
+            ("host", pa.string()),
+            ("source", labels),
+            ("input", labels),
+            ("is_implicit", pa.bool_()),
+            ("is_root", pa.bool_()),
+        ]), "iter_domain_rows"),
+        "has_subdomain": (pa.schema([("parent", pa.string()), ("child", pa.string())]), "iter_subdomain_edges"),
+        "dnsr": (pa.schema([
+            ("host", pa.string()),
+            ("status_code", labels),
+            ("timestamp", pa.string()),
+            ("a", values),
+            ("aaaa", values),
+            ("cname", values),
+        ]), "iter_dnsr_rows"),
+        "has_dnsr": (pa.schema([("domain", pa.string()), ("dnsr", pa.string())]), "iter_dnsr_edges"),
+    }
+
+
+class _Dictionary:
+    """One dictionary per column for a whole table, only ever appended to.
+
+    Every batch references the same growing dictionary, so the IPC writer
+    can emit the new values as deltas; a fresh `dictionary_encode()` per
+    batch would be a dictionary replacement, which IPC files do not allow.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def encode(self, values: list):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            index = self.ids.get(value)
+            if index is None:
+                index = self.ids[value] = len(self.values)
+                self.values.append(value)
+            indices.append(index)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def _record_batch(columns: list[list], schema, dictionaries: dict):
+    arrays = [dictionaries[field.name].encode(values) if field.name in dictionaries else pa.array(values, field.type)
+              for values, field in zip(columns, schema)]
+    return pa.record_batch(arrays, schema=schema)
+
+
+def _open_writer(path: str, schema, fmt: str):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+
+def export_table(rows, path: str, schema, fmt: str = "parquet", row_group: int = DEFAULT_ROW_GROUP) -> int:
+    """Write `rows` (tuples in schema order) to `path`, one row group per `row_group` rows.
+
+    Only one row group worth of column lists is held at a time.
+    """
+    writer = _open_writer(path, schema, fmt)
+    dictionaries = {field.name: _Dictionary() for field in schema if pa.types.is_dictionary(field.type)}
+    columns = [[] for _ in schema]
+    total = 0
+    try:
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+            if len(columns[0]) >= row_group:
+                writer.write_batch(_record_batch(columns, schema, dictionaries))
+                total += len(columns[0])
+                columns = [[] for _ in schema]
+        if columns[0] or total == 0:
+            writer.write_batch(_record_batch(columns, schema, dictionaries))
+            total += len(columns[0])
+    finally:
+        writer.close()
+    return total
+
+
+def _coerce(rows, schema):
+    # AGE hands back ints for NO_RETURN timestamps and None for missing flags
+    casts = [str if field.type == pa.string() and field.name == "timestamp" else
+             bool if field.type == pa.bool_() else None for field in schema]
+    for row in rows:
+        yield tuple(value if cast is None or value is None else cast(value)
+                    for cast, value in zip(casts, row))
+
+
+def export_graph(graph, out_dir: str = "../out/export", fmt: str = "parquet",
+                 row_group: int = DEFAULT_ROW_GROUP, itersize: int = DEFAULT_ITERSIZE) -> dict:
+    """Export Domain/DNSReccord nodes and HAS_SUBDOMAIN/HAS_DNSR edges as columnar files.
+
+    Writes one `<table>.parquet` (or `.arrow` IPC file) per table into
+    `out_dir` and returns {table: rows}. Rows are streamed from the store's
+    server-side cursors, so memory is bounded by `row_group`.
+    """
+    if pa is None:
+        raise RuntimeError("export needs pyarrow: pip install pyarrow")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    for table, (schema, iterator) in _schemas().items():
+        start = time.perf_counter()
+        path = os.path.join(out_dir, table + FORMATS[fmt])
+        rows = _coerce(getattr(graph, iterator)(itersize), schema)
+        counts[table] = export_table(rows, path, schema, fmt, row_group)
+        log.info("[+] Exported %d rows to %s in %.2fs", counts[table], path, time.perf_counter() - start)
+    return counts
@@ -0,0 +1,188 @@
+import logging
+import os
+import time
+from checkpoint import Checkpoint, open_checkpoint
+from dns_reccord_node import DNSReccordNode
+from dns_utils import parse_dns_line, parse_dnsr_line, DEFAULT_DNS_FILE, DEFAULT_DNSR_FILE
+from domain_node import DomainNode
+from domain_tree import DomainTree
+from graph_store import DEFAULT_BATCH_SIZE
+from jsonl_reader import parse_lines_with_offsets
+
+log = logging.getLogger(__name__)
+
+# longest time a parsed record waits before its micro-batch is flushed
+DEFAULT_WINDOW = 2.0
+# sleep between polls while no file has grown
+DEFAULT_POLL = 0.5
+
+
+class FileTail:
+    """Incremental reader of a file that a scanner is still appending to.
+
+    Only complete lines are returned; a line the writer is still in the
+    middle of is re-read once its newline arrives. `replaced()` notices
+    rotation (the path now names another file) and truncation, after which
+    `restart()` continues from the start of the current file.
+    """
+    def __init__(self, path: str, offset: int = 0, inode: int = None):
+        self.path = path
+        self.offset = offset
+        self.inode = inode
+        self._file = None
+
+    def _open(self) -> bool:
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        st = os.fstat(f.fileno())
+        if (self.inode is not None and st.st_ino != self.inode) or st.st_size < self.offset:
+            self.offset = 0
+        self.inode = st.st_ino
+        f.seek(self.offset)
+        self._file = f
+        return True
+
+    def read(self, max_lines: int) -> tuple[int, list[bytes]]:
+        """Up to `max_lines` new complete lines, with the offset the first one starts at."""
+        if self._file is None and not self._open():
+            return self.offset, []
+        start = self.offset
+        lines = []
+        while len(lines) < max_lines:
+            line = self._file.readline()
+            if not line.endswith(b'\n'):
+                self._file.seek(self.offset)
+                break
+            lines.append(line)
+            self.offset += len(line)
+        return start, lines
+
+    def replaced(self) -> bool:
+        """True if the file was rotated away or truncated below the read position."""
+        if self._file is None:
+            return False
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # moved away and not recreated yet, keep draining the old file
+            return False
+        return st.st_ino != self.inode or st.st_size < self.offset
+
+    def restart(self):
+        self.close()
+        self.offset = 0
+        self.inode = None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Follower:
+    """Tails one JSONL file into the graph in micro-batches.
+
+    A batch is flushed once it holds `batch_size` records or its oldest
+    record is `window` seconds old, so the graph lags the scanner by at most
+    about `window` plus one write. The checkpoint is committed with every
+    flush, so `follow --resume` picks up after the last one.
+    """
+    def __init__(self, tail: FileTail, parse_line, sync, checkpoint: Checkpoint,
+                 batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW):
+        self.tail = tail
+        self.parse_line = parse_line
+        self.sync = sync
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.window = window
+        self.stats = {"lines": checkpoint.lines, "malformed": checkpoint.malformed}
+        self._pending = []
+        self._since = None
+
+    def step(self) -> bool:
+        """Read what is available and flush if a batch is due. Returns True if anything was read."""
+        start, lines = self.tail.read(self.batch_size - len(self._pending))
+        if lines:
+            records, malformed = parse_lines_with_offsets(lines, self.parse_line, start)
+            self.stats["lines"] += len(records) + malformed
+            self.stats["malformed"] += malformed
+            for offset, record in records:
+                self.checkpoint.advance(offset, self.stats)
+                self._pending.append(record)
+            if self._pending and self._since is None:
+                self._since = time.monotonic()
+        elif self.tail.replaced():
+            # the rest of the old file is in, commit it before switching over
+            self.flush()
+            log.info("[i] %s was rotated or truncated, following it from the start", self.tail.path)
+            self.tail.restart()
+            self.checkpoint.offset = self.checkpoint.size = 0
+            return True
+
+        if len(self._pending) >= self.batch_size or (
+                self._since is not None and time.monotonic() - self._since >= self.window):
+            self.flush()
+        return bool(lines)
+
+    def flush(self):
+        if not self._pending:
+            return
+        checkpoint = self.checkpoint
+        checkpoint.offset = self.tail.offset
+        checkpoint.inode = self.tail.inode
+        checkpoint.size = max(checkpoint.size, checkpoint.offset)
+        self.sync(self._pending, checkpoint)
+        self._pending = []
+        self._since = None
+
+
+def domain_follower(store, path=DEFAULT_DNS_FILE, resume=False, batch_size=DEFAULT_BATCH_SIZE,
+                    window=DEFAULT_WINDOW) -> Follower:
+    """Follow subfinder output; one `DomainTree` spans all micro-batches, so known hosts are not rewritten."""
+    tree = DomainTree()
+
+    def sync(records, checkpoint):
+        store.sync_domain_nodes((DomainNode(*record) for record in records), batch_size,
+                                tree=tree, checkpoint=checkpoint)
+
+    return _follower(store, "domains", path, parse_dns_line, sync, resume, batch_size, window)
+
+
+def dnsr_follower(store, path=DEFAULT_DNSR_FILE, resume=False, batch_size=DEFAULT_BATCH_SIZE,
+                  window=DEFAULT_WINDOW) -> Follower:
+    """Follow dnsx output."""
+    def sync(records, checkpoint):
+        store.sync_dnsr_nodes((DNSReccordNode(*record) for record in records), batch_size,
+                              checkpoint=checkpoint)
+
+    return _follower(store, "dnsr", path, parse_dnsr_line, sync, resume, batch_size, window)
+
+
+def _follower(store, name, path, parse_line, sync, resume, batch_size, window):
+    if os.path.exists(path):
+        checkpoint = open_checkpoint(store, name, path, resume)
+    else:
+        # the scanner has not started writing yet
+        checkpoint = Checkpoint(name=name, path=os.path.abspath(path), size=0, inode=0)
+    tail = FileTail(path, checkpoint.offset, checkpoint.inode or None)
+    return Follower(tail, parse_line, sync, checkpoint, batch_size, window)
+
+
+def follow(followers, poll=DEFAULT_POLL, stop=None):
+    """Round-robin over the followers until `stop()` is true or the user interrupts.
+
+    Pending records are flushed on the way out, also on Ctrl-C.
+    """
+    try:
+        while stop is None or not stop():
+            busy = False
+            for follower in followers:
+                busy |= follower.step()
+            if not busy:
+                time.sleep(poll)
+    finally:
+        for follower in followers:
+            follower.flush()
+            follower.tail.close()
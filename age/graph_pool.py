@@ -0,0 +1,46 @@
+import threading
+import age
+from psycopg2.pool import ThreadedConnectionPool
+
+DEFAULT_DSN = "host=localhost port=5455 dbname=postgresDB user=postgresUser password=postgresPW"
+
+
+class GraphPool:
+    """A thread-safe pool of connections that are already set up for AGE.
+
+    `LOAD 'age'`, the `search_path` and the agtype registration run once per
+    pooled connection, not once per NetGraph. Prepared statements are tracked
+    per connection, so they survive being handed to another NetGraph.
+    """
+    def __init__(self, graph_name="test_graph", dsn=DEFAULT_DSN, size=4):
+        self.graph_name = graph_name
+        self.size = size
+        self._pool = ThreadedConnectionPool(1, size, dsn)
+        self._lock = threading.Lock()
+        self._prepared = {}
+
+    def getconn(self) -> age.Age:
+        conn = self._pool.getconn()
+        with self._lock:
+            first_use = id(conn) not in self._prepared
+            if first_use:
+                self._prepared[id(conn)] = {}
+        if first_use:
+            age.setUpAge(conn, self.graph_name)
+            conn.commit()
+        ag = age.Age()
+        ag.connection = conn
+        ag.graphName = self.graph_name
+        return ag
+
+    def prepared(self, ag: age.Age) -> dict:
+        """Cypher template -> prepared statement name, for this connection."""
+        return self._prepared[id(ag.connection)]
+
+    def putconn(self, ag: age.Age):
+        ag.connection.rollback()
+        self._pool.putconn(ag.connection)
+
+    def close(self):
+        self._pool.closeall()
+        self._prepared.clear()
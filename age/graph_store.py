@@ -0,0 +1,331 @@
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from domain_tree import DomainTree
+from psl import registrable_domain
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# rows fetched per round trip when streaming dumps
+DEFAULT_ITERSIZE = 10000
+# rows removed per transaction by label deletes
+DEFAULT_DELETE_CHUNK = 10000
+
+# per node counters rolled up over all descendants
+SUBTREE_COUNTERS = ("descendants", "resolved", "no_return")
+
+# DNSReccordNode fields that are stored as shared target nodes
+DNSR_TARGET_FIELDS = ("a", "aaaa", "cname", "ns", "mx")
+
+
+def normalize_target(value: str) -> str:
+    return value.lower().rstrip('.')
+
+
+def reverse_host(host: str) -> str:
+    """`a.b.example.com` -> `com.example.b.a`, so a subtree is one key range."""
+    return '.'.join(reversed(host.split('.')))
+
+
+def subtree_range(host: str) -> tuple[str, str]:
+    """Exclusive (low, high) bounds of the reversed keys strictly below `host`."""
+    key = reverse_host(host)
+    # '/' sorts right after '.', so the range holds exactly the `key.` prefixes
+    return key + '.', key + '/'
+
+
+def status_counter(status_code):
+    """The rolled-up counter a DNS status contributes to, if any."""
+    if status_code == "NOERROR":
+        return "resolved"
+    if status_code == "NO_RETURN":
+        return "no_return"
+    return None
+
+
+def rollup(changes) -> list[tuple]:
+    """Sum (reversed key, counter, delta) changes into every proper ancestor.
+
+    Returns sorted (ancestor key, descendants, resolved, no_return) deltas,
+    ready to be added onto the per node stats; the fixed order keeps
+    concurrent writers locking stats rows in the same sequence.
+    """
+    deltas = {}
+    for key, counter, delta in changes:
+        labels = key.split('.')
+        column = SUBTREE_COUNTERS.index(counter)
+        for depth in range(1, len(labels)):
+            row = deltas.setdefault('.'.join(labels[:depth]), [0] * len(SUBTREE_COUNTERS))
+            row[column] += delta
+    return [(key, *row) for key, row in sorted(deltas.items()) if any(row)]
+
+
+def split_shared(deltas) -> tuple[list, list]:
+    """Split `rollup` deltas into rows below a registrable domain and the rows at or above one.
+
+    The latter ("com", "com.example") take a delta from nearly every batch,
+    and the public suffix rows from every writer, so a backend with
+    concurrent writers applies them in their own short transaction instead
+    of holding their locks until the batch commits.
+    """
+    local, shared = [], []
+    for row in deltas:
+        host = reverse_host(row[0])
+        (shared if registrable_domain(host) in (None, host) else local).append(row)
+    return local, shared
+
+
+def status_changes(rows):
+    """(reversed key, old status, new status) rows -> counter changes for `rollup`."""
+    for key, old, new in rows:
+        if status_counter(old):
+            yield key, status_counter(old), -1
+        if status_counter(new):
+            yield key, status_counter(new), 1
+
+
+class GraphStore(ABC):
+    """Storage interface shared by the AGE and the embedded graph backends.
+
+    The batching, deduplication and throughput reporting live here; a
+    backend only writes prepared batches and answers the count, dump and
+    pivot queries.
+    """
+    # set while a checkpointed sync runs; backends store it with every batch commit
+    checkpoint = None
+
+    def sync_domain_nodes(self, domains, batch_size=DEFAULT_BATCH_SIZE, tree=None, checkpoint=None):
+        """Synchronize many domains and their implicit parent chains in batches.
+
+        Domains are folded into a `DomainTree`, so duplicate hosts and shared
+        parent chains are only written once. New nodes and HAS_SUBDOMAIN edges
+        are written set-based and committed once per batch. Pass a long-lived `tree` to deduplicate across calls.
+        With a `checkpoint` advanced by the reader, its position is committed
+        together with every batch.
+        Returns the number of node and edge rows written.
+        """
+        tree = DomainTree() if tree is None else tree
+        start = time.perf_counter()
+        total_nodes = total_edges = 0
+        self.checkpoint = checkpoint
+        try:
+            for domain in domains:
+                if tree.add(domain) and tree.pending >= batch_size:
+                    nodes, edges = tree.drain()
+                    self._write_domain_batch(nodes, edges)
+                    total_nodes += len(nodes)
+                    total_edges += len(edges)
+
+            if tree.pending or checkpoint is not None:
+                nodes, edges = tree.drain()
+                self._write_domain_batch(nodes, edges)
+                total_nodes += len(nodes)
+                total_edges += len(edges)
+        finally:
+            self.checkpoint = None
+
+        elapsed = time.perf_counter() - start
+        rate = (total_nodes + total_edges) / elapsed if elapsed > 0 else 0
+        log.info("[i] Synced %d domain nodes and %d relationships in %.2fs (%.0f rows/sec)",
+                 total_nodes, total_edges, elapsed, rate)
+        return total_nodes, total_edges
+
+    def sync_dnsr_nodes(self, dnsr_nodes, batch_size=DEFAULT_BATCH_SIZE, checkpoint=None):
+        """Synchronize many DNS records, including their record sets, in batches.
+
+        Besides the DNS record itself, every A/AAAA, CNAME, NS and MX value is
+        stored as a shared target, so pivots are plain indexed lookups.
+        Targets are deduplicated per batch and committed once, together with
+        the `checkpoint` position if one is given.
+        Returns the number of DNS records written.
+        """
+        start = time.perf_counter()
+        batch = {}
+        total = 0
+        self.checkpoint = checkpoint
+        try:
+            for dnsr in dnsr_nodes:
+                batch[dnsr.host] = dnsr
+                if len(batch) >= batch_size:
+                    self._write_dnsr_batch(*self._dnsr_rows(batch.values()))
+                    total += len(batch)
+                    batch = {}
+
+            if batch or checkpoint is not None:
+                self._write_dnsr_batch(*self._dnsr_rows(batch.values()))
+                total += len(batch)
+        finally:
+            self.checkpoint = None
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0
+        log.info("[i] Synced %d dnsr nodes in %.2fs (%.0f records/sec)", total, elapsed, rate)
+        return total
+
+    @staticmethod
+    def _dnsr_rows(dnsr_nodes):
+        """Flatten records into row dicts plus {field: {(host, value)}} targets."""
+        records = []
+        targets = {field: set() for field in DNSR_TARGET_FIELDS}
+        for dnsr in dnsr_nodes:
+            records.append({"host": dnsr.host, "timestamp": dnsr.timestamp, "status_code": dnsr.status_code})
+            for field, values in targets.items():
+                for value in getattr(dnsr, field) or ():
+                    values.add((dnsr.host, normalize_target(value)))
+        return records, targets
+
+    def apply_domain_delta(self, delta, seen_at=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Apply the difference between two scans (`manifest.diff_domains`) without rebuilding the graph.
+
+        Only added, changed and removed hosts are written; unchanged hosts are
+        not touched at all. Added and changed hosts are synced as usual and get
+        `first_seen` (once), `last_changed` and their `sources`; hosts missing
+        from the scan keep their node, history included, and are stamped with
+        `removed_at`. A node without `removed_at` was in the latest scan.
+        The host fingerprints are stored in the graph with every batch, so the
+        next scan is diffed against exactly what the graph holds.
+        """
+        seen_at = int(time.time()) if seen_at is None else seen_at
+        self.sync_domain_nodes(delta.added + delta.changed, batch_size=batch_size)
+
+        seen = [{"host": domain.host, "sources": delta.sources[domain.host],
+                 "fingerprint": f"{delta.fingerprints[domain.host]:016x}"}
+                for domain in delta.added + delta.changed]
+        for i in range(0, max(len(seen), len(delta.removed)), batch_size):
+            self._write_delta_batch(seen[i:i + batch_size], delta.removed[i:i + batch_size], seen_at)
+        log.info("[i] Applied %r", delta)
+
+    @abstractmethod
+    def ensure_schema(self) -> bool:
+        """Create whatever tables, labels and indexes the backend needs."""
+
+    @abstractmethod
+    def _write_domain_batch(self, nodes: list[dict], edges: list[tuple[str, str]]):
+        """Upsert `DomainTree.drain()` rows and edges.
+
+        A row only ever upgrades a node: an implicit row never overwrites the
+        source or flags of an explicit one and `input` keeps its first value,
+        so rows re-emitted by a fresh tree (resume, delta ingest) are harmless.
+        """
+
+    @abstractmethod
+    def _write_dnsr_batch(self, records: list[dict], targets: dict[str, set]):
+        ...
+
+    @abstractmethod
+    def load_checkpoint(self, name: str):
+        """The stored `Checkpoint` of ingest `name`, or None."""
+
+    @abstractmethod
+    def _write_delta_batch(self, seen: list[dict], removed: list[str], seen_at: int):
+        """Stamp seen and removed hosts and store or drop their fingerprints, in one commit."""
+
+    @abstractmethod
+    def load_fingerprints(self) -> dict[str, int]:
+        """Host fingerprints of the scans applied so far, empty for a fresh or reset graph."""
+
+    @abstractmethod
+    def mark_untried_as_no_return(self, hosts, batch_size=None) -> int:
+        ...
+
+    @abstractmethod
+    def count_domain_node(self) -> int:
+        ...
+
+    @abstractmethod
+    def count_domain_relationships(self) -> int:
+        ...
+
+    @abstractmethod
+    def iter_domains_host(self, itersize=DEFAULT_ITERSIZE):
+        """Yield every Domain host without holding the whole result in memory."""
+
+    @abstractmethod
+    def iter_dnsr_nodes_with_status_code(self, itersize=DEFAULT_ITERSIZE):
+        ...
+
+    @abstractmethod
+    def iter_domain_rows(self, itersize=DEFAULT_ITERSIZE):
+        """Yield (host, source, input, is_implicit, is_root) per Domain node."""
+
+    @abstractmethod
+    def iter_subdomain_edges(self, itersize=DEFAULT_ITERSIZE):
+        """Yield (parent, child) host pairs per HAS_SUBDOMAIN edge."""
+
+    @abstractmethod
+    def iter_dnsr_edges(self, itersize=DEFAULT_ITERSIZE):
+        """Yield (domain host, record host) pairs per HAS_DNSR edge."""
+
+    @abstractmethod
+    def iter_dnsr_rows(self, itersize=DEFAULT_ITERSIZE):
+        """Yield (host, status_code, timestamp, a, aaaa, cname) per DNSReccord, values as lists."""
+
+    @abstractmethod
+    def iter_descendants(self, host: str, itersize=DEFAULT_ITERSIZE):
+        """Yield every Domain host below `host`, from one range scan of the reversed host index."""
+
+    @abstractmethod
+    def subtree_stats(self, host: str) -> dict:
+        """Rolled-up {descendants, resolved, no_return} counts below `host`."""
+
+    def count_descendants(self, host: str) -> int:
+        return self.subtree_stats(host)["descendants"]
+
+    def dump_domains_host(self) -> list[str]:
+        return list(self.iter_domains_host())
+
+    def dump_dnsr_nodes_with_status_code(self) -> list:
+        return list(self.iter_dnsr_nodes_with_status_code())
+
+    @abstractmethod
+    def hosts_by_ip(self, address: str) -> list[str]:
+        ...
+
+    @abstractmethod
+    def _hosts_by_target(self, field: str, value: str) -> list[str]:
+        ...
+
+    def hosts_by_cname(self, target: str) -> list[str]:
+        return self._hosts_by_target("cname", target)
+
+    def hosts_by_ns(self, nameserver: str) -> list[str]:
+        return self._hosts_by_target("ns", nameserver)
+
+    def hosts_by_mx(self, mx: str) -> list[str]:
+        return self._hosts_by_target("mx", mx)
+
+    @abstractmethod
+    def delete(self):
+        ...
+
+    @abstractmethod
+    def reset(self):
+        """Remove all nodes and edges but keep the schema and indexes."""
+
+    @abstractmethod
+    def delete_all_dnsr_nodes(self, chunk_size=DEFAULT_DELETE_CHUNK, skip_locked=False):
+        ...
+
+    @abstractmethod
+    def close(self):
+        ...
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_graph(backend=None, **kwargs) -> GraphStore:
+    """Open the backend named by `backend` or $GRAPH_BACKEND ("age" or "sqlite")."""
+    backend = backend or os.environ.get("GRAPH_BACKEND", "age")
+    if backend == "sqlite":
+        from sqlite_graph import SQLiteGraph
+        return SQLiteGraph(**kwargs)
+    if backend == "age":
+        from net_graph import NetGraph
+        return NetGraph(**kwargs)
+    raise ValueError(f"Unknown graph backend: {backend}")
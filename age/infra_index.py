@@ -0,0 +1,168 @@
+from array import array
+from graph_store import normalize_target
+
+# infrastructure a record can share with other hosts
+INFRA_KINDS = ("ip", "cname", "ns", "soa")
+
+
+def infra_values(record, kinds=INFRA_KINDS):
+    """Distinct (kind, value) infrastructure keys of a DNSReccordNode.
+
+    CNAME and NS names are normalized like the graph targets; an SOA is keyed
+    by its zone name and serial, so hosts only share it while they see the
+    same zone version.
+    """
+    values = set()
+    if "ip" in kinds:
+        values.update(("ip", address) for address in record.a or ())
+        values.update(("ip", address) for address in record.aaaa or ())
+    if "cname" in kinds:
+        values.update(("cname", normalize_target(name)) for name in record.cname or ())
+    if "ns" in kinds:
+        values.update(("ns", normalize_target(name)) for name in record.ns or ())
+    if "soa" in kinds:
+        for soa in record.soa or ():
+            if isinstance(soa, dict) and soa.get("name"):
+                values.add(("soa", f"{normalize_target(soa['name'])} {soa.get('serial')}"))
+    return values
+
+
+class InfraIndex:
+    """Inverted index from shared infrastructure to hosts, with co-hosting clusters.
+
+    Hosts and (kind, value) keys are interned once as integer ids. Every
+    value keeps an array of the host ids that use it, and a union-find over
+    the hosts joins all hosts sharing any value. Each cluster is also a
+    circular list threaded through `_next`, which two merging clusters
+    splice in O(1), so `cluster_of()` walks exactly the members.
+
+    Records can be added at any time, e.g. while following dnsx output;
+    links are only ever added, so a host whose infrastructure changed stays
+    in its old cluster until the index is rebuilt.
+    """
+    __slots__ = ("kinds", "_hosts", "_host_ids", "_host_values", "_values", "_value_ids", "_postings",
+                 "_parent", "_size", "_next")
+
+    def __init__(self, kinds=INFRA_KINDS):
+        self.kinds = tuple(kinds)
+        self._hosts = []
+        self._host_ids = {}
+        self._host_values = []
+        self._values = []
+        self._value_ids = {}
+        self._postings = []
+        self._parent = array("l")
+        self._size = array("l")
+        self._next = array("l")
+
+    def _host_id(self, host: str) -> int:
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            host_id = self._host_ids[host] = len(self._hosts)
+            self._hosts.append(host)
+            self._host_values.append(frozenset())
+            self._parent.append(host_id)
+            self._size.append(1)
+            self._next.append(host_id)
+        return host_id
+
+    def _value_id(self, value: tuple) -> int:
+        value_id = self._value_ids.get(value)
+        if value_id is None:
+            value_id = self._value_ids[value] = len(self._values)
+            self._values.append(value)
+            self._postings.append(array("l"))
+        return value_id
+
+    def _find(self, host_id: int) -> int:
+        parent = self._parent
+        while parent[host_id] != host_id:
+            # path halving keeps the trees flat without recursion
+            parent[host_id] = parent[parent[host_id]]
+            host_id = parent[host_id]
+        return host_id
+
+    def _union(self, a: int, b: int):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+        # splice the two member rings into one
+        self._next[a], self._next[b] = self._next[b], self._next[a]
+
+    def add(self, record) -> int:
+        """Index one DNSReccordNode, joining its host with every host it shares a value with."""
+        host_id = self._host_id(record.host)
+        known = self._host_values[host_id]
+        new = []
+        for value in infra_values(record, self.kinds):
+            value_id = self._value_id(value)
+            if value_id in known:
+                continue
+            postings = self._postings[value_id]
+            if postings:
+                self._union(host_id, postings[0])
+            postings.append(host_id)
+            new.append(value_id)
+        if new:
+            self._host_values[host_id] = known.union(new)
+        return host_id
+
+    def add_records(self, records) -> "InfraIndex":
+        """Build or extend the index in one streaming pass, e.g. over `eat_dnsr_file()`."""
+        for record in records:
+            self.add(record)
+        return self
+
+    def hosts_by(self, kind: str, value: str) -> list[str]:
+        """Hosts using one infrastructure value, e.g. `hosts_by("ns", "a1-1.akam.net")`."""
+        if kind in ("cname", "ns"):
+            value = normalize_target(value)
+        value_id = self._value_ids.get((kind, value))
+        if value_id is None:
+            return []
+        return [self._hosts[host_id] for host_id in self._postings[value_id]]
+
+    def infrastructure(self, host: str) -> list[tuple[str, str]]:
+        """Sorted (kind, value) keys indexed for `host`."""
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            return []
+        return sorted(self._values[value_id] for value_id in self._host_values[host_id])
+
+    def cluster_of(self, host: str) -> list[str]:
+        """All hosts connected to `host` through shared infrastructure, `host` first."""
+        start = self._host_ids.get(host)
+        if start is None:
+            return []
+        members = [host]
+        host_id = self._next[start]
+        while host_id != start:
+            members.append(self._hosts[host_id])
+            host_id = self._next[host_id]
+        return members
+
+    def cluster_size(self, host: str) -> int:
+        host_id = self._host_ids.get(host)
+        return 0 if host_id is None else self._size[self._find(host_id)]
+
+    def clusters(self, min_size: int = 2):
+        """Yield the member lists of all clusters with at least `min_size` hosts, largest first."""
+        roots = sorted((host_id for host_id in range(len(self._hosts)) if self._parent[host_id] == host_id),
+                       key=lambda root: -self._size[root])
+        for root in roots:
+            if self._size[root] < min_size:
+                break
+            yield self.cluster_of(self._hosts[root])
+
+    def __contains__(self, host: str) -> bool:
+        return host in self._host_ids
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def __repr__(self):
+        return f"InfraIndex(hosts={len(self._hosts)}, values={len(self._values)})"
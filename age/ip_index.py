@@ -0,0 +1,254 @@
+import ipaddress
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+DEFAULT_IP_INDEX = "../out/ip.index"
+
+_MAGIC = b"IPIDX001"
+# magic, host count, host blob bytes, v4 keys, v6 keys, postings; sections are little-endian
+_HEADER = struct.Struct("<8sQQQQQ")
+_MASK64 = (1 << 64) - 1
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+def _key(address) -> tuple[int, int]:
+    """(family, integer key) of an address."""
+    address = ipaddress.ip_address(address)
+    return address.version, int(address)
+
+
+class _WideKeys:
+    """Sorted 128 bit keys stored as parallel high/low 64 bit arrays, indexable for `bisect`."""
+    __slots__ = ("hi", "lo")
+
+    def __init__(self, hi, lo):
+        self.hi = hi
+        self.lo = lo
+
+    def __len__(self):
+        return len(self.hi)
+
+    def __getitem__(self, i):
+        return self.hi[i] << 64 | self.lo[i]
+
+
+class IPIndexBuilder:
+    """Collect host -> address pairs and freeze them into an `IPIndex`."""
+    def __init__(self):
+        self._host_ids = {}
+        self._hosts = []
+        self._postings = {4: {}, 6: {}}
+
+    def _host_id(self, host: str) -> int:
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            host_id = self._host_ids[host] = len(self._hosts)
+            self._hosts.append(host)
+        return host_id
+
+    def add(self, host: str, addresses):
+        host_id = None
+        for address in addresses:
+            try:
+                family, key = _key(address)
+            except ValueError:
+                continue
+            host_id = self._host_id(host) if host_id is None else host_id
+            self._postings[family].setdefault(key, set()).add(host_id)
+
+    def add_records(self, records) -> "IPIndexBuilder":
+        """Add the A and AAAA values of DNSReccordNodes, e.g. `eat_dnsr_file()` output."""
+        for record in records:
+            if record.a:
+                self.add(record.host, record.a)
+            if record.aaaa:
+                self.add(record.host, record.aaaa)
+        return self
+
+    def to_bytes(self) -> bytes:
+        blob = "\n".join(self._hosts).encode()
+        host_offsets = array("Q", [0])
+        for host in self._hosts:
+            host_offsets.append(host_offsets[-1] + len(host.encode()) + 1)
+        postings = array("I")
+        sections = []
+        for family in (4, 6):
+            keys = sorted(self._postings[family])
+            posting_offsets = array("Q", [len(postings)])
+            for key in keys:
+                postings.extend(sorted(self._postings[family][key]))
+                posting_offsets.append(len(postings))
+            if family == 4:
+                key_bytes = array("I", keys).tobytes()
+            else:
+                key_bytes = (array("Q", (key >> 64 for key in keys)).tobytes()
+                             + array("Q", (key & _MASK64 for key in keys)).tobytes())
+            sections.append((key_bytes, posting_offsets))
+
+        header = _HEADER.pack(_MAGIC, len(self._hosts), len(blob), *(len(self._postings[f]) for f in (4, 6)),
+                              len(postings))
+        parts = [header, host_offsets.tobytes(), blob, b"\0" * _pad(len(blob))]
+        for keys, posting_offsets in sections:
+            parts += [keys, b"\0" * _pad(len(keys)), posting_offsets.tobytes()]
+        parts.append(postings.tobytes())
+        return b"".join(parts)
+
+    def build(self) -> "IPIndex":
+        return IPIndex(self.to_bytes())
+
+    def save(self, path: str = DEFAULT_IP_INDEX):
+        """Write atomically, so readers mapping the old file keep a consistent view."""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+
+
+class IPIndex:
+    """Read-only address -> hosts index over one flat buffer, in memory or mmapped.
+
+    The buffer holds the interned host names, per family the sorted
+    address keys as fixed-width integers, and the host id postings of each
+    key. A prefix is a contiguous key range, so CIDR and range queries are
+    two binary searches plus a scan of the matching keys; nothing is parsed
+    or unpickled on open.
+    """
+    def __init__(self, buffer, _file=None):
+        if struct.pack("=I", 1) != struct.pack("<I", 1):
+            raise RuntimeError("IP index files are little-endian only")
+        self._buffer = buffer
+        self._file = _file
+        view = memoryview(buffer)
+        magic, n_hosts, blob_len, n_v4, n_v6, n_postings = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("Not an IP index file")
+        pos = _HEADER.size
+        self._host_offsets = view[pos:pos + 8 * (n_hosts + 1)].cast("Q")
+        pos += 8 * (n_hosts + 1)
+        self._blob = view[pos:pos + blob_len]
+        pos += blob_len + _pad(blob_len)
+        self._keys = {}
+        self._posting_offsets = {}
+        for family, count in ((4, n_v4), (6, n_v6)):
+            if family == 4:
+                self._keys[family] = view[pos:pos + 4 * count].cast("I")
+                pos += 4 * count + _pad(4 * count)
+            else:
+                self._keys[family] = _WideKeys(view[pos:pos + 8 * count].cast("Q"),
+                                               view[pos + 8 * count:pos + 16 * count].cast("Q"))
+                pos += 16 * count
+            self._posting_offsets[family] = view[pos:pos + 8 * (count + 1)].cast("Q")
+            pos += 8 * (count + 1)
+        self._postings = view[pos:pos + 4 * n_postings].cast("I")
+        self._counts = {4: n_v4, 6: n_v6}
+        self._host_cache = {}
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_IP_INDEX) -> "IPIndex":
+        f = open(path, "rb")
+        return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), f)
+
+    @classmethod
+    def from_records(cls, records) -> "IPIndex":
+        return IPIndexBuilder().add_records(records).build()
+
+    def close(self):
+        # drop the views first, an mmap cannot close while they are exported
+        self._host_offsets = self._blob = self._keys = self._posting_offsets = self._postings = None
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._counts[4] + self._counts[6]
+
+    def _host(self, host_id: int) -> str:
+        host = self._host_cache.get(host_id)
+        if host is None:
+            start, end = self._host_offsets[host_id], self._host_offsets[host_id + 1] - 1
+            host = self._host_cache[host_id] = bytes(self._blob[start:end]).decode()
+        return host
+
+    def _hosts_at(self, family: int, i: int):
+        offsets = self._posting_offsets[family]
+        return [self._host(host_id) for host_id in self._postings[offsets[i]:offsets[i + 1]]]
+
+    def _scan(self, family: int, first: int, last: int):
+        keys = self._keys[family]
+        i = bisect_left(keys, first)
+        for j in range(i, bisect_right(keys, last, i)):
+            yield keys[j], self._hosts_at(family, j)
+
+    def hosts(self, address) -> list[str]:
+        """Hosts with an A/AAAA record of exactly `address`."""
+        family, key = _key(address)
+        keys = self._keys[family]
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return self._hosts_at(family, i)
+        return []
+
+    def addresses_in(self, network):
+        """Yield (address, hosts) for every indexed address inside a CIDR prefix."""
+        network = ipaddress.ip_network(network, strict=False)
+        yield from self.addresses_between(network.network_address, network.broadcast_address)
+
+    def addresses_between(self, first, last):
+        """Yield (address, hosts) for every indexed address in the inclusive range."""
+        first, last = ipaddress.ip_address(first), ipaddress.ip_address(last)
+        if first.version != last.version:
+            raise ValueError(f"Range mixes address families: {first} - {last}")
+        for key, hosts in self._scan(first.version, int(first), int(last)):
+            yield type(first)(key), hosts
+
+    def prefix(self, *networks) -> set[str]:
+        """All hosts resolving into any of the CIDR prefixes, e.g. `prefix("23.0.0.0/8")`."""
+        found = set()
+        for network in networks:
+            for _, hosts in self.addresses_in(network):
+                found.update(hosts)
+        return found
+
+    def range(self, first, last) -> set[str]:
+        found = set()
+        for _, hosts in self.addresses_between(first, last):
+            found.update(hosts)
+        return found
+
+    def lookup_many(self, addresses) -> dict:
+        """Hosts for many addresses at once, {address: [hosts]} for the indexed ones.
+
+        The queries are sorted and answered in one merged pass per family,
+        each binary search starting where the previous one ended, which is
+        far cheaper than independent lookups for millions of addresses.
+        """
+        by_family = {4: [], 6: []}
+        for address in set(addresses):
+            try:
+                family, key = _key(address)
+            except ValueError:
+                continue
+            by_family[family].append((key, address))
+        found = {}
+        for family, queries in by_family.items():
+            keys = self._keys[family]
+            i = 0
+            for key, address in sorted(queries):
+                i = bisect_left(keys, key, i)
+                if i == len(keys):
+                    break
+                if keys[i] == key:
+                    found[address] = self._hosts_at(family, i)
+        return found
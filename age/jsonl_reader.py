@@ -0,0 +1,122 @@
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    import json
+    loads = json.loads
+
+# below this size process start-up costs more than it saves
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def chunk_ranges(path: str, chunk_bytes: int = CHUNK_BYTES, start: int = 0) -> list[tuple[int, int]]:
+    """Split a file from `start` on into (start, end) byte ranges that end on newline boundaries."""
+    size = os.path.getsize(path)
+    if size <= start:
+        return []
+    ranges = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < size:
+            end = mm.find(b'\n', min(start + chunk_bytes, size - 1))
+            end = size if end < 0 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_lines(lines, parse_line):
+    """Parse raw lines into compact records, returning (records, malformed)."""
+    records = []
+    malformed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            records.append(parse_line(line))
+        except (ValueError, KeyError, TypeError):
+            malformed += 1
+    return records, malformed
+
+
+def parse_lines_with_offsets(lines, parse_line, offset: int):
+    """`parse_lines` for lines kept with their line endings, pairing each record with the byte offset after it."""
+    records = []
+    malformed = 0
+    for line in lines:
+        offset += len(line)
+        if not line.strip():
+            continue
+        try:
+            records.append((offset, parse_line(line)))
+        except (ValueError, KeyError, TypeError):
+            malformed += 1
+    return records, malformed
+
+
+def _parse_chunk(path: str, start: int, end: int, parse_line, offsets: bool = False):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if offsets:
+            return parse_lines_with_offsets(mm[start:end].splitlines(keepends=True), parse_line, start)
+        return parse_lines(mm[start:end].splitlines(), parse_line)
+
+
+def iter_records(path: str, parse_line, workers: int = None, stats: dict = None,
+                 start: int = 0, offsets: bool = False, chunk_bytes: int = CHUNK_BYTES):
+    """Yield `parse_line(line)` for every line of a JSONL file, in file order.
+
+    Large files are mmapped, split on newline boundaries and parsed by a
+    process pool in chunks of about `chunk_bytes`; `parse_line` must be a
+    module level function returning a small picklable record (a tuple).
+    Malformed lines are counted in `stats["malformed"]` instead of being
+    reported one by one.
+
+    Reading begins at byte `start`, which must be a line boundary (e.g. a
+    saved offset). With `offsets` every record is yielded as
+    `(end offset, record)`, the position to resume from once it is stored.
+    """
+    stats = {} if stats is None else stats
+    stats.setdefault("lines", 0)
+    stats.setdefault("malformed", 0)
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if os.path.getsize(path) >= PARALLEL_MIN_BYTES else 1
+
+    if workers <= 1:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                offset += len(line)
+                if not line.strip():
+                    continue
+                stats["lines"] += 1
+                try:
+                    record = parse_line(line)
+                except (ValueError, KeyError, TypeError):
+                    stats["malformed"] += 1
+                    continue
+                yield (offset, record) if offsets else record
+        return
+
+    ranges = iter(chunk_ranges(path, chunk_bytes, start))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # keep a bounded window of chunks in flight so memory stays flat
+        pending = deque()
+        for chunk_start, chunk_end in ranges:
+            pending.append(pool.submit(_parse_chunk, path, chunk_start, chunk_end, parse_line, offsets))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            records, malformed = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                pending.append(pool.submit(_parse_chunk, path, *next_range, parse_line, offsets))
+            stats["lines"] += len(records) + malformed
+            stats["malformed"] += malformed
+            yield from records
@@ -0,0 +1,73 @@
+from domain_node import DomainNode
+from domain_tree import DomainTree
+
+# level-of-detail defaults: what is drawn before anything gets collapsed
+LOD_MAX_DEPTH = 2
+LOD_MAX_CHILDREN = 25
+
+
+def load_domain_tree(graph) -> DomainTree:
+    """Build a compact DomainTree from any GraphStore by streaming its Domain rows.
+
+    Implicit parents stay implicit, only explicitly reported hosts are flagged so.
+    """
+    tree = DomainTree()
+    for host, source, _input, is_implicit, is_root in graph.iter_domain_rows():
+        tree.add(DomainNode(host, _input, source, is_implicit=is_implicit, is_root=is_root))
+        if tree.pending > 10000:
+            tree.drain()
+    tree.drain()
+    return tree
+
+
+def level_of_detail(tree: DomainTree, roots=None, max_depth=LOD_MAX_DEPTH, max_children=LOD_MAX_CHILDREN, expand=()):
+    """Pick the nodes to draw, collapsing everything else into aggregates.
+
+    Below `max_depth` levels under a root each subtree becomes one node that
+    carries its host count, and beyond the `max_children` largest children of
+    a node the rest are folded into a single "+N more" node. Hosts in `expand`
+    are drawn with their own `max_depth` levels below them, so a collapsed
+    subtree can be opened on demand; the path down to them is always drawn.
+    Returns (nodes, edges) where nodes maps an id to its attributes.
+
+    The child lists and subtree sizes come from one pass over the tree that
+    it keeps until it changes, so only the first call on a tree is O(N);
+    after that the work is bounded by the children of the drawn nodes.
+    """
+    expand = {node for node in map(tree.node, expand) if node > 0}
+    # ancestors of expanded nodes stay open so the expanded subtree is reachable
+    path = set()
+    for node in expand:
+        while node > 0 and node not in path:
+            path.add(node)
+            node = tree.parent(node)
+    start = tree.roots() if roots is None else [node for node in map(tree.node, roots) if node > 0]
+    nodes, edges = {}, []
+
+    stack = [(node, 0) for node in start]
+    while stack:
+        node, depth = stack.pop()
+        host = tree.host(node)
+        if node in expand:
+            depth = 0
+        children = tree.children(node)
+        collapsed = bool(children) and depth >= max_depth and node not in path
+        nodes[host] = {
+            "is_root": tree.is_root(node),
+            "aggregate": collapsed,
+            "count": tree.subtree_size(node) - 1 if collapsed else 0,
+        }
+        if collapsed:
+            continue
+        children.sort(key=lambda child: (child in path, tree.subtree_size(child)), reverse=True)
+        shown = max(max_children, sum(1 for child in children if child in path))
+        for child in children[:shown]:
+            edges.append((host, tree.host(child)))
+            stack.append((child, depth + 1))
+        rest = children[shown:]
+        if rest:
+            aggregate = f"{host} +{len(rest)} more"
+            nodes[aggregate] = {"is_root": False, "aggregate": True,
+                                "count": sum(tree.subtree_size(child) for child in rest)}
+            edges.append((host, aggregate))
+    return nodes, edges
@@ -1,79 +1,253 @@
-import time
+import atexit
+import logging
 import sys
 from rich.pretty import pprint
-from net_graph import NetGraph
+from graph_store import open_graph, DEFAULT_ITERSIZE, DEFAULT_DELETE_CHUNK, DEFAULT_BATCH_SIZE
+from sharded_writer import sync_domain_nodes_sharded
 #from dns_reccord_node import DNSReccordNode 
-from dns_utils import eat_dns_file, output_domains, eat_dnsr_file, eat_dnsr_cmd
+from dns_utils import eat_dns_file, output_domains, eat_dnsr_file, eat_dnsr_cmd, DEFAULT_DNS_FILE, DEFAULT_DNSR_FILE
+from checkpoint import open_checkpoint
+from manifest import diff_domains
+from resolver import resolve_and_sync, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+from stats import query_stats
+from query_cache import query_cache
+from export import export_graph, DEFAULT_ROW_GROUP
+from ip_index import IPIndex, IPIndexBuilder, DEFAULT_IP_INDEX
+from infra_index import InfraIndex, INFRA_KINDS
+from follow import follow, domain_follower, dnsr_follower, DEFAULT_WINDOW, DEFAULT_POLL
+
+# flags followed by a value; `--stats` only takes one if the next argument is not a flag
+VALUE_FLAGS = ("--backend", "--max", "--shards", "--batch-size", "--window", "--poll", "--dns-file", "--dnsr-file",
+               "--concurrency", "--timeout", "--itersize", "--out", "--format", "--row-group", "--index",
+               "--kinds", "--chunk-size")
+
+def flag_value(name, default=None):
+    """Value following `name` on the command line, e.g. `--shards 4`."""
+    if name in sys.argv[2:]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+def positional_args(argv=None):
+    """Arguments after the command that are neither flags nor the value of one."""
+    argv = sys.argv[2:] if argv is None else argv
+    args = []
+    for i, arg in enumerate(argv):
+        if arg.startswith("--"):
+            continue
+        if i and (argv[i - 1] in VALUE_FLAGS or argv[i - 1] == "--stats"):
+            continue
+        args.append(arg)
+    return args
+
+def open_store():
+    """The graph backend chosen with `--backend age|sqlite` (default: $GRAPH_BACKEND or age)."""
+    return open_graph(flag_value("--backend"))
+
+def setup_instrumentation():
+    """`--verbose` turns on per record debug logging, `--stats [path]` reports query stats on exit.
+
+    With a path ending in `.prom` the stats are written in Prometheus textfile
+    format, otherwise as JSON; without a path a summary is printed.
+    """
+    logging.basicConfig(level=logging.DEBUG if "--verbose" in sys.argv[2:] else logging.INFO,
+                        format="%(message)s")
+    if "--stats" in sys.argv[2:]:
+        rest = sys.argv[sys.argv.index("--stats") + 1:]
+        path = rest[0] if rest and not rest[0].startswith("--") else None
+        if path:
+            atexit.register(query_stats.write, path)
+        else:
+            atexit.register(query_stats.print_summary)
+        atexit.register(lambda: print(f"[i] Query cache: {query_cache.info()}"))
 
 def rm_db():
-    ng = NetGraph()
+    ng = open_store()
     ng.delete()
     ng.close()
-    time.sleep(1)  # Allow time for AGE/PostgreSQL cleanup
 
-if __name__ == "__main__":
+def reset_db():
+    ng = open_store()
+    ng.reset()
+    ng.close()
 
+if __name__ == "__main__":
+    setup_instrumentation()
 
     if sys.argv[1] == "rm-db":
         rm_db()
         exit()
     
+    if sys.argv[1] == "reset-db":
+        reset_db()
+        exit()
+
+    if sys.argv[1] == "init-db":
+        ng = open_store()
+        ng.ensure_schema()
+        ng.close()
+        exit()
+
     if sys.argv[1] == "re-read-domains":
-        rm_db()
-        ng = NetGraph()
+        # --resume keeps the graph and continues after the last committed batch
+        resume = "--resume" in sys.argv[2:]
+        shards = int(flag_value("--shards", 1))
+        if shards > 1 and resume:
+            # checkpoints are kept per ingest, not per shard
+            sys.exit("[-] --resume needs a single shard, drop --shards")
+        if not resume:
+            reset_db()
+        ng = open_store()
+        ng.ensure_schema()
 
         print(f"[i] Number of domains: {ng.count_domain_node()}")
         print(f"[i] Number of relationships: {ng.count_domain_relationships()}")
 
-        for domain_node in eat_dns_file(max=111):
-            print("-----------------------")
-            print("[+] processing domain_node: ", domain_node)
-            ng.sync_domain_node(domain_node)
-
-        print("\n=== All DomainNodes and DomainRelationships ===")
-        pprint(ng.dump_domain_nodes_with_rel())
-        print("\n=== Everything in DB ===")
-        pprint(ng.dump_all())
+        if shards > 1:
+            from graph_pool import GraphPool
+            pool = GraphPool(size=shards)
+            sync_domain_nodes_sharded(pool, eat_dns_file(max=int(flag_value("--max", 111))), shards=shards)
+            pool.close()
+        else:
+            checkpoint = open_checkpoint(ng, "domains", DEFAULT_DNS_FILE, resume)
+            ng.sync_domain_nodes(eat_dns_file(max=int(flag_value("--max", 111)), checkpoint=checkpoint),
+                                 checkpoint=checkpoint)
+
+        if hasattr(ng, "iter_all"):
+            # the AGE backend can also show the raw graph
+            print("\n=== All DomainNodes and DomainRelationships ===")
+            for row in ng.iter_domain_nodes_with_rel():
+                pprint(row)
+            print("\n=== Everything in DB ===")
+            for row in ng.iter_all():
+                pprint(row)
 
         print(f"[i] Number of domains: {ng.count_domain_node()}")
         print(f"[i] Number of relationships: {ng.count_domain_relationships()}")
         ng.close() 
 
+    if sys.argv[1] == "follow":
+        # follow [domains] [dnsr]: tail the scanner output while it is written and sync it in micro-batches until Ctrl-C
+        ng = open_store()
+        ng.ensure_schema()
+        kinds = [arg for arg in positional_args() if arg in ("domains", "dnsr")] or ["domains", "dnsr"]
+        options = dict(resume="--resume" in sys.argv[2:],
+                       batch_size=int(flag_value("--batch-size", DEFAULT_BATCH_SIZE)),
+                       window=float(flag_value("--window", DEFAULT_WINDOW)))
+        followers = []
+        if "domains" in kinds:
+            followers.append(domain_follower(ng, flag_value("--dns-file", DEFAULT_DNS_FILE), **options))
+        if "dnsr" in kinds:
+            followers.append(dnsr_follower(ng, flag_value("--dnsr-file", DEFAULT_DNSR_FILE), **options))
+        print(f"[i] Following {', '.join(f.tail.path for f in followers)}, Ctrl-C to stop")
+        try:
+            follow(followers, poll=float(flag_value("--poll", DEFAULT_POLL)))
+        except KeyboardInterrupt:
+            print("[i] Stopped following")
+        ng.close()
+        exit()
+
+    if sys.argv[1] == "update-domains":
+        # the previous fingerprints live in the graph, so after rm-db or reset-db every host is new again
+        ng = open_store()
+        delta = diff_domains(ng.load_fingerprints(), eat_dns_file())
+        print(f"[i] {delta}")
+        ng.apply_domain_delta(delta)
+        ng.close()
+
+    if sys.argv[1] == "resolve":
+        ng = open_store()
+        stats = resolve_and_sync(
+            ng, ng.dump_domains_host(),
+            concurrency=int(flag_value("--concurrency", DEFAULT_CONCURRENCY)),
+            timeout=float(flag_value("--timeout", DEFAULT_TIMEOUT)),
+        )
+        pprint(stats)
+        ng.close()
+
     if sys.argv[1] == "dump-domains":
-        ng = NetGraph()
-        dom = ng.dump_domains_host()
-        output_domains(dom)
+        ng = open_store()
+        written = output_domains(ng.iter_domains_host(int(flag_value("--itersize", DEFAULT_ITERSIZE))))
+        print(f"[i] Wrote {written} domains")
+        ng.close()
+
+    if sys.argv[1] == "export":
+        ng = open_store()
+        export_graph(
+            ng,
+            out_dir=flag_value("--out", "../out/export"),
+            fmt=flag_value("--format", "parquet"),
+            row_group=int(flag_value("--row-group", DEFAULT_ROW_GROUP)),
+            itersize=int(flag_value("--itersize", DEFAULT_ITERSIZE)),
+        )
+        ng.close()
+
+    if sys.argv[1] == "subtree":
+        ng = open_store()
+        host = positional_args()[0]
+        print(f"[i] {host}: {ng.subtree_stats(host)}")
+        if "--list" in sys.argv[2:]:
+            for descendant in ng.iter_descendants(host):
+                print(descendant)
         ng.close()
 
+    if sys.argv[1] == "build-ip-index":
+        path = flag_value("--out", DEFAULT_IP_INDEX)
+        IPIndexBuilder().add_records(eat_dnsr_file(max=int(flag_value("--max", 0)))).save(path)
+        print(f"[+] Wrote IP index to {path}")
+        exit()
+
+    if sys.argv[1] == "ip-hosts":
+        # ip-hosts <address|cidr> [<address|cidr> ...], answered from the mmapped index without the db
+        networks = positional_args()
+        if not networks:
+            sys.exit("[-] usage: ip-hosts <address|cidr> [<address|cidr> ...] [--index path]")
+        with IPIndex.open(flag_value("--index", DEFAULT_IP_INDEX)) as index:
+            for host in sorted(index.prefix(*networks)):
+                print(host)
+        exit()
+
+    if sys.argv[1] == "cluster":
+        # cluster [<host>] [--kinds ip,cname,ns,soa] [--max N]: hosts sharing infrastructure, or the largest clusters
+        index = InfraIndex(flag_value("--kinds", ",".join(INFRA_KINDS)).split(","))
+        index.add_records(eat_dnsr_file(max=int(flag_value("--max", 0))))
+        print(f"[i] {index}")
+        hosts = positional_args()
+        if hosts:
+            print(f"[i] {hosts[0]} shares {len(index.infrastructure(hosts[0]))} infrastructure values")
+            for host in index.cluster_of(hosts[0]):
+                print(host)
+        else:
+            for members in index.clusters():
+                print(f"[+] {len(members)} hosts: {', '.join(members[:5])}{' ...' if len(members) > 5 else ''}")
+        exit()
+
     if sys.argv[1] == "delete-all-dnsr-nodes":
-        ng = NetGraph()
-        ng.delete_all_dnsr_nodes()
+        ng = open_store()
+        ng.delete_all_dnsr_nodes(int(flag_value("--chunk-size", DEFAULT_DELETE_CHUNK)), "--skip-locked" in sys.argv[2:])
         ng.close()
 
     if sys.argv[1] == "re-read-dnsr":
-        ng = NetGraph()
-        for dnsr_node in eat_dnsr_file(max=111):
-            print("-----------------------")
-            #print("[+] processing dnsr_node: ", dnsr_node)
-            ng.sync_dnsr_node(dnsr_node)
-            
+        ng = open_store()
+        checkpoint = open_checkpoint(ng, "dnsr", DEFAULT_DNSR_FILE, "--resume" in sys.argv[2:])
+        ng.sync_dnsr_nodes(eat_dnsr_file(max=int(flag_value("--max", 111)), checkpoint=checkpoint),
+                           checkpoint=checkpoint)
+
         all_domains_tried = eat_dnsr_cmd()
-        for domain in all_domains_tried:
-            status = ng.mark_dnsr_node_as_tried(domain)
-            ng.conn.commit()
-            if status == "not_found":
-                print(f"[i] DNSr {domain} in command but no entries found, marking as tried")
-            else:
-                print(f"[i] DNSr {domain} skipped")
+        marked = ng.mark_untried_as_no_return(all_domains_tried)
+        print(f"[i] {marked} of {len(all_domains_tried)} tried domains had no entries, marked as NO_RETURN")
 
-        pprint(ng.dump_dnsr_nodes_with_status_code())
+        for row in ng.iter_dnsr_nodes_with_status_code():
+            pprint(row)
 
-        print("--------------------------------")
-        pprint(ng.dump_dnsr_nodes_with_rel())
+        if hasattr(ng, "iter_dnsr_nodes_with_rel"):
+            print("--------------------------------")
+            for row in ng.iter_dnsr_nodes_with_rel():
+                pprint(row)
 
 
         ng.close()
 
-    ng = NetGraph()
-    pprint(ng.dump_dnsr_nodes_with_status_code())
+    ng = open_store()
+    for row in ng.iter_dnsr_nodes_with_status_code():
+        pprint(row)
     ng.close()
\ No newline at end of file
@@ -0,0 +1,66 @@
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from domain_node import DomainNode
+
+
+def fingerprint(pairs) -> int:
+    """Stable 64 bit fingerprint of a host's set of (input, source) pairs."""
+    digest = blake2b(digest_size=8)
+    for _input, source in sorted(pairs):
+        digest.update(f"{_input}\0{source}\n".encode())
+    return int.from_bytes(digest.digest(), "big")
+
+
+@dataclass
+class DomainDelta:
+    added: list[DomainNode] = field(default_factory=list)
+    changed: list[DomainNode] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    sources: dict[str, list[str]] = field(default_factory=dict)
+    fingerprints: dict[str, int] = field(default_factory=dict)
+
+    def __repr__(self):
+        return (
+            f"DomainDelta("
+            f"added={len(self.added)}, "
+            f"changed={len(self.changed)}, "
+            f"unchanged={len(self.unchanged)}, "
+            f"removed={len(self.removed)})"
+        )
+
+
+def diff_domains(previous: dict[str, int], domains) -> DomainDelta:
+    """Compare a stream of DomainNodes against the fingerprints of the previous scan.
+
+    `previous` comes from `GraphStore.load_fingerprints()`, which keeps them
+    next to the nodes they describe, so a reset graph starts over empty.
+
+    Hosts are grouped with all their (input, source) pairs first, since the
+    same host is usually reported by several sources.
+    """
+    seen = {}
+    first = {}
+    for domain in domains:
+        pairs = seen.get(domain.host)
+        if pairs is None:
+            pairs = seen[domain.host] = set()
+            first[domain.host] = domain
+        pairs.add((domain.input, domain.source))
+
+    delta = DomainDelta()
+    for host, pairs in seen.items():
+        value = fingerprint(pairs)
+        delta.fingerprints[host] = value
+        old = previous.get(host)
+        if old is None:
+            delta.added.append(first[host])
+        elif old != value:
+            delta.changed.append(first[host])
+        else:
+            delta.unchanged.append(host)
+            continue
+        delta.sources[host] = sorted({source for _, source in pairs})
+
+    delta.removed = [host for host in previous if host not in seen]
+    return delta
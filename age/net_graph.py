@@ -1,119 +1,594 @@
+import json
+import logging
+import time
 import age
-from rich.pretty import pprint
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
 from domain_node import DomainNode
+from domain_tree import DomainTree
+from graph_store import (GraphStore, DEFAULT_BATCH_SIZE, DEFAULT_ITERSIZE, DEFAULT_DELETE_CHUNK, SUBTREE_COUNTERS, normalize_target,
+                         reverse_host, subtree_range, rollup, split_shared, status_changes)
 from dns_reccord_node import DNSReccordNode
-from dns_utils import get_parent_domain_naive
+from graph_pool import DEFAULT_DSN
+from stats import query_stats
+from query_cache import query_cache
+from checkpoint import Checkpoint, CHECKPOINT_COLUMNS
 
-class NetGraph:
-    def __init__(self, graph_name="test_graph", dsn="host=localhost port=5455 dbname=postgresDB user=postgresUser password=postgresPW"):
-        self.graph_name = graph_name
-        self.conn = age.connect(dsn=dsn, graph=self.graph_name)
+log = logging.getLogger(__name__)
 
+# DNSReccordNode field -> (vertex label, key property, edge label)
+DNSR_TARGETS = {
+    "a": ("IP", "address", "HAS_A"),
+    "aaaa": ("IP", "address", "HAS_AAAA"),
+    "cname": ("CNAMETarget", "host", "HAS_CNAME"),
+    "ns": ("NameServer", "host", "HAS_NS"),
+    "mx": ("MX", "host", "HAS_MX"),
+}
 
-    def sync_dnsr_node(self, dnsr: DNSReccordNode):
-        print("[DEBUG] Processing dnsr:")
-        pprint(dnsr)
+# vertex label -> key property every MATCH/MERGE on that label filters by
+VERTEX_KEYS = {
+    "Domain": "host",
+    "DNSReccord": "host",
+    "IP": "address",
+    "CNAMETarget": "host",
+    "NameServer": "host",
+    "MX": "host",
+}
+EDGE_LABELS = ["HAS_SUBDOMAIN", "HAS_DNSR", "HAS_A", "HAS_AAAA", "HAS_CNAME", "HAS_NS", "HAS_MX"]
+
+# labels a read depends on / a write touches, for query cache invalidation
+DOMAIN_LABELS = ("Domain", "HAS_SUBDOMAIN")
+DNSR_LABELS = ("DNSReccord", "HAS_DNSR") + tuple(
+    label for target in DNSR_TARGETS.values() for label in (target[0], target[2]))
+ALL_LABELS = tuple(VERTEX_KEYS) + tuple(EDGE_LABELS)
+
+# hot queries that must not fall back to sequential scans
+INDEXED_QUERIES = [
+    "MATCH (d:Domain {host: 'x'}) RETURN d",
+    "MATCH (d:DNSReccord {host: 'x'}) RETURN d",
+    "MATCH (t:IP {address: 'x'}) RETURN t",
+    "MATCH (root:Domain {host: 'x'})-[:HAS_SUBDOMAIN]->(sub:Domain) RETURN sub",
+]
+
+# plain tables in the graph's schema, so deleting the graph drops them too.
+# domain_index holds every Domain under its reversed host (one range per
+# subtree, hence the bytewise collation) with its DNS status; domain_stats
+# holds the counters rolled up over each node's descendants.
+SUBTREE_TABLES = """
+CREATE TABLE IF NOT EXISTS {index} (
+    rhost text COLLATE "C" PRIMARY KEY,
+    status text
+);
+CREATE TABLE IF NOT EXISTS {stats} (
+    rhost text COLLATE "C" PRIMARY KEY,
+    descendants bigint NOT NULL DEFAULT 0,
+    resolved bigint NOT NULL DEFAULT 0,
+    no_return bigint NOT NULL DEFAULT 0
+);
+"""
+
+# ingest progress, written in the same transaction as each batch
+CHECKPOINT_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    name text PRIMARY KEY,
+    path text NOT NULL,
+    size bigint NOT NULL,
+    inode bigint NOT NULL,
+    "offset" bigint NOT NULL,
+    lines bigint NOT NULL,
+    malformed bigint NOT NULL,
+    records bigint NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+# host fingerprints of the applied scans, the base of the next `update-domains` diff
+MANIFEST_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    host text PRIMARY KEY,
+    fingerprint text NOT NULL
+);
+"""
+
+class NetGraph(GraphStore):
+    def __init__(self, graph_name="test_graph", dsn=DEFAULT_DSN, init_schema=False, pool=None, stats=None, cache=None):
+        self.pool = pool
+        self.stats = query_stats if stats is None else stats
+        self.cache = query_cache if cache is None else cache
+        self._streams = 0
+        # labels written in the open transaction, invalidated in the cache once it commits
+        self._dirty = set()
+        # rolled-up deltas of the hot ancestor rows, applied right after the batch commits
+        self._shared_stats = {}
+        if pool is not None:
+            self.graph_name = pool.graph_name
+            self.conn = pool.getconn()
+            self._prepared = pool.prepared(self.conn)
+        else:
+            self.graph_name = graph_name
+            self.conn = age.connect(dsn=dsn, graph=self.graph_name)
+            self._prepared = {}
+        self._index_table = sql.Identifier(self.graph_name, "domain_index")
+        self._stats_table = sql.Identifier(self.graph_name, "domain_stats")
+        self._checkpoint_table = sql.Identifier(self.graph_name, "ingest_checkpoint")
+        self._manifest_table = sql.Identifier(self.graph_name, "domain_manifest")
+        self._side_tables_ready = False
+        if init_schema:
+            self.ensure_schema()
+
+    def ensure_schema(self) -> bool:
+        """Create all labels and their indexes, then check the hot queries use them.
+
+        Vertex labels get a GIN index on `properties` (used by `{key: value}`
+        containment matches) and a btree on the key property expression;
+        edge labels get btree indexes on `start_id` and `end_id`.
+        Returns False and warns if any hot query still plans a sequential scan.
+        """
+        cursor = self.conn.connection.cursor()
+        cursor.execute("""
+            SELECT l.name FROM ag_catalog.ag_label l
+            JOIN ag_catalog.ag_graph g ON l.graph = g.graphid
+            WHERE g.name = %s
+        """, (self.graph_name,))
+        existing = {row[0] for row in cursor.fetchall()}
+
+        for label in VERTEX_KEYS:
+            if label not in existing:
+                cursor.execute("SELECT create_vlabel(%s, %s)", (self.graph_name, label))
+        for label in EDGE_LABELS:
+            if label not in existing:
+                cursor.execute("SELECT create_elabel(%s, %s)", (self.graph_name, label))
+
+        for label, key in VERTEX_KEYS.items():
+            table = sql.Identifier(self.graph_name, label)
+            cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin (properties)").format(
+                index=sql.Identifier(f"{label.lower()}_properties_gin"), table=table))
+            cursor.execute(sql.SQL(
+                "CREATE INDEX IF NOT EXISTS {index} ON {table} "
+                "USING btree (agtype_access_operator(VARIADIC ARRAY[properties, {key}::agtype]))").format(
+                index=sql.Identifier(f"{label.lower()}_{key}_btree"), table=table, key=sql.Literal(json.dumps(key))))
+        for label in EDGE_LABELS:
+            table = sql.Identifier(self.graph_name, label)
+            for column in ("start_id", "end_id"):
+                cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {table} USING btree ({column})").format(
+                    index=sql.Identifier(f"{label.lower()}_{column}"), table=table, column=sql.Identifier(column)))
+        self._commit()
+        log.info("[i] Schema ready: %d vertex labels, %d edge labels", len(VERTEX_KEYS), len(EDGE_LABELS))
+        self._side_tables_ready = False
+        self._side_tables()
+        return self.check_indexes()
 
-        self._create_all_dnsr_nodes(dnsr)
-        self._create_all_dnsr_relationships(dnsr)
+    def _side_tables(self):
+        """Create the reversed host index, subtree stats, checkpoint and manifest tables on first use.
+
+        A graph fresh from `rm-db` has none of them and not every write
+        command runs `ensure_schema()`, so every method touching them calls
+        this first, before it writes anything: the commit never splits a batch.
+        An empty index next to existing Domain nodes is rebuilt.
+        """
+        if self._side_tables_ready:
+            return
+        cursor = self.conn.connection.cursor()
+        cursor.execute(sql.SQL(SUBTREE_TABLES).format(index=self._index_table, stats=self._stats_table))
+        cursor.execute(sql.SQL(CHECKPOINT_TABLE).format(table=self._checkpoint_table))
+        cursor.execute(sql.SQL(MANIFEST_TABLE).format(table=self._manifest_table))
+        cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {index})").format(index=self._index_table))
+        index_empty = not cursor.fetchone()[0]
+        self._commit()
+        self._side_tables_ready = True
+        if index_empty and self._cypher("MATCH (d:Domain) RETURN d.host LIMIT 1").fetchone():
+            self.rebuild_domain_index()
+
+    def check_indexes(self) -> bool:
+        """EXPLAIN the hot queries and warn about any that would scan sequentially."""
+        cursor = self.conn.connection.cursor()
+        # with seq scans disabled the planner picks any usable index, even on tiny tables
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        ok = True
+        for query in INDEXED_QUERIES:
+            cursor.execute(sql.SQL("EXPLAIN SELECT * FROM cypher({graph}, $$ {query} $$) AS (v agtype)").format(
+                graph=sql.Literal(self.graph_name), query=sql.SQL(query)))
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            if "Seq Scan" in plan:
+                ok = False
+                log.warning("[-] Warning: query does not use an index: %s\n%s", query, plan)
+        self.conn.rollback()
+        return ok
+
+    def _exec_batch(self, cypher, rows, cols=None):
+        """Run a Cypher template once for a whole list of rows.
+
+        The rows are bound to `$rows` through a server-side prepared statement,
+        so the template is parsed once per connection and every batch is a
+        single round trip: `UNWIND $rows AS row ...`.
+        """
+        cursor = self.conn.connection.cursor()
+        name = self._prepared.get(cypher)
+        if name is None:
+            name = f"netgraph_batch_{len(self._prepared)}"
+            columns = sql.SQL(", ").join(sql.SQL(f"{col} agtype") for col in (cols or ["v"]))
+            cursor.execute(sql.SQL("PREPARE {name} (agtype) AS SELECT * FROM cypher({graph}, $$ {cypher} $$, $1) AS ({columns})").format(
+                name=sql.Identifier(name),
+                graph=sql.Literal(self.graph_name),
+                cypher=sql.SQL(cypher),
+                columns=columns,
+            ))
+            self._prepared[cypher] = name
+        start = time.perf_counter()
+        cursor.execute(sql.SQL("EXECUTE {name} (%s)").format(name=sql.Identifier(name)),
+                       (json.dumps({"rows": rows}),))
+        self.stats.observe(cypher, time.perf_counter() - start, cursor.rowcount, batch=len(rows))
+        return cursor
+
+    def _cypher(self, query, cols=None, params=None):
+        """`execCypher` with its latency and row count recorded per template."""
+        start = time.perf_counter()
+        cursor = self.conn.execCypher(query, cols=cols, params=params)
+        self.stats.observe(query, time.perf_counter() - start, cursor.rowcount)
+        return cursor
+
+    def _stream(self, query, cols, itersize=DEFAULT_ITERSIZE):
+        """Yield the rows of a Cypher query through a named server-side cursor.
+
+        Only `itersize` rows are held client side at a time. The cursor lives
+        in the current transaction, so nothing on this connection may commit
+        until the generator is exhausted or closed.
+        """
+        columns = sql.SQL(", ").join(sql.SQL(f"{col} agtype") for col in cols)
+        statement = sql.SQL("SELECT * FROM cypher({graph}, $$ {cypher} $$) AS ({columns})").format(
+            graph=sql.Literal(self.graph_name),
+            cypher=sql.SQL(query),
+            columns=columns,
+        )
+        return self._stream_sql(statement, None, itersize, query)
+
+    def _stream_sql(self, statement, params=None, itersize=DEFAULT_ITERSIZE, template=None):
+        self._streams += 1
+        cursor = self.conn.connection.cursor(name=f"netgraph_stream_{self._streams}")
+        cursor.itersize = itersize
+        start = time.perf_counter()
+        rows = 0
+        try:
+            cursor.execute(statement, params)
+            for row in cursor:
+                rows += 1
+                yield row
+        finally:
+            cursor.close()
+            self.stats.observe(template or statement.as_string(self.conn.connection), time.perf_counter() - start, rows)
+
+    def _read(self, key, labels, compute):
+        """Cached result of `compute()`, keyed by query template and params per graph.
+
+        Only counts, stats and pivots go through here; dumps and iterators
+        scale with the graph and always read it directly.
+        """
+        return self.cache.get_or_compute((self.graph_name, *key), [(self.graph_name, label) for label in labels], compute)
+
+    def _written(self, *labels):
+        """Mark labels of this graph as written; their cached reads are invalidated by the next `_commit()`.
+
+        Invalidating before the commit would let a concurrent reader cache
+        the pre-commit rows again under the new generation.
+        """
+        self._dirty.update(labels)
+
+    def _commit(self):
+        start = time.perf_counter()
         self.conn.commit()
+        if self._shared_stats:
+            self._upsert_stats([(key, *row) for key, row in sorted(self._shared_stats.items())])
+            self._shared_stats.clear()
+            self.conn.commit()
+        self.stats.observe_commit(time.perf_counter() - start)
+        if self._dirty:
+            self.cache.invalidate(*((self.graph_name, label) for label in self._dirty))
+            self._dirty.clear()
+
+
+    def sync_dnsr_node(self, dnsr: DNSReccordNode):
+        """Synchronize a single record, through the same writer as the batches."""
+        log.debug("Processing dnsr: %r", dnsr)
+        self._write_dnsr_batch(*self._dnsr_rows([dnsr]))
+
+    def _write_dnsr_batch(self, records: list[dict], targets: dict[str, set]):
+        self._side_tables()
+        if records:
+            self._exec_batch("""
+                UNWIND $rows AS row
+                MERGE (d:DNSReccord {host: row.host})
+                SET d.timestamp = row.timestamp,
+                    d.status_code = row.status_code
+            """, records)
+            self._exec_batch("""
+                UNWIND $rows AS row
+                MATCH (d:DNSReccord {host: row.host})
+                MATCH (r:Domain {host: row.host})
+                MERGE (r)-[:HAS_DNSR]->(d)
+            """, records)
+
+        for field, edges in targets.items():
+            if not edges:
+                continue
+            label, key, edge_label = DNSR_TARGETS[field]
+            self._exec_batch(f"""
+                UNWIND $rows AS row
+                MERGE (t:{label} {{{key}: row.value}})
+            """, [{"value": value} for value in {value for _, value in edges}])
+            self._exec_batch(f"""
+                UNWIND $rows AS row
+                MATCH (d:DNSReccord {{host: row.host}})
+                MATCH (t:{label} {{{key}: row.value}})
+                MERGE (d)-[:{edge_label}]->(t)
+            """, [{"host": host, "value": value} for host, value in edges])
+
+        self._index_statuses((record["host"], record["status_code"]) for record in records)
+        self._written(*DNSR_LABELS)
+        self._save_checkpoint()
+        self._commit()
+
+    def _save_checkpoint(self):
+        """Store the running sync's checkpoint in the transaction about to be committed."""
+        if self.checkpoint is None:
+            return
+        cursor = self.conn.connection.cursor()
+        columns = sql.SQL(", ").join(map(sql.Identifier, CHECKPOINT_COLUMNS))
+        updates = sql.SQL(", ").join(
+            sql.SQL("{column} = excluded.{column}").format(column=sql.Identifier(column))
+            for column in CHECKPOINT_COLUMNS[1:])
+        cursor.execute(sql.SQL(
+            "INSERT INTO {table} ({columns}) VALUES ({values}) "
+            "ON CONFLICT (name) DO UPDATE SET {updates}, updated_at = now()").format(
+            table=self._checkpoint_table, columns=columns,
+            values=sql.SQL(", ").join(sql.Placeholder() * len(CHECKPOINT_COLUMNS)), updates=updates),
+            self.checkpoint.row())
+
+    def load_checkpoint(self, name: str):
+        self._side_tables()
+        cursor = self.conn.connection.cursor()
+        cursor.execute(sql.SQL("SELECT {columns} FROM {table} WHERE name = %s").format(
+            columns=sql.SQL(", ").join(map(sql.Identifier, CHECKPOINT_COLUMNS)), table=self._checkpoint_table), (name,))
+        row = cursor.fetchone()
+        return Checkpoint(*row) if row else None
+
+    def _write_delta_batch(self, seen: list[dict], removed: list[str], seen_at: int):
+        self._side_tables()
+        if seen:
+            self._exec_batch("""
+                UNWIND $rows AS row
+                MATCH (d:Domain {host: row.host})
+                SET d.first_seen = coalesce(d.first_seen, row.ts),
+                    d.last_changed = row.ts,
+                    d.sources = row.sources,
+                    d.removed_at = null
+            """, [{"host": row["host"], "sources": row["sources"], "ts": seen_at} for row in seen])
+        if removed:
+            self._exec_batch("""
+                UNWIND $rows AS row
+                MATCH (d:Domain {host: row.host})
+                SET d.removed_at = row.ts
+            """, [{"host": host, "ts": seen_at} for host in removed])
+        cursor = self.conn.connection.cursor()
+        if seen:
+            execute_values(cursor, sql.SQL(
+                "INSERT INTO {table} (host, fingerprint) VALUES %s "
+                "ON CONFLICT (host) DO UPDATE SET fingerprint = excluded.fingerprint"
+            ).format(table=self._manifest_table).as_string(cursor),
+                [(row["host"], row["fingerprint"]) for row in seen])
+        if removed:
+            cursor.execute(sql.SQL("DELETE FROM {table} WHERE host = ANY(%s)").format(table=self._manifest_table),
+                           (removed,))
+        self._written(*DOMAIN_LABELS)
+        self._commit()
+
+    def load_fingerprints(self) -> dict[str, int]:
+        self._side_tables()
+        statement = sql.SQL("SELECT host, fingerprint FROM {table}").format(table=self._manifest_table)
+        return {host: int(value, 16) for host, value in self._stream_sql(statement)}
+
+    def _index_domains(self, hosts):
+        """Add hosts to the reversed host index and count the new ones into their ancestors."""
+        cursor = self.conn.connection.cursor()
+        keys = sorted({reverse_host(host) for host in hosts})
+        if not keys:
+            return []
+        new = execute_values(cursor, sql.SQL(
+            "INSERT INTO {index} (rhost) VALUES %s ON CONFLICT DO NOTHING RETURNING rhost"
+        ).format(index=self._index_table).as_string(cursor), [(key,) for key in keys], fetch=True)
+        self._bump_stats(rollup((key, "descendants", 1) for key, in new))
+        return [key for key, in new]
+
+    def _orphaned_children(self, new_keys, edges):
+        """(parent, child) edges from nodes new to the graph to direct children already in it.
+
+        With overlapping inputs a child can join before its parent, in an
+        earlier batch or before a resume, where the writing tree no longer
+        knows it.
+        """
+        if not new_keys:
+            return []
+        cursor = self.conn.connection.cursor()
+        cursor.execute(sql.SQL("""
+            SELECT p.rhost, c.rhost FROM unnest(%s::text[]) AS p (rhost)
+            JOIN {index} AS c ON c.rhost > p.rhost || '.' AND c.rhost < p.rhost || '/'
+            WHERE strpos(substr(c.rhost, length(p.rhost) + 2), '.') = 0
+        """).format(index=self._index_table), (new_keys,))
+        edges = set(edges)
+        return [edge for edge in ((reverse_host(parent), reverse_host(child)) for parent, child in cursor.fetchall())
+                if edge not in edges]
 
-    def _create_all_dnsr_nodes(self, dnsr: DNSReccordNode):
-        self.conn.execCypher("""
-            MERGE (d:DNSReccord {host: %s})
-            SET d.timestamp = %s,
-                d.status_code = %s
-            """, params=(dnsr.host, dnsr.timestamp, dnsr.status_code))
-        print(f"[+] Created dnsr node: {dnsr.host}")
+    def _index_statuses(self, statuses):
+        """Record (host, status_code) changes and move the rolled-up counters accordingly."""
+        cursor = self.conn.connection.cursor()
+        rows = sorted({reverse_host(host): status for host, status in statuses}.items())
+        if not rows:
+            return
+        # the joined `old` row still shows the status from before this UPDATE
+        changed = execute_values(cursor, sql.SQL("""
+            UPDATE {index} AS d SET status = v.status
+            FROM (VALUES %s) AS v (rhost, status)
+            JOIN {index} AS old ON old.rhost = v.rhost
+            WHERE d.rhost = v.rhost AND d.status IS DISTINCT FROM v.status
+            RETURNING d.rhost, old.status, d.status
+        """).format(index=self._index_table).as_string(cursor), rows, fetch=True)
+        self._bump_stats(rollup(status_changes(changed)))
 
+    def _bump_stats(self, deltas):
+        """Add rolled-up deltas: rows inside a registrable domain in this transaction, the shared rows after it.
 
-    def _create_all_dnsr_relationships(self, dnsr: DNSReccordNode):
-        self.conn.execCypher("""
-            MATCH (d:DNSReccord {host: %s})
-            MATCH (r:Domain {host: %s})
-            MERGE (r)-[:HAS_DNSR]->(d)
-            """, params=(dnsr.host, dnsr.host))
-        print(f"[+] Created dnsr relationship: {dnsr.host}")
+        Only a crash between the two commits can leave the shared counters
+        behind, `rebuild_domain_index()` recounts them.
+        """
+        local, shared = split_shared(deltas)
+        self._upsert_stats(local)
+        for key, *row in shared:
+            total = self._shared_stats.setdefault(key, [0] * len(SUBTREE_COUNTERS))
+            for column, delta in enumerate(row):
+                total[column] += delta
+
+    def _upsert_stats(self, deltas):
+        if not deltas:
+            return
+        cursor = self.conn.connection.cursor()
+        execute_values(cursor, sql.SQL("""
+            INSERT INTO {stats} AS s (rhost, descendants, resolved, no_return) VALUES %s
+            ON CONFLICT (rhost) DO UPDATE SET
+                descendants = s.descendants + excluded.descendants,
+                resolved = s.resolved + excluded.resolved,
+                no_return = s.no_return + excluded.no_return
+        """).format(stats=self._stats_table).as_string(cursor), deltas)
+
+    def rebuild_domain_index(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Recompute the reversed host index and subtree stats from the graph, e.g. for graphs older than them."""
+        self._side_tables()
+        cursor = self.conn.connection.cursor()
+        cursor.execute(sql.SQL("TRUNCATE {index}, {stats}").format(index=self._index_table, stats=self._stats_table))
+        batch = []
+        for host in self.iter_domains_host():
+            batch.append(host)
+            if len(batch) >= batch_size:
+                self._index_domains(batch)
+                batch = []
+        self._index_domains(batch)
+        statuses = self._stream("MATCH (:Domain)-[:HAS_DNSR]->(r:DNSReccord) RETURN r.host, r.status_code",
+                                ["host", "status_code"])
+        batch = []
+        for status in statuses:
+            batch.append(status)
+            if len(batch) >= batch_size:
+                self._index_statuses(batch)
+                batch = []
+        self._index_statuses(batch)
+        self._written(*DOMAIN_LABELS, *DNSR_LABELS)
+        self._commit()
+        log.info("[i] Rebuilt domain index: %d domains", self.count_domain_node())
+
+    def iter_descendants(self, host: str, itersize=DEFAULT_ITERSIZE):
+        self._side_tables()
+        low, high = subtree_range(host)
+        statement = sql.SQL("SELECT rhost FROM {index} WHERE rhost > %s AND rhost < %s ORDER BY rhost").format(
+            index=self._index_table)
+        for key, in self._stream_sql(statement, (low, high), itersize):
+            yield reverse_host(key)
+
+    def subtree_stats(self, host: str) -> dict:
+        def compute():
+            self._side_tables()
+            cursor = self.conn.connection.cursor()
+            cursor.execute(sql.SQL("SELECT descendants, resolved, no_return FROM {stats} WHERE rhost = %s").format(
+                stats=self._stats_table), (reverse_host(host),))
+            row = cursor.fetchone() or (0,) * len(SUBTREE_COUNTERS)
+            return dict(zip(SUBTREE_COUNTERS, row))
+        return self._read(("subtree_stats", host), ("Domain", "DNSReccord"), compute)
+
+    def hosts_by_ip(self, address: str) -> list[str]:
+        """Hosts with an A or AAAA record pointing at `address`."""
+        query = "MATCH (d:DNSReccord)-[]->(t:IP {address: %s}) RETURN DISTINCT d.host"
+        return self._read((query, address), DNSR_LABELS,
+                          lambda: [t[0] for t in self._cypher(query, params=(address,)).fetchall()])
+
+    def _hosts_by_target(self, field: str, value: str) -> list[str]:
+        label, key, edge_label = DNSR_TARGETS[field]
+        query = f"MATCH (d:DNSReccord)-[:{edge_label}]->(t:{label} {{{key}: %s}}) RETURN d.host"
+        value = normalize_target(value)
+        return self._read((query, value), DNSR_LABELS,
+                          lambda: [t[0] for t in self._cypher(query, params=(value,)).fetchall()])
 
     def sync_domain_node(self, domain: DomainNode):
         """Synchronize a domain and its implicit parent chain to the graph database."""
-        print("[DEBUG] Processing domain chain:")
-        implicit_nodes = domain.get_implicit_nodes()
-        pprint(implicit_nodes)
-        
-        self._create_all_domain_nodes(implicit_nodes)
-        self._create_all_domain_relationships(implicit_nodes)
-        self.conn.commit()
+        log.debug("Processing domain: %r", domain)
+        tree = DomainTree()
+        tree.add(domain)
+        self._write_domain_batch(*tree.drain())
 
-    def _create_all_domain_nodes(self, domains):
-        """Create all domain nodes in the database."""
-        for index, domain in enumerate(domains):
-            domain.is_implicit = index > 0  # First node is not implicit
-            domain.is_root = domain.host == domain.input
-            print(f"[+] Creating node: {domain}")
-            
-            self.conn.execCypher("""
-                MERGE (d:Domain {host: %s})
-                SET d.source = %s,
-                    d.is_implicit = %s,
-                    d.is_root = %s,
-                    d.input = %s
-            """, params=(
-                domain.host,
-                domain.source,
-                domain.is_implicit,
-                domain.is_root,
-                domain.input
-            ))
+    def _write_domain_batch(self, nodes: list[dict], edges: list[tuple[str, str]]):
+        self._side_tables()
+        if nodes:
+            self._exec_batch("""
+                UNWIND $rows AS row
+                MERGE (d:Domain {host: row.host})
+                SET d.source = CASE WHEN d.is_implicit = false THEN d.source ELSE row.source END,
+                    d.is_implicit = coalesce(d.is_implicit, true) AND row.is_implicit,
+                    d.is_root = coalesce(d.is_root, false) OR row.is_root,
+                    d.input = coalesce(d.input, row.input)
+            """, nodes)
 
-    def _create_all_domain_relationships(self, domains):
-        """Create parent-child relationships between domain nodes."""
-        for domain in domains:
-            if not domain.is_root:
-                parent = get_parent_domain_naive(domain.host)
-                print(f"[+] Creating relationship: {parent} -> {domain.host}")
-                
-                self.conn.execCypher("""
-                    MATCH (root:Domain {host: %s})
-                    MATCH (sub:Domain {host: %s})
-                    MERGE (root)-[:HAS_SUBDOMAIN]->(sub)
-                """, params=(parent, domain.host))
+        new = self._index_domains(node["host"] for node in nodes)
+        edges = edges + self._orphaned_children(new, edges)
+        if edges:
+            self._exec_batch("""
+                UNWIND $rows AS row
+                MATCH (root:Domain {host: row.parent})
+                MATCH (sub:Domain {host: row.child})
+                MERGE (root)-[:HAS_SUBDOMAIN]->(sub)
+            """, [{"parent": parent, "child": child} for parent, child in edges])
+
+        self._written(*DOMAIN_LABELS)
+        self._save_checkpoint()
+        self._commit()
 
     def count_domain_node(self):
         query = "MATCH (d:Domain) RETURN count(d)"
-        result = self.conn.execCypher(query).fetchone()
-        return result[0]
+        return self._read((query,), DOMAIN_LABELS, lambda: self._cypher(query).fetchone()[0])
 
     def count_domain_relationships(self) -> int:
         query = "MATCH ()-[r:HAS_SUBDOMAIN]->() RETURN count(r) as count"
-        return self.conn.execCypher(query).fetchone()[0]
+        return self._read((query,), DOMAIN_LABELS, lambda: self._cypher(query).fetchone()[0])
 
-    def dump_all(self):
+    def iter_all(self, itersize=DEFAULT_ITERSIZE):
         query = """
         MATCH (n)
         OPTIONAL MATCH (n)-[r]->(m)
         RETURN n as source, type(r) as relationship, m as target
         """
-        return self.conn.execCypher(query, cols=["source", "relationship", "target"]).fetchall()
-    
-    def dump_dnsr_nodes_with_rel(self):
+        return self._stream(query, ["source", "relationship", "target"], itersize)
+
+    def dump_all(self):
+        return list(self.iter_all())
+
+    def iter_dnsr_nodes_with_rel(self, itersize=DEFAULT_ITERSIZE):
         query = """
         MATCH (n:DNSReccord)
         MATCH (m:Domain)-[r:HAS_DNSR]->(n)
         RETURN n as dnsr_node, r as relationships, m as domain_node
         """
-        return self.conn.execCypher(query, cols=["dnsr_node", "relationships", "domain_node"]).fetchall()
+        return self._stream(query, ["dnsr_node", "relationships", "domain_node"], itersize)
+
+    def dump_dnsr_nodes_with_rel(self):
+        return list(self.iter_dnsr_nodes_with_rel())
 
     def mark_dnsr_node_as_tried(self, host: str) -> str:
+        self._side_tables()
         query = """
         MATCH (n:DNSReccord {host: %s})
         RETURN n
         """
-        result = self.conn.execCypher(query, params=(host,)).fetchone()
-        self.conn.commit()
+        result = self._cypher(query, params=(host,)).fetchone()
+        self._commit()
         
         if not result:
-            print("DEBUG:......")
+            log.debug("No DNSReccord for %s, creating NO_RETURN", host)
             # Create DNS record node and link it to domain
             create_query = """
             MATCH (d:Domain {host: %s})
@@ -121,55 +596,221 @@ class NetGraph:
             CREATE (d)-[:HAS_DNSR]->(n)
             RETURN d, n
             """
-            created = self.conn.execCypher(create_query, params=(host, host), cols=["d", "n"]).fetchone()
+            created = self._cypher(create_query, params=(host, host), cols=["d", "n"]).fetchone()
         
             if not created:
-                print(f"[-] Query failed for: {host}")
+                log.debug("[-] Query failed for: %s", host)
                 return "not_found"
                 
             domain, dnsr = created
             if not domain:
-                print(f"[-] Domain not found: {host}")
+                log.debug("[-] Domain not found: %s", host)
                 return "not_found"
                 
-            print(f"[+] Found domain: {host}")
+            log.debug("[+] Found domain: %s", host)
             if not dnsr:
-                print(f"[-] Failed to create DNSR node for: {host}")
+                log.debug("[-] Failed to create DNSR node for: %s", host)
                 return "not_found"
                 
-            print(f"[+] Created DNSR node and relationship for: {host}")
+            log.debug("[+] Created DNSR node and relationship for: %s", host)
+            self._index_statuses([(host, "NO_RETURN")])
+            self._written("DNSReccord", "HAS_DNSR")
             return "not_found"
         return "found"
     
     
-    def dump_dnsr_nodes_with_status_code(self):
+    def mark_untried_as_no_return(self, hosts, batch_size=None) -> int:
+        """Create NO_RETURN records for every tried host that got no DNS answer.
+
+        The whole attempted host set is sent at once (or in `batch_size`
+        chunks) and the Domain nodes without a HAS_DNSR edge are found and
+        linked to new NO_RETURN records by a single set-based statement.
+        Falls back to `mark_dnsr_node_as_tried` per host if the server
+        rejects the batched query. Returns the number of records created.
+        """
+        self._side_tables()
+        rows = [{"host": host} for host in hosts]
+        chunks = [rows] if not batch_size else [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+        marked = 0
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                cursor = self._exec_batch("""
+                    UNWIND $rows AS row
+                    MATCH (d:Domain {host: row.host})
+                    WHERE NOT EXISTS((d)-[:HAS_DNSR]->(:DNSReccord))
+                    CREATE (d)-[:HAS_DNSR]->(n:DNSReccord {host: row.host, status_code: 'NO_RETURN', timestamp: 0})
+                    RETURN n.host
+                """, chunk)
+                created = [row[0] for row in cursor.fetchall()]
+                self._index_statuses((host, "NO_RETURN") for host in created)
+                self._written("DNSReccord", "HAS_DNSR")
+                marked += len(created)
+                self._commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            self._shared_stats.clear()
+            log.warning("[-] Batched NO_RETURN marking failed (%s), falling back to per host", e)
+            for row in rows:
+                if self.mark_dnsr_node_as_tried(row["host"]) == "not_found":
+                    marked += 1
+                self._commit()
+        return marked
+
+    def iter_dnsr_nodes_with_status_code(self, itersize=DEFAULT_ITERSIZE):
         query = """
         MATCH (n:DNSReccord)
         RETURN n
         """
-        return self.conn.execCypher(query, cols=["n"]).fetchall()
+        return self._stream(query, ["n"], itersize)
 
-    def dump_domain_nodes_with_rel(self):
+    def iter_domain_nodes_with_rel(self, itersize=DEFAULT_ITERSIZE):
         query = """
         MATCH (n:Domain)
         MATCH (n)-[r:HAS_SUBDOMAIN]->(m:Domain)
         RETURN n as root_node, r as relationships, m as sub_node
         """
-        return self.conn.execCypher(query, cols=["root_node", "relationships", "sub_node"]).fetchall()
+        return self._stream(query, ["root_node", "relationships", "sub_node"], itersize)
+
+    def dump_domain_nodes_with_rel(self):
+        return list(self.iter_domain_nodes_with_rel())
+
+    def iter_domain_rows(self, itersize=DEFAULT_ITERSIZE):
+        query = "MATCH (d:Domain) RETURN d.host, d.source, d.input, d.is_implicit, d.is_root"
+        return self._stream(query, ["host", "source", "input", "is_implicit", "is_root"], itersize)
+
+    def iter_subdomain_edges(self, itersize=DEFAULT_ITERSIZE):
+        query = "MATCH (p:Domain)-[:HAS_SUBDOMAIN]->(c:Domain) RETURN p.host, c.host"
+        return self._stream(query, ["parent", "child"], itersize)
 
-    def dump_domains_host(self):
+    def iter_dnsr_edges(self, itersize=DEFAULT_ITERSIZE):
+        query = "MATCH (d:Domain)-[:HAS_DNSR]->(r:DNSReccord) RETURN d.host, r.host"
+        return self._stream(query, ["domain", "dnsr"], itersize)
+
+    def iter_dnsr_rows(self, itersize=DEFAULT_ITERSIZE):
+        # one collect per target edge label, chained so each stays a list per record
+        query = """
+        MATCH (d:DNSReccord)
+        OPTIONAL MATCH (d)-[:HAS_A]->(a:IP)
+        WITH d, collect(a.address) AS a
+        OPTIONAL MATCH (d)-[:HAS_AAAA]->(aaaa:IP)
+        WITH d, a, collect(aaaa.address) AS aaaa
+        OPTIONAL MATCH (d)-[:HAS_CNAME]->(c:CNAMETarget)
+        WITH d, a, aaaa, collect(c.host) AS cname
+        RETURN d.host, d.status_code, d.timestamp, a, aaaa, cname
+        """
+        return self._stream(query, ["host", "status_code", "timestamp", "a", "aaaa", "cname"], itersize)
+
+    def iter_domains_host(self, itersize=DEFAULT_ITERSIZE):
         query = "MATCH (d:Domain) RETURN d.host"
-        back = self.conn.execCypher(query, cols=["d"]).fetchall()
-        return [t[0] for t in back]
+        for row in self._stream(query, ["d"], itersize):
+            yield row[0]
     
     def delete(self):
         age.deleteGraph(self.conn.connection, self.graph_name)
-        self.conn.commit()
+        self._written(*ALL_LABELS)
+        self._commit()
+        self._side_tables_ready = False
 
-    def delete_all_dnsr_nodes(self):
-        query = "MATCH (n:DNSReccord) DETACH DELETE n"
-        self.conn.execCypher(query)
-        self.conn.commit()
+    def _label_tables(self) -> list[tuple]:
+        """(kind, table, sequence) identifiers of every label of this graph, `v` or `e` kind."""
+        cursor = self.conn.connection.cursor()
+        cursor.execute("""
+            SELECT l.name, l.kind, n.nspname, c.relname, l.seq_name FROM ag_catalog.ag_label l
+            JOIN ag_catalog.ag_graph g ON l.graph = g.graphid
+            JOIN pg_class c ON c.oid = l.relation
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE g.name = %s
+        """, (self.graph_name,))
+        return [(name, kind, sql.Identifier(schema, table), sql.Identifier(schema, seq))
+                for name, kind, schema, table, seq in cursor.fetchall()]
+
+    def reset(self):
+        """Empty the graph in place: truncate every label table and restart its id sequence.
+
+        Unlike `delete` the graph, its labels and indexes stay, so there is
+        nothing to recreate and no need to wait for the drop to settle.
+        """
+        labels = self._label_tables()
+        cursor = self.conn.connection.cursor()
+        tables = [table for _, _, table, _ in labels] + [self._index_table, self._stats_table, self._checkpoint_table,
+                                                         self._manifest_table]
+        cursor.execute(sql.SQL(CHECKPOINT_TABLE).format(table=self._checkpoint_table))
+        cursor.execute(sql.SQL(MANIFEST_TABLE).format(table=self._manifest_table))
+        cursor.execute(sql.SQL(SUBTREE_TABLES).format(index=self._index_table, stats=self._stats_table))
+        cursor.execute(sql.SQL("TRUNCATE {tables}").format(tables=sql.SQL(", ").join(tables)))
+        for _, _, _, sequence in labels:
+            cursor.execute(sql.SQL("ALTER SEQUENCE {sequence} RESTART").format(sequence=sequence))
+        self._written(*ALL_LABELS)
+        self._commit()
+        self._side_tables_ready = True
+        log.info("[i] Reset graph %s: truncated %d label tables", self.graph_name, len(labels))
+
+    def delete_label(self, label: str, chunk_size=DEFAULT_DELETE_CHUNK, skip_locked=False, on_chunk=None) -> int:
+        """DETACH DELETE every vertex of `label` in chunks of `chunk_size`, one transaction each.
+
+        Each chunk removes the vertices and every edge touching them, so
+        locks are held briefly and WAL grows per chunk, not per label. With
+        `skip_locked` rows locked by concurrent writers are left alone
+        instead of waited for. `on_chunk` is called with the key values of
+        every chunk's vertices before it commits. Returns the number of
+        vertices deleted.
+        """
+        tables = {name: (kind, table) for name, kind, table, _ in self._label_tables()}
+        if label not in tables:
+            return 0
+        kind, table = tables[label]
+        if kind != "v":
+            raise ValueError(f"Not a vertex label: {label}")
+        edges = sql.Identifier(self.graph_name, "_ag_label_edge")
+        lock = sql.SQL("FOR UPDATE SKIP LOCKED" if skip_locked else "")
+        returning = sql.SQL("")
+        if on_chunk is not None:
+            returning = sql.SQL("RETURNING agtype_access_operator(VARIADIC ARRAY[properties, {key}::agtype])").format(
+                key=sql.Literal(json.dumps(VERTEX_KEYS[label])))
+        statement = sql.SQL("""
+            WITH doomed AS (SELECT id FROM {table} LIMIT %s {lock}),
+            outgoing AS (DELETE FROM {edges} WHERE start_id IN (SELECT id FROM doomed)),
+            incoming AS (DELETE FROM {edges} WHERE end_id IN (SELECT id FROM doomed))
+            DELETE FROM {table} WHERE id IN (SELECT id FROM doomed) {returning}
+        """).format(table=table, edges=edges, lock=lock, returning=returning)
+
+        cursor = self.conn.connection.cursor()
+        cursor.execute(sql.SQL("SELECT count(*) FROM {table}").format(table=table))
+        total = cursor.fetchone()[0]
+        deleted = 0
+        start = time.perf_counter()
+        while True:
+            cursor.execute(statement, (chunk_size,))
+            if on_chunk is not None:
+                on_chunk([key for key, in cursor.fetchall()])
+            self._written(label, *EDGE_LABELS)
+            self._commit()
+            if cursor.rowcount <= 0:
+                break
+            deleted += cursor.rowcount
+            log.info("[i] Deleted %d/%d %s nodes (%.0f/sec)", deleted, total, label,
+                     deleted / max(time.perf_counter() - start, 1e-9))
+        if deleted < total:
+            log.warning("[-] %d %s nodes were locked or added meanwhile and are left", total - deleted, label)
+        return deleted
+
+    def delete_all_dnsr_nodes(self, chunk_size=DEFAULT_DELETE_CHUNK, skip_locked=False):
+        """Delete every DNS record; each chunk resets the statuses of exactly the records it removed.
+
+        Records skipped as locked or written meanwhile keep their status, so
+        the rolled-up counters stay in step with the graph.
+        """
+        self._side_tables()
+        deleted = self.delete_label("DNSReccord", chunk_size, skip_locked,
+                                    on_chunk=lambda hosts: self._index_statuses((host, None) for host in hosts))
+        self._written(*DNSR_LABELS)
+        self._commit()
+        return deleted
 
     def close(self):
-        self.conn.close() 
\ No newline at end of file
+        if self.pool is not None:
+            self.pool.putconn(self.conn)
+        else:
+            self.conn.close() 
\ No newline at end of file
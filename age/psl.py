@@ -0,0 +1,161 @@
+import os
+from functools import lru_cache
+
+PSL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+CACHE_SIZE = 1 << 16
+
+_RULE = 1
+_EXCEPTION = 2
+
+
+class PublicSuffixList:
+    """Public Suffix List rules in a trie keyed by reversed labels.
+
+    Only the last few labels of a host can match a rule, so lookups are
+    memoized on that tail: millions of hosts under the same registrable
+    domain cost one trie walk and one entry of a bounded LRU.
+    """
+    def __init__(self, lines, cache_size=CACHE_SIZE):
+        self._root = {}
+        for line in lines:
+            rule = line.strip().split(maxsplit=1)[0] if line.strip() else ""
+            if not rule or rule.startswith("//"):
+                continue
+            flag = _RULE
+            if rule.startswith("!"):
+                flag, rule = _EXCEPTION, rule[1:]
+            labels = rule.lower().split(".")
+            node = self._root
+            for label in reversed(labels):
+                node = node.setdefault(label, {})
+            # "" can never be a label, so it marks the rule type
+            node[""] = flag
+        self._suffix_labels = lru_cache(maxsize=cache_size)(self._suffix_labels)
+
+    @classmethod
+    def load(cls, path=PSL_PATH, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f, **kwargs)
+
+    def _suffix_labels(self, tail: str) -> tuple[int, bool]:
+        """Labels in the public suffix of `tail`, and whether more labels
+        to the left could still change the answer (False) or not (True)."""
+        labels = tail.split(".")
+        length = 1  # the implicit "*" rule: an unknown TLD is a suffix
+        node = self._root
+        for depth, label in enumerate(reversed(labels)):
+            child = node.get(label)
+            if child is None:
+                child = node.get("*")
+                if child is None:
+                    return length, True
+            flag = child.get("")
+            if flag == _EXCEPTION:
+                return depth, True
+            if flag == _RULE:
+                length = depth + 1
+            node = child
+        return length, len(node) == ("" in node)
+
+    def _split(self, host: str):
+        """Return the normalized host, the offsets where each suffix starts,
+        the number of labels in its public suffix and the number of trailing
+        labels that decided it (None if labels to the left still could).
+
+        The trie walk is memoized on the shortest tail of the host that
+        decides it, usually the last two labels, so it is shared by every
+        host under the same registrable domain.
+        """
+        host = host.lower().rstrip(".")
+        starts = [0]
+        pos = host.find(".")
+        while pos >= 0:
+            starts.append(pos + 1)
+            pos = host.find(".", pos + 1)
+        depth = 2
+        while True:
+            tail = host[starts[-depth]:] if depth < len(starts) else host
+            suffix, decided = self._suffix_labels(tail)
+            if decided or depth >= len(starts):
+                return host, starts, suffix, min(depth, len(starts)) if decided else None
+            depth += 1
+
+    def public_suffix(self, host: str) -> str:
+        host, starts, suffix, _ = self._split(host)
+        return host[starts[-suffix]:] if suffix <= len(starts) else host
+
+    def registrable_domain(self, host: str):
+        """The domain one label below the public suffix, or None for a suffix itself."""
+        host, starts, suffix, _ = self._split(host)
+        if len(starts) <= suffix:
+            return None
+        return host[starts[-suffix - 1]:]
+
+    def _parent_chain(self, host: str) -> tuple[tuple, int]:
+        """`parent_chain` plus how many of its leading hosts are decided by
+        their own labels, so any host below them has the same suffix."""
+        host, starts, suffix, decided = self._split(host)
+        if len(starts) <= suffix:
+            return (), 0
+        chain = tuple(host[start:] for start in starts[:len(starts) - suffix])
+        return chain, 0 if decided is None else min(len(chain), len(starts) - decided + 1)
+
+    def parent_chain(self, host: str) -> tuple:
+        """The host and all its parents down to the registrable domain."""
+        return self._parent_chain(host)[0]
+
+    def parent_chains(self, hosts, memo_size=CACHE_SIZE * 16) -> list[tuple]:
+        """`parent_chain` for many hosts in one call.
+
+        Chains are memoized per parent for the duration of the call, so a
+        host whose parent was already seen costs one slice and a tuple
+        concatenation instead of a full split. Only parents whose own labels
+        decide the public suffix are memoized: below `amazonaws.com` sits the
+        private suffix `s3.amazonaws.com`, so its chain says nothing about
+        its children.
+        """
+        memo = {}
+        chains = []
+        append = chains.append
+        for host in hosts:
+            chain = memo.get(host)
+            if chain is None:
+                host = host.lower().rstrip(".")
+                parent = memo.get(host[host.find(".") + 1:])
+                if parent:
+                    chain = (host,) + parent
+                    memo[host] = chain
+                else:
+                    chain, decided = self._parent_chain(host)
+                    if len(memo) >= memo_size:
+                        memo.clear()
+                    for i in range(decided):
+                        memo[chain[i]] = chain[i:]
+            append(chain)
+        return chains
+
+    def cache_info(self):
+        return self._suffix_labels.cache_info()
+
+
+_default = None
+
+
+def default_psl() -> PublicSuffixList:
+    """The bundled list, loaded once per process."""
+    global _default
+    if _default is None:
+        _default = PublicSuffixList.load()
+    return _default
+
+
+def registrable_domain(host: str):
+    return default_psl().registrable_domain(host)
+
+
+def parent_chain(host: str) -> tuple:
+    return default_psl().parent_chain(host)
+
+
+def parent_chains(hosts) -> list[tuple]:
+    return default_psl().parent_chains(hosts)
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+
+# total result rows held at once, so a few large results cannot pile up
+DEFAULT_MAX_ROWS = 100000
+DEFAULT_TTL = 30.0
+
+
+def _copy(value):
+    return value.copy() if isinstance(value, (list, dict, set)) else value
+
+
+def _rows(value) -> int:
+    return len(value) if isinstance(value, (list, dict, set)) else 1
+
+
+class QueryCache:
+    """TTL + LRU cache for read query results with per label generations.
+
+    Every entry remembers the generation of each label it read; a write that
+    bumps one of those labels with `invalidate()` makes the entry stale
+    without touching any other cached result. Entries also expire after
+    `ttl` seconds, which covers writes made by other processes. The cache is
+    bounded by the rows of all entries together (a scalar counts as one), the
+    least recently used go first and a result over `max_rows` is not kept.
+    """
+    def __init__(self, max_rows=DEFAULT_MAX_ROWS, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _snapshot(self, labels) -> tuple:
+        return tuple(self._generations.get(label, 0) for label in labels)
+
+    def get(self, key, labels):
+        """Return (True, value) for a fresh entry, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, generations, value = entry
+                if generations != self._snapshot(labels):
+                    self.stale += 1
+                    self._drop(key)
+                elif expires < self.clock():
+                    self.expired += 1
+                    self._drop(key)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return True, value
+            self.misses += 1
+            return False, None
+
+    def put(self, key, labels, value, generations=None):
+        """Store `value`; pass the `generations()` taken before the read so a concurrent write is not masked."""
+        rows = _rows(value)
+        if rows > self.max_rows:
+            return
+        with self._lock:
+            if generations is not None and generations != self._snapshot(labels):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl, self._snapshot(labels), value)
+            self._rows += rows
+            while self._rows > self.max_rows:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self._rows -= _rows(self._entries.pop(key)[2])
+
+    def generations(self, labels) -> tuple:
+        with self._lock:
+            return self._snapshot(labels)
+
+    def get_or_compute(self, key, labels, compute):
+        """Cached `compute()` for `key`, which reads the given labels.
+
+        Lists, dicts and sets are handed out as shallow copies, so a caller
+        mutating its result never changes the cached one.
+        """
+        hit, value = self.get(key, labels)
+        if hit:
+            return _copy(value)
+        generations = self.generations(labels)
+        value = compute()
+        self.put(key, labels, value, generations)
+        return _copy(value)
+
+    def invalidate(self, *labels):
+        """Bump the generation of every written label."""
+        with self._lock:
+            for label in labels:
+                self._generations[label] = self._generations.get(label, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "rows": self._rows,
+                "max_rows": self.max_rows,
+            }
+
+
+# shared by every NetGraph in the process, keys and labels carry the graph name
+query_cache = QueryCache()
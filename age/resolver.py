@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import socket
+import time
+from datetime import datetime, timezone
+from dns_reccord_node import DNSReccordNode, EMPTY
+from graph_store import DEFAULT_BATCH_SIZE
+
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 200
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_QUEUE_SIZE = 2000
+
+
+def make_record(host, status_code, a=EMPTY, aaaa=EMPTY, cname=EMPTY, ns=EMPTY, mx=EMPTY) -> DNSReccordNode:
+    return DNSReccordNode(
+        host=host,
+        status_code=status_code,
+        a=a,
+        aaaa=aaaa,
+        mx=mx,
+        ns=ns,
+        txt=EMPTY,
+        cname=cname,
+        soa=EMPTY,
+        ptr=EMPTY,
+        spf=EMPTY,
+        dkim=EMPTY,
+        dmarc=EMPTY,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+async def getaddrinfo_resolver(host: str) -> DNSReccordNode:
+    """A/AAAA only resolver on top of the system resolver, no dependencies."""
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        return make_record(host, "NXDOMAIN" if e.errno == socket.EAI_NONAME else "SERVFAIL")
+    a = sorted({info[4][0] for info in infos if info[0] == socket.AF_INET})
+    aaaa = sorted({info[4][0] for info in infos if info[0] == socket.AF_INET6})
+    return make_record(host, "NOERROR", a=a, aaaa=aaaa)
+
+
+class AiodnsResolver:
+    """Full A/AAAA/CNAME/NS/MX resolver, used when aiodns is installed."""
+    def __init__(self, nameservers=None, timeout=DEFAULT_TIMEOUT):
+        self.resolver = aiodns.DNSResolver(nameservers=nameservers, timeout=timeout)
+
+    async def _query(self, host, qtype):
+        try:
+            return await self.resolver.query(host, qtype)
+        except aiodns.error.DNSError as e:
+            return e
+
+    async def __call__(self, host: str) -> DNSReccordNode:
+        qtypes = ("A", "AAAA", "CNAME", "NS", "MX")
+        answers = dict(zip(qtypes, await asyncio.gather(*(self._query(host, q) for q in qtypes))))
+        errors = [answer for answer in answers.values() if isinstance(answer, aiodns.error.DNSError)]
+        if len(errors) == len(qtypes):
+            not_found = any(e.args and e.args[0] == aiodns.error.ARES_ENOTFOUND for e in errors)
+            return make_record(host, "NXDOMAIN" if not_found else "SERVFAIL")
+
+        def values(qtype, attr):
+            answer = answers[qtype]
+            if isinstance(answer, aiodns.error.DNSError):
+                return EMPTY
+            if not isinstance(answer, list):
+                answer = [answer]
+            return [getattr(item, attr) for item in answer]
+
+        return make_record(
+            host, "NOERROR",
+            a=values("A", "host"),
+            aaaa=values("AAAA", "host"),
+            cname=values("CNAME", "cname"),
+            ns=values("NS", "host"),
+            mx=values("MX", "host"),
+        )
+
+
+def default_resolver(timeout=DEFAULT_TIMEOUT):
+    """The best resolver available; its own query `timeout` matches the per lookup one."""
+    return AiodnsResolver(timeout=timeout) if aiodns is not None else getaddrinfo_resolver
+
+
+async def resolve_into_graph(hosts, write_batch, resolver=None, concurrency=DEFAULT_CONCURRENCY,
+                             timeout=DEFAULT_TIMEOUT, queue_size=DEFAULT_QUEUE_SIZE,
+                             batch_size=DEFAULT_BATCH_SIZE) -> dict:
+    """Resolve hosts concurrently and hand the records to `write_batch` in batches.
+
+    `resolver` is any `async (host) -> DNSReccordNode` callable, so tests can
+    inject a stub. At most `concurrency` lookups are in flight; results pass
+    through a bounded queue to a single writer, whose blocking `write_batch`
+    (e.g. `NetGraph.sync_dnsr_nodes`) runs in a thread so resolution and
+    ingest overlap. A lookup that times out or raises is recorded as
+    `TIMEOUT` or `ERROR` and the run goes on. Returns counters by status code.
+    """
+    resolver = resolver or default_resolver(timeout)
+    queue = asyncio.Queue(maxsize=queue_size)
+    pending_hosts = iter(hosts)
+    stats = {"resolved": 0, "written": 0, "batches": 0}
+
+    async def lookup():
+        for host in pending_hosts:
+            try:
+                record = await asyncio.wait_for(resolver(host), timeout)
+            except asyncio.TimeoutError:
+                record = make_record(host, "TIMEOUT")
+            except Exception as e:
+                # e.g. UnicodeError for an empty or over long label, one bad host must not end the run
+                log.debug("[-] Lookup of %r failed: %r", host, e)
+                record = make_record(host, "ERROR")
+            stats[record.status_code] = stats.get(record.status_code, 0) + 1
+            stats["resolved"] += 1
+            await queue.put(record)
+
+    async def writer():
+        loop = asyncio.get_running_loop()
+        batch = []
+        while True:
+            record = await queue.get()
+            if record is not None:
+                batch.append(record)
+            if batch and (record is None or len(batch) >= batch_size):
+                await loop.run_in_executor(None, write_batch, batch)
+                stats["written"] += len(batch)
+                stats["batches"] += 1
+                batch = []
+            if record is None:
+                return
+
+    start = time.perf_counter()
+    writer_task = asyncio.create_task(writer())
+    lookups = asyncio.gather(*(lookup() for _ in range(concurrency)))
+    # a failed write must not leave the lookups blocked on a full queue
+    writer_task.add_done_callback(lambda task: task.cancelled() or task.exception() is None or lookups.cancel())
+    try:
+        await lookups
+    except asyncio.CancelledError:
+        if writer_task.done():
+            writer_task.result()
+        raise
+    await queue.put(None)
+    await writer_task
+
+    elapsed = time.perf_counter() - start
+    rate = stats["resolved"] / elapsed if elapsed > 0 else 0
+    log.info("[i] Resolved %d hosts in %.2fs (%.0f hosts/sec)", stats['resolved'], elapsed, rate)
+    return stats
+
+
+def resolve_and_sync(ng, hosts, **kwargs) -> dict:
+    """Resolve `hosts` and write the records to NetGraph `ng` as they arrive."""
+    return asyncio.run(resolve_into_graph(hosts, ng.sync_dnsr_nodes, **kwargs))
@@ -0,0 +1,324 @@
+import json
+import sqlite3
+from checkpoint import Checkpoint, CHECKPOINT_COLUMNS
+from graph_store import (GraphStore, DEFAULT_ITERSIZE, DEFAULT_DELETE_CHUNK, DNSR_TARGET_FIELDS, SUBTREE_COUNTERS, normalize_target,
+                         reverse_host, subtree_range, rollup, status_changes)
+
+DEFAULT_DB = "../out/graph.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS domain (
+    host TEXT PRIMARY KEY,
+    source TEXT,
+    is_implicit INTEGER,
+    is_root INTEGER,
+    input TEXT,
+    first_seen INTEGER,
+    last_changed INTEGER,
+    sources TEXT,
+    removed_at INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS has_subdomain (
+    parent TEXT NOT NULL,
+    child TEXT NOT NULL,
+    PRIMARY KEY (parent, child)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS has_subdomain_child ON has_subdomain (child);
+CREATE TABLE IF NOT EXISTS dnsr (
+    host TEXT PRIMARY KEY,
+    timestamp TEXT,
+    status_code TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dnsr_target (
+    host TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (host, field, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS dnsr_target_value ON dnsr_target (field, value);
+CREATE TABLE IF NOT EXISTS domain_index (
+    rhost TEXT PRIMARY KEY,
+    status TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS domain_stats (
+    rhost TEXT PRIMARY KEY,
+    descendants INTEGER NOT NULL DEFAULT 0,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    no_return INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingest_checkpoint (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    "offset" INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    malformed INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS domain_manifest (
+    host TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# scan history columns of `apply_domain_delta`, added to graph files created before them
+HISTORY_COLUMNS = {"first_seen": "INTEGER", "last_changed": "INTEGER", "sources": "TEXT", "removed_at": "INTEGER"}
+
+
+class SQLiteGraph(GraphStore):
+    """Embedded single-file graph backend, no server needed.
+
+    Vertices and edges are plain tables keyed by host, so every MERGE becomes
+    an indexed upsert. WAL mode lets readers run while a batch is written.
+    A HAS_DNSR edge is implied by a `dnsr` row whose host has a `domain` row.
+    `domain_index` and `domain_stats` mirror the AGE backend's reversed host
+    index and rolled-up subtree counters.
+    """
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        # the resolver writes batches from a worker thread, one at a time
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.ensure_schema()
+
+    def ensure_schema(self) -> bool:
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(domain)")}
+        for column, kind in HISTORY_COLUMNS.items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE domain ADD COLUMN {column} {kind}")
+        if (not self.conn.execute("SELECT EXISTS (SELECT 1 FROM domain_index)").fetchone()[0]
+                and self.conn.execute("SELECT EXISTS (SELECT 1 FROM domain)").fetchone()[0]):
+            self.rebuild_domain_index()
+        return True
+
+    def _write_domain_batch(self, nodes: list[dict], edges: list[tuple[str, str]]):
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO domain (host, source, is_implicit, is_root, input)
+                VALUES (:host, :source, :is_implicit, :is_root, :input)
+                ON CONFLICT (host) DO UPDATE SET
+                    source = CASE WHEN domain.is_implicit THEN excluded.source ELSE domain.source END,
+                    is_implicit = domain.is_implicit AND excluded.is_implicit,
+                    is_root = domain.is_root OR excluded.is_root
+            """, nodes)
+            self.conn.executemany("INSERT OR IGNORE INTO has_subdomain (parent, child) VALUES (?, ?)", edges)
+            new = self._index_domains(node["host"] for node in nodes)
+            self.conn.executemany("INSERT OR IGNORE INTO has_subdomain (parent, child) VALUES (?, ?)",
+                                  self._orphaned_children(new, edges))
+            self._save_checkpoint()
+
+    def _write_dnsr_batch(self, records: list[dict], targets: dict[str, set]):
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO dnsr (host, timestamp, status_code)
+                VALUES (:host, :timestamp, :status_code)
+                ON CONFLICT (host) DO UPDATE SET
+                    timestamp = excluded.timestamp,
+                    status_code = excluded.status_code
+            """, records)
+            for field, edges in targets.items():
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO dnsr_target (host, field, value) VALUES (?, ?, ?)",
+                    ((host, field, value) for host, value in edges))
+            self._index_statuses((record["host"], record["status_code"]) for record in records)
+            self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        if self.checkpoint is None:
+            return
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO ingest_checkpoint ({', '.join(map(json.dumps, CHECKPOINT_COLUMNS))}) "
+            f"VALUES ({', '.join('?' * len(CHECKPOINT_COLUMNS))})", self.checkpoint.row())
+
+    def load_checkpoint(self, name: str):
+        row = self.conn.execute(
+            f"SELECT {', '.join(map(json.dumps, CHECKPOINT_COLUMNS))} FROM ingest_checkpoint WHERE name = ?",
+            (name,)).fetchone()
+        return Checkpoint(*row) if row else None
+
+    def _write_delta_batch(self, seen: list[dict], removed: list[str], seen_at: int):
+        with self.conn:
+            self.conn.executemany("""
+                UPDATE domain SET first_seen = coalesce(first_seen, ?), last_changed = ?, sources = ?, removed_at = NULL
+                WHERE host = ?
+            """, ((seen_at, seen_at, json.dumps(row["sources"]), row["host"]) for row in seen))
+            self.conn.executemany("UPDATE domain SET removed_at = ? WHERE host = ?",
+                                  ((seen_at, host) for host in removed))
+            self.conn.executemany("INSERT OR REPLACE INTO domain_manifest (host, fingerprint) VALUES (?, ?)",
+                                  ((row["host"], row["fingerprint"]) for row in seen))
+            self.conn.executemany("DELETE FROM domain_manifest WHERE host = ?", ((host,) for host in removed))
+
+    def load_fingerprints(self) -> dict[str, int]:
+        return {host: int(value, 16) for host, value in self.conn.execute("SELECT host, fingerprint FROM domain_manifest")}
+
+    def _index_domains(self, hosts):
+        keys = sorted({reverse_host(host) for host in hosts})
+        new = self.conn.execute("""
+            INSERT INTO domain_index (rhost) SELECT value FROM json_each(?) WHERE true
+            ON CONFLICT DO NOTHING RETURNING rhost
+        """, (json.dumps(keys),)).fetchall()
+        self._bump_stats(rollup((key, "descendants", 1) for key, in new))
+        return [key for key, in new]
+
+    def _orphaned_children(self, new_keys, edges):
+        """(parent, child) edges from nodes new to the graph to direct children already in it.
+
+        With overlapping inputs a child can join before its parent, in an
+        earlier batch or before a resume, where the writing tree no longer
+        knows it.
+        """
+        children = self.conn.execute("""
+            SELECT p.value, c.rhost FROM json_each(?) AS p
+            JOIN domain_index AS c ON c.rhost > p.value || '.' AND c.rhost < p.value || '/'
+            WHERE instr(substr(c.rhost, length(p.value) + 2), '.') = 0
+        """, (json.dumps(new_keys),))
+        edges = set(edges)
+        return [edge for edge in ((reverse_host(parent), reverse_host(child)) for parent, child in children)
+                if edge not in edges]
+
+    def _index_statuses(self, statuses):
+        rows = {reverse_host(host): status for host, status in statuses}
+        old = dict(self.conn.execute(
+            "SELECT rhost, status FROM domain_index WHERE rhost IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(rows)),)))
+        changed = [(key, old[key], status) for key, status in rows.items() if key in old and old[key] != status]
+        self.conn.executemany("UPDATE domain_index SET status = ? WHERE rhost = ?",
+                              ((status, key) for key, _, status in changed))
+        self._bump_stats(rollup(status_changes(changed)))
+
+    def _bump_stats(self, deltas):
+        self.conn.executemany("""
+            INSERT INTO domain_stats (rhost, descendants, resolved, no_return) VALUES (?, ?, ?, ?)
+            ON CONFLICT (rhost) DO UPDATE SET
+                descendants = descendants + excluded.descendants,
+                resolved = resolved + excluded.resolved,
+                no_return = no_return + excluded.no_return
+        """, deltas)
+
+    def rebuild_domain_index(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM domain_index")
+            self.conn.execute("DELETE FROM domain_stats")
+            self._index_domains(row[0] for row in self.conn.execute("SELECT host FROM domain"))
+            self._index_statuses(self.conn.execute("SELECT host, status_code FROM dnsr").fetchall())
+
+    def iter_descendants(self, host: str, itersize=DEFAULT_ITERSIZE):
+        low, high = subtree_range(host)
+        cursor = self.conn.execute(
+            "SELECT rhost FROM domain_index WHERE rhost > ? AND rhost < ? ORDER BY rhost", (low, high))
+        cursor.arraysize = itersize
+        for key, in cursor:
+            yield reverse_host(key)
+
+    def subtree_stats(self, host: str) -> dict:
+        row = self.conn.execute("SELECT descendants, resolved, no_return FROM domain_stats WHERE rhost = ?",
+                                (reverse_host(host),)).fetchone()
+        return dict(zip(SUBTREE_COUNTERS, row or (0,) * len(SUBTREE_COUNTERS)))
+
+    def mark_untried_as_no_return(self, hosts, batch_size=None) -> int:
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS tried (host TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM tried")
+            self.conn.executemany("INSERT OR IGNORE INTO tried (host) VALUES (?)", ((host,) for host in hosts))
+            cursor = self.conn.execute("""
+                INSERT INTO dnsr (host, timestamp, status_code)
+                SELECT d.host, 0, 'NO_RETURN' FROM tried t
+                JOIN domain d ON d.host = t.host
+                WHERE NOT EXISTS (SELECT 1 FROM dnsr r WHERE r.host = d.host)
+                RETURNING host
+            """)
+            created = cursor.fetchall()
+            self._index_statuses((host, "NO_RETURN") for host, in created)
+        return len(created)
+
+    def count_domain_node(self) -> int:
+        return self.conn.execute("SELECT count(*) FROM domain").fetchone()[0]
+
+    def count_domain_relationships(self) -> int:
+        return self.conn.execute("SELECT count(*) FROM has_subdomain").fetchone()[0]
+
+    def iter_domains_host(self, itersize=DEFAULT_ITERSIZE):
+        cursor = self.conn.execute("SELECT host FROM domain")
+        cursor.arraysize = itersize
+        for row in cursor:
+            yield row[0]
+
+    def iter_dnsr_nodes_with_status_code(self, itersize=DEFAULT_ITERSIZE):
+        cursor = self.conn.execute("SELECT host, status_code, timestamp FROM dnsr")
+        cursor.arraysize = itersize
+        yield from cursor
+
+    def _iter(self, query, itersize):
+        cursor = self.conn.execute(query)
+        cursor.arraysize = itersize
+        return cursor
+
+    def iter_domain_rows(self, itersize=DEFAULT_ITERSIZE):
+        for host, source, input_, is_implicit, is_root in self._iter(
+                "SELECT host, source, input, is_implicit, is_root FROM domain", itersize):
+            yield host, source, input_, bool(is_implicit), bool(is_root)
+
+    def iter_subdomain_edges(self, itersize=DEFAULT_ITERSIZE):
+        return self._iter("SELECT parent, child FROM has_subdomain", itersize)
+
+    def iter_dnsr_edges(self, itersize=DEFAULT_ITERSIZE):
+        return self._iter("SELECT d.host, r.host FROM dnsr r JOIN domain d ON d.host = r.host", itersize)
+
+    def iter_dnsr_rows(self, itersize=DEFAULT_ITERSIZE):
+        rows = self._iter("""
+            SELECT r.host, r.status_code, r.timestamp,
+                (SELECT json_group_array(value) FROM dnsr_target t WHERE t.host = r.host AND t.field = 'a'),
+                (SELECT json_group_array(value) FROM dnsr_target t WHERE t.host = r.host AND t.field = 'aaaa'),
+                (SELECT json_group_array(value) FROM dnsr_target t WHERE t.host = r.host AND t.field = 'cname')
+            FROM dnsr r
+        """, itersize)
+        for host, status_code, timestamp, a, aaaa, cname in rows:
+            yield host, status_code, timestamp, json.loads(a), json.loads(aaaa), json.loads(cname)
+
+    def hosts_by_ip(self, address: str) -> list[str]:
+        rows = self.conn.execute(
+            "SELECT DISTINCT host FROM dnsr_target WHERE field IN ('a', 'aaaa') AND value = ?",
+            (normalize_target(address),))
+        return [row[0] for row in rows]
+
+    def _hosts_by_target(self, field: str, value: str) -> list[str]:
+        if field not in DNSR_TARGET_FIELDS:
+            raise ValueError(f"Unknown record field: {field}")
+        rows = self.conn.execute(
+            "SELECT host FROM dnsr_target WHERE field = ? AND value = ?",
+            (field, normalize_target(value)))
+        return [row[0] for row in rows]
+
+    def delete(self):
+        with self.conn:
+            for table in ("dnsr_target", "dnsr", "has_subdomain", "domain", "domain_index", "domain_stats",
+                          "ingest_checkpoint", "domain_manifest"):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def reset(self):
+        self.delete()
+
+    def delete_all_dnsr_nodes(self, chunk_size=DEFAULT_DELETE_CHUNK, skip_locked=False):
+        """Delete every DNS record in chunks, each resetting the statuses of exactly the records it removed.
+
+        Other writers get in between the chunks; whatever they write keeps its
+        status, so the rolled-up counters stay in step with the records.
+        """
+        deleted = 0
+        while True:
+            with self.conn:
+                hosts = [host for host, in self.conn.execute(
+                    "DELETE FROM dnsr WHERE host IN (SELECT host FROM dnsr LIMIT ?) RETURNING host", (chunk_size,))]
+                self.conn.execute("DELETE FROM dnsr_target WHERE host IN (SELECT value FROM json_each(?))",
+                                  (json.dumps(hosts),))
+                self._index_statuses((host, None) for host in hosts)
+            deleted += len(hosts)
+            if len(hosts) < chunk_size:
+                return deleted
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,128 @@
+import json
+import math
+import re
+import threading
+import time
+
+# latency histogram bucket upper bounds in seconds, Prometheus style
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_template(query: str) -> str:
+    """Collapse whitespace so every call of the same statement shares one key."""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class QueryStats:
+    """Per query template latency histograms, row counts, commits and batch sizes.
+
+    Recording is a few dict updates under a lock, cheap enough to stay on in
+    the ingest hot loops; threads of the sharded writer share one instance.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.queries = {}
+        self.commits = 0
+        self.commit_seconds = 0.0
+        self.batches = 0
+        self.batch_rows = 0
+        self.max_batch = 0
+
+    def observe(self, query: str, seconds: float, rows: int = 0, batch: int = None):
+        template = query_template(query)
+        with self._lock:
+            entry = self.queries.get(template)
+            if entry is None:
+                entry = self.queries[template] = {
+                    "count": 0, "seconds": 0.0, "rows": 0, "buckets": [0] * len(LATENCY_BUCKETS)}
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["rows"] += max(rows, 0)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+                    break
+            if batch is not None:
+                self.batches += 1
+                self.batch_rows += batch
+                self.max_batch = max(self.max_batch, batch)
+
+    def observe_commit(self, seconds: float):
+        with self._lock:
+            self.commits += 1
+            self.commit_seconds += seconds
+
+    def summary(self) -> dict:
+        with self._lock:
+            queries = {
+                template: {
+                    "count": entry["count"],
+                    "seconds": entry["seconds"],
+                    "mean_ms": 1000 * entry["seconds"] / entry["count"],
+                    "rows": entry["rows"],
+                    "buckets": dict(zip(map(str, LATENCY_BUCKETS), entry["buckets"])),
+                }
+                for template, entry in self.queries.items()
+            }
+            return {
+                "elapsed": time.time() - self.started,
+                "commits": self.commits,
+                "commit_seconds": self.commit_seconds,
+                "batches": self.batches,
+                "batch_rows": self.batch_rows,
+                "max_batch": self.max_batch,
+                "queries": queries,
+            }
+
+    def to_prometheus(self) -> str:
+        """Render in the node_exporter textfile format."""
+        summary = self.summary()
+        lines = [
+            "# TYPE netgraph_commits_total counter",
+            f"netgraph_commits_total {summary['commits']}",
+            "# TYPE netgraph_commit_seconds_total counter",
+            f"netgraph_commit_seconds_total {summary['commit_seconds']}",
+            "# TYPE netgraph_batch_rows_total counter",
+            f"netgraph_batch_rows_total {summary['batch_rows']}",
+            "# TYPE netgraph_batches_total counter",
+            f"netgraph_batches_total {summary['batches']}",
+            "# TYPE netgraph_query_seconds histogram",
+        ]
+        for template, entry in summary["queries"].items():
+            label = 'query="%s"' % template.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, count in entry["buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == "inf" else bound
+                lines.append(f'netgraph_query_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"netgraph_query_seconds_sum{{{label}}} {entry['seconds']}")
+            lines.append(f"netgraph_query_seconds_count{{{label}}} {entry['count']}")
+        lines.append("# TYPE netgraph_query_rows_total counter")
+        for template, entry in summary["queries"].items():
+            label = 'query="%s"' % template.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f"netgraph_query_rows_total{{{label}}} {entry['rows']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write Prometheus textfile output for `*.prom`, JSON otherwise."""
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2)
+
+    def print_summary(self, top: int = 10):
+        summary = self.summary()
+        print(f"[i] {summary['commits']} commits ({summary['commit_seconds']:.2f}s), "
+              f"{summary['batches']} batches, {summary['batch_rows']} batch rows, max batch {summary['max_batch']}")
+        ranked = sorted(summary["queries"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+        for template, entry in ranked[:top]:
+            print(f"[i] {entry['seconds']:8.2f}s {entry['count']:>8}x {entry['mean_ms']:8.2f}ms "
+                  f"{entry['rows']:>10} rows  {template[:100]}")
+
+
+# shared by every NetGraph in the process unless one is passed explicitly
+query_stats = QueryStats()
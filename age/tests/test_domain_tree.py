@@ -0,0 +1,52 @@
+import pytest
+from domain_node import DomainNode
+from domain_tree import DomainTree
+
+
+def edges_after(*hosts):
+    tree = DomainTree()
+    edges = []
+    for host in hosts:
+        tree.add(DomainNode(host, host, "subfinder"))
+        edges += tree.drain()[1]
+    return edges
+
+
+@pytest.mark.parametrize("hosts", [("example.com", "b.example.com"), ("b.example.com", "example.com")])
+def test_overlapping_inputs_link_in_either_order(hosts):
+    assert edges_after(*hosts) == [("example.com", "b.example.com")]
+
+
+def test_chain_below_input_is_linked_once():
+    tree = DomainTree()
+    tree.add(DomainNode("x.a.example.com", "example.com", "subfinder"))
+    tree.add(DomainNode("y.a.example.com", "example.com", "subfinder"))
+    nodes, edges = tree.drain()
+    assert sorted(edges) == [("a.example.com", "x.a.example.com"), ("a.example.com", "y.a.example.com"),
+                             ("example.com", "a.example.com")]
+    assert len(nodes) == len(tree) == 4
+
+
+def test_explicit_flag_and_sources():
+    tree = DomainTree()
+    tree.add(DomainNode("a.example.com", "example.com", "subfinder"))
+    tree.add(DomainNode("example.com", "example.com", "crtsh"))
+    tree.add(DomainNode("example.com", "example.com", "subfinder"))
+    rows = {row["host"]: row for row in tree.drain()[0]}
+    assert rows["example.com"]["is_implicit"] is False
+    assert rows["example.com"]["is_root"] is True
+    assert tree.sources("example.com") == {"crtsh", "subfinder"}
+
+
+def test_roots_do_not_wait_on_public_suffixes():
+    tree = DomainTree()
+    for i in range(100):
+        tree.add(DomainNode(f"www.site{i}.com", f"site{i}.com", "subfinder"))
+        tree.add(DomainNode(f"site{i}.co.uk", f"site{i}.co.uk", "subfinder"))
+    tree.add(DomainNode("b.example.com", "b.example.com", "subfinder"))
+    tree.drain()
+    # only the overlapping input can still be linked, once example.com joins
+    assert [tree.host(parent) for parent in tree._detached] == ["example.com"]
+    tree.add(DomainNode("example.com", "example.com", "subfinder"))
+    assert tree.drain()[1] == [("example.com", "b.example.com")]
+    assert tree._detached == {}
@@ -0,0 +1,45 @@
+import pytest
+from domain_node import DomainNode
+from dns_reccord_node import DNSReccordNode
+from sqlite_graph import SQLiteGraph
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+from export import export_graph  # noqa: E402
+
+
+def record(host, status):
+    return DNSReccordNode(host, status, ["192.0.2.1"], [], [], [], [], [], [], [], [], [], [], "2025-01-01")
+
+
+@pytest.fixture
+def graph(tmp_path):
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    # spread sources and statuses so later row groups bring new dictionary values
+    graph.sync_domain_nodes(DomainNode(f"h{i}.example.com", "example.com", f"source{i // 7}") for i in range(50))
+    graph.sync_dnsr_nodes(record(f"h{i}.example.com", ["NOERROR", "NXDOMAIN", "SERVFAIL"][i // 20])
+                          for i in range(50))
+    yield graph
+    graph.close()
+
+
+def read(path, fmt):
+    if fmt == "parquet":
+        return pq.read_table(path)
+    with pa.ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_several_row_groups(graph, tmp_path, fmt):
+    out = tmp_path / "export"
+    counts = export_graph(graph, str(out), fmt=fmt, row_group=8, itersize=5)
+    assert counts == {"domain": 51, "has_subdomain": 50, "dnsr": 50, "has_dnsr": 50}
+
+    domains = read(out / f"domain.{fmt}", fmt).to_pydict()
+    assert sorted(zip(domains["host"], domains["source"])) == sorted(
+        (row[0], row[1]) for row in graph.iter_domain_rows())
+    dnsr = read(out / f"dnsr.{fmt}", fmt).to_pydict()
+    assert sorted(zip(dnsr["host"], dnsr["status_code"])) == sorted(
+        (row[0], row[1]) for row in graph.iter_dnsr_rows())
+    assert set(dnsr["status_code"]) == {"NOERROR", "NXDOMAIN", "SERVFAIL"}
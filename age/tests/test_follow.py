@@ -0,0 +1,65 @@
+import json
+import os
+from follow import FileTail, domain_follower, follow
+from sqlite_graph import SQLiteGraph
+
+
+def append(path, text, mode="a"):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def line(host):
+    return json.dumps({"host": host, "input": "example.com", "source": "subfinder"}) + "\n"
+
+
+def test_tail_only_returns_complete_lines(tmp_path):
+    path = str(tmp_path / "scan.jsonl")
+    tail = FileTail(path)
+    assert tail.read(10) == (0, [])
+    append(path, "one\ntw")
+    assert tail.read(10) == (0, [b"one\n"])
+    assert tail.read(10) == (4, [])
+    append(path, "o\n")
+    assert tail.read(10) == (4, [b"two\n"])
+    tail.close()
+
+
+def test_tail_notices_rotation_and_truncation(tmp_path):
+    path = str(tmp_path / "scan.jsonl")
+    append(path, "first\n")
+    tail = FileTail(path)
+    tail.read(10)
+    append(path, "two\n", mode="w")
+    assert tail.replaced()
+    tail.restart()
+    assert tail.read(10) == (0, [b"two\n"])
+    os.rename(path, path + ".1")
+    assert not tail.replaced()
+    append(path + ".1", "late\n")
+    append(path, "new\n")
+    assert tail.read(10) == (4, [b"late\n"])
+    assert tail.replaced()
+    tail.close()
+
+
+def test_follow_flushes_micro_batches_and_resumes(tmp_path):
+    path = str(tmp_path / "dns.out.jsonl")
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    append(path, "".join(line(f"h{i}.example.com") for i in range(5)) + "not json\n" + line("half")[:10])
+
+    steps = iter(range(3))
+    follow([domain_follower(graph, path, batch_size=2, window=60)], poll=0, stop=lambda: next(steps, None) is None)
+    # two full batches during the run, the fifth host when following stops
+    assert sorted(graph.iter_domains_host()) == ["example.com"] + [f"h{i}.example.com" for i in range(5)]
+    checkpoint = graph.load_checkpoint("domains")
+    assert (checkpoint.records, checkpoint.malformed) == (5, 1)
+
+    # the writer finishes the torn line after the restart
+    append(path, line("half")[10:] + line("h9.example.com"))
+    resumed = domain_follower(graph, path, resume=True, batch_size=100, window=0)
+    assert resumed.tail.offset == checkpoint.offset
+    resumed.step()
+    assert {"half", "h9.example.com"} <= set(graph.iter_domains_host())
+    resumed.tail.close()
+    graph.close()
@@ -0,0 +1,103 @@
+import random
+from infra_index import InfraIndex, infra_values
+from resolver import make_record
+
+
+def components(records, kinds):
+    """Connected components by brute force: hosts joined while any two share a value."""
+    values = {}
+    for record in records:
+        values.setdefault(record.host, set()).update(infra_values(record, kinds))
+    groups = [({host}, found) for host, found in values.items()]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(groups)):
+            for j in range(i + 1, len(groups)):
+                if groups[i][1] & groups[j][1]:
+                    groups[i] = (groups[i][0] | groups[j][0], groups[i][1] | groups[j][1])
+                    del groups[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(sorted(hosts) for hosts, _ in groups)
+
+
+def random_records(rng, count):
+    records = []
+    for i in range(count):
+        records.append(make_record(
+            f"h{rng.randrange(count)}.example.com", "NOERROR",
+            a=[f"10.0.0.{rng.randrange(count * 2)}" for _ in range(rng.randrange(2))],
+            aaaa=[f"2001:db8::{rng.randrange(count * 4):x}" for _ in range(rng.randrange(2))],
+            cname=[f"Edge{rng.randrange(count * 4)}.cdn.net." for _ in range(rng.randrange(2))],
+            ns=[f"ns{rng.randrange(count * 4)}.dns.net" for _ in range(rng.randrange(2))],
+        ))
+    return records
+
+
+def test_clusters_match_connected_components():
+    rng = random.Random(5)
+    for _ in range(20):
+        records = random_records(rng, 40)
+        for kinds in (("ip", "cname", "ns", "soa"), ("ip",), ("cname", "ns")):
+            index = InfraIndex(kinds).add_records(records)
+            expected = components(records, kinds)
+            assert sorted(sorted(members) for members in index.clusters(min_size=1)) == expected
+            for members in expected:
+                for host in members:
+                    assert sorted(index.cluster_of(host)) == members
+                    assert index.cluster_of(host)[0] == host
+                    assert index.cluster_size(host) == len(members)
+
+
+def test_incremental_adds_match_a_rebuild():
+    rng = random.Random(9)
+    records = random_records(rng, 60)
+    index = InfraIndex()
+    for count, record in enumerate(records, 1):
+        index.add(record)
+        if count % 15 == 0:
+            rebuilt = InfraIndex().add_records(records[:count])
+            assert sorted(sorted(m) for m in index.clusters(1)) == sorted(sorted(m) for m in rebuilt.clusters(1))
+    sizes = [len(members) for members in index.clusters()]
+    assert sizes == sorted(sizes, reverse=True) and all(size >= 2 for size in sizes)
+
+
+def test_readding_a_record_is_idempotent():
+    record = make_record("a.example.com", "NOERROR", a=["10.0.0.1"], ns=["ns1.dns.net"])
+    index = InfraIndex()
+    index.add(record)
+    index.add(record)
+    index.add(make_record("b.example.com", "NOERROR", a=["10.0.0.1"]))
+    assert index.hosts_by("ip", "10.0.0.1") == ["a.example.com", "b.example.com"]
+    assert index.hosts_by("ns", "ns1.dns.net") == ["a.example.com"]
+    assert index.cluster_size("a.example.com") == 2
+    assert len(index) == 2
+
+
+def test_names_are_normalized():
+    index = InfraIndex()
+    index.add(make_record("a.example.com", "NOERROR", cname=["Edge.CDN.net."]))
+    index.add(make_record("b.example.com", "NOERROR", cname=["edge.cdn.net"]))
+    assert index.hosts_by("cname", "EDGE.cdn.NET.") == ["a.example.com", "b.example.com"]
+    assert index.infrastructure("a.example.com") == [("cname", "edge.cdn.net")]
+    assert index.hosts_by("cname", "other.net") == []
+    assert index.cluster_of("unknown.example.com") == [] and "unknown.example.com" not in index
+
+
+def test_soa_is_keyed_by_zone_and_serial():
+    def soa_record(host, name, serial):
+        record = make_record(host, "NOERROR")
+        record.soa = ({"name": name, "serial": serial},)
+        return record
+
+    index = InfraIndex(("soa",)).add_records([
+        soa_record("a.example.com", "Example.com.", 7),
+        soa_record("b.example.com", "example.com", 7),
+        soa_record("c.example.com", "example.com", 8),
+    ])
+    assert index.hosts_by("soa", "example.com 7") == ["a.example.com", "b.example.com"]
+    assert index.cluster_size("a.example.com") == 2
+    assert index.cluster_of("c.example.com") == ["c.example.com"]
@@ -0,0 +1,55 @@
+import ipaddress
+import random
+import pytest
+from ip_index import IPIndex, IPIndexBuilder
+
+
+@pytest.fixture
+def pairs():
+    rng = random.Random(3)
+    pairs = [(f"h{i}.example.com", str(ipaddress.IPv4Address(rng.getrandbits(32)))) for i in range(2000)]
+    pairs += [(f"v6-{i}.example.com", str(ipaddress.IPv6Address((0x20010db8 << 96) | rng.getrandbits(40))))
+              for i in range(500)]
+    # shared addresses and a host with several
+    pairs += [("cdn-a.example.com", "192.0.2.1"), ("cdn-b.example.com", "192.0.2.1"),
+              ("cdn-a.example.com", "2001:db8::1"), ("low.example.com", "::1")]
+    return pairs
+
+
+def build(pairs):
+    builder = IPIndexBuilder()
+    for host, address in pairs:
+        builder.add(host, [address, "not an address"])
+    return builder
+
+
+def brute_force(pairs, network):
+    network = ipaddress.ip_network(network)
+    return {host for host, address in pairs
+            if ipaddress.ip_address(address).version == network.version and ipaddress.ip_address(address) in network}
+
+
+@pytest.mark.parametrize("network", ["0.0.0.0/0", "23.0.0.0/8", "192.0.2.0/24", "192.0.2.1/32", "10.1.0.0/16",
+                                     "2001:db8::/32", "2001:db8::/120", "::/64"])
+def test_prefix_matches_a_scan(pairs, network):
+    assert build(pairs).build().prefix(network) == brute_force(pairs, network)
+
+
+def test_exact_and_batched_lookups(pairs, tmp_path):
+    path = str(tmp_path / "ip.index")
+    build(pairs).save(path)
+    with IPIndex.open(path) as index:
+        assert index.hosts("192.0.2.1") == ["cdn-a.example.com", "cdn-b.example.com"]
+        assert index.hosts("::1") == ["low.example.com"]
+        assert index.hosts("198.51.100.7") == []
+        queries = [address for _, address in pairs[::7]] + ["198.51.100.7", "bogus"]
+        found = index.lookup_many(queries)
+        assert set(found) == {address for _, address in pairs[::7]}
+        assert all(found[address] == index.hosts(address) for address in found)
+
+
+def test_range_and_mixed_families(pairs):
+    index = build(pairs).build()
+    assert index.range("192.0.2.0", "192.0.2.255") == {"cdn-a.example.com", "cdn-b.example.com"}
+    with pytest.raises(ValueError):
+        index.range("192.0.2.0", "2001:db8::1")
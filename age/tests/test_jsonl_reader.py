@@ -0,0 +1,55 @@
+import json
+import pytest
+from dns_utils import parse_dns_line
+from jsonl_reader import chunk_ranges, iter_records
+
+
+@pytest.fixture
+def scan(tmp_path):
+    path = tmp_path / "dns.out.jsonl"
+    lines = []
+    for i in range(200):
+        if i % 17 == 0:
+            lines.append("{not json")
+        elif i % 23 == 0:
+            lines.append(json.dumps({"host": f"h{i}.example.com"}))  # no input
+        elif i % 29 == 0:
+            lines.append("")
+        else:
+            lines.append(json.dumps({"host": f"h{i}.example.com", "input": "example.com", "source": "crtsh"}))
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 7, 64, 1000, 1 << 20])
+def test_chunks_end_on_line_boundaries(scan, chunk_bytes):
+    data = open(scan, "rb").read()
+    for start in (0, data.index(b"\n", 500) + 1):
+        ranges = chunk_ranges(scan, chunk_bytes, start)
+        assert ranges[0][0] == start and ranges[-1][1] == len(data)
+        for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+            assert end == next_start and data[end - 1:end] == b"\n"
+    assert chunk_ranges(scan, chunk_bytes, len(data)) == []
+
+
+def test_parallel_matches_serial(scan):
+    serial_stats, parallel_stats = {}, {}
+    serial = list(iter_records(scan, parse_dns_line, workers=1, stats=serial_stats))
+    parallel = list(iter_records(scan, parse_dns_line, workers=3, stats=parallel_stats, chunk_bytes=100))
+    assert parallel == serial
+    assert serial[0] == ("h1.example.com", "example.com", "crtsh")
+    malformed = sum(1 for i in range(200) if (i % 17 == 0 or i % 23 == 0))
+    # blank lines are skipped, not counted
+    blank = sum(1 for i in range(200) if i % 29 == 0 and i % 17 and i % 23)
+    assert serial_stats == parallel_stats == {"lines": 200 - blank, "malformed": malformed}
+    assert len(serial) == 200 - blank - malformed
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_start_offset_and_resume_offsets(scan, workers):
+    everything = list(iter_records(scan, parse_dns_line, workers=1, offsets=True))
+    # resuming from any stored offset yields exactly the records after it
+    for index in (0, 5, len(everything) // 2, len(everything) - 1):
+        offset = everything[index][0]
+        rest = list(iter_records(scan, parse_dns_line, workers=workers, start=offset, offsets=True, chunk_bytes=64))
+        assert rest == everything[index + 1:]
@@ -0,0 +1,71 @@
+from domain_node import DomainNode
+from domain_tree import DomainTree
+from lod import level_of_detail, load_domain_tree
+from sqlite_graph import SQLiteGraph
+
+
+def tree_of(*hosts, root="example.com"):
+    tree = DomainTree()
+    tree.add_all(DomainNode(host, root, "subfinder") for host in hosts)
+    tree.drain()
+    return tree
+
+
+def test_subtrees_below_max_depth_are_collapsed():
+    tree = tree_of("x.a.example.com", "y.x.a.example.com", "z.x.a.example.com", "b.example.com")
+    nodes, edges = level_of_detail(tree, max_depth=2)
+    assert set(nodes) == {"example.com", "a.example.com", "b.example.com", "x.a.example.com"}
+    assert nodes["x.a.example.com"] == {"is_root": False, "aggregate": True, "count": 2}
+    assert nodes["b.example.com"]["aggregate"] is False
+    assert nodes["example.com"]["is_root"] is True
+    assert sorted(edges) == [("a.example.com", "x.a.example.com"), ("example.com", "a.example.com"),
+                             ("example.com", "b.example.com")]
+
+
+def test_children_beyond_max_children_are_folded():
+    tree = tree_of("big.example.com", *(f"h{i}.big.example.com" for i in range(3)),
+                   "mid.example.com", "m.mid.example.com", "small.example.com", "tiny.example.com")
+    nodes, edges = level_of_detail(tree, max_depth=1, max_children=2)
+    # the two largest children are drawn, the other two fold into one node
+    assert {child for parent, child in edges if parent == "example.com"} == {
+        "big.example.com", "mid.example.com", "example.com +2 more"}
+    assert nodes["example.com +2 more"] == {"is_root": False, "aggregate": True, "count": 2}
+    assert nodes["big.example.com"]["count"] == 3
+
+
+def test_expand_opens_a_collapsed_subtree_and_its_path():
+    hosts = [f"h{i}.example.com" for i in range(5)] + ["c.b.a.h4.example.com", "d.b.a.h4.example.com"]
+    tree = tree_of(*hosts)
+    nodes, _ = level_of_detail(tree, max_depth=1, max_children=2)
+    assert "a.h4.example.com" not in nodes
+
+    nodes, edges = level_of_detail(tree, max_depth=1, max_children=2, expand=["a.h4.example.com"])
+    # the path is drawn even though h4 is not among the largest children
+    assert ("example.com", "h4.example.com") in edges and ("h4.example.com", "a.h4.example.com") in edges
+    assert nodes["a.h4.example.com"]["aggregate"] is False
+    assert nodes["b.a.h4.example.com"] == {"is_root": False, "aggregate": True, "count": 2}
+
+
+def test_views_follow_a_growing_tree():
+    tree = tree_of("a.example.com")
+    assert [tree.host(node) for node in tree.children(tree.node("example.com"))] == ["a.example.com"]
+    tree.add(DomainNode("b.example.com", "example.com", "subfinder"))
+    # a parent above an earlier root joins the graph without creating a node
+    tree.add(DomainNode("x.sub.example.org", "sub.example.org", "subfinder"))
+    tree.add(DomainNode("example.org", "example.org", "subfinder"))
+    assert sorted(tree.host(node) for node in tree.children(tree.node("example.com"))) == ["a.example.com", "b.example.com"]
+    assert tree.subtree_size(tree.node("example.org")) == 3
+    assert sorted(tree.host(node) for node in tree.roots()) == ["example.com", "example.org", "sub.example.org"]
+
+
+def test_loaded_tree_keeps_implicit_parents(tmp_path):
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    graph.sync_domain_nodes([DomainNode("x.a.example.com", "example.com", "subfinder"),
+                             DomainNode("example.com", "example.com", "subfinder")])
+    tree = load_domain_tree(graph)
+    nodes, _ = tree.drain()
+    assert nodes == []
+    assert tree.sources("x.a.example.com") == {"subfinder"}
+    assert tree.sources("a.example.com") == set() and "a.example.com" in tree
+    assert [tree.host(node) for node in tree.roots()] == ["example.com"]
+    graph.close()
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from ip_index import IPIndexBuilder
+
+AGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cli(*args, cwd=AGE_DIR):
+    pytest.importorskip("rich")
+    result = subprocess.run([sys.executable, os.path.join(AGE_DIR, "main.py"), *args],
+                            cwd=cwd, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.splitlines()
+
+
+def test_positional_args_skip_flag_values():
+    pytest.importorskip("rich")
+    from main import positional_args
+    argv = ["--stats", "/tmp/st.json", "10.0.0.0/8", "--index", "ip.idx", "--max", "5", "--verbose",
+            "::1", "--backend", "sqlite", "--stats"]
+    assert positional_args(argv) == ["10.0.0.0/8", "::1"]
+    assert positional_args(["--stats", "--verbose", "example.com"]) == ["example.com"]
+    assert positional_args([]) == []
+
+
+def test_ip_hosts_with_stats(tmp_path):
+    index = str(tmp_path / "ip.idx")
+    stats = str(tmp_path / "st.json")
+    builder = IPIndexBuilder()
+    builder.add("a.example.com", ["10.0.0.1"])
+    builder.add("b.example.com", ["192.168.0.1"])
+    builder.save(index)
+
+    out = run_cli("ip-hosts", "10.0.0.0/8", "--index", index, "--stats", stats)
+    assert [line for line in out if not line.startswith("[")] == ["a.example.com"]
+    with open(stats) as f:
+        json.load(f)
+
+
+def test_cluster_with_stats_lists_the_largest_clusters(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "run").mkdir()
+    records = [
+        {"host": "a.example.com", "status_code": "NOERROR", "a": ["10.0.0.1"]},
+        {"host": "b.example.com", "status_code": "NOERROR", "a": ["10.0.0.1"]},
+        {"host": "c.example.com", "status_code": "NOERROR", "a": ["10.0.0.2"]},
+    ]
+    with open(tmp_path / "data" / "dnsr.out.jsonl", "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    stats = str(tmp_path / "st.json")
+
+    out = run_cli("cluster", "--stats", stats, cwd=tmp_path / "run")
+    assert [line for line in out if line.startswith("[+]")] in (["[+] 2 hosts: a.example.com, b.example.com"],
+                                                              ["[+] 2 hosts: b.example.com, a.example.com"])
+    assert not any("shares" in line for line in out)
+
+    out = run_cli("cluster", "--stats", stats, "--kinds", "ip", "c.example.com", cwd=tmp_path / "run")
+    assert out[1:3] == ["[i] c.example.com shares 1 infrastructure values", "c.example.com"]
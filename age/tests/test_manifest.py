@@ -0,0 +1,62 @@
+import json
+from domain_node import DomainNode
+from manifest import diff_domains
+from sqlite_graph import SQLiteGraph
+
+
+def scan(*pairs):
+    return [DomainNode(host, "example.com", source) for host, source in pairs]
+
+
+def history(graph):
+    rows = graph.conn.execute("SELECT host, first_seen, last_changed, sources, removed_at FROM domain "
+                              "WHERE host != 'example.com'")
+    return {host: (first, changed, json.loads(sources) if sources else None, removed)
+            for host, first, changed, sources, removed in rows}
+
+
+def update(graph, domains, seen_at):
+    delta = diff_domains(graph.load_fingerprints(), domains)
+    graph.apply_domain_delta(delta, seen_at=seen_at, batch_size=2)
+    return delta
+
+
+def test_delta_only_lists_what_changed(tmp_path):
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    first = update(graph, scan(("a.example.com", "crtsh"), ("b.example.com", "crtsh"), ("c.example.com", "crtsh")), 1)
+    assert [d.host for d in first.added] == ["a.example.com", "b.example.com", "c.example.com"]
+
+    second = update(graph, scan(("a.example.com", "crtsh"), ("b.example.com", "crtsh"),
+                                ("b.example.com", "subfinder"), ("d.example.com", "crtsh")), 2)
+    assert [d.host for d in second.added] == ["d.example.com"]
+    assert [d.host for d in second.changed] == ["b.example.com"]
+    assert second.unchanged == ["a.example.com"]
+    assert second.removed == ["c.example.com"]
+    # unchanged hosts carry nothing to write
+    assert set(second.sources) == {"b.example.com", "d.example.com"}
+    assert history(graph) == {
+        "a.example.com": (1, 1, ["crtsh"], None),
+        "b.example.com": (1, 2, ["crtsh", "subfinder"], None),
+        "c.example.com": (1, 1, ["crtsh"], 2),
+        "d.example.com": (2, 2, ["crtsh"], None),
+    }
+
+    third = update(graph, scan(("c.example.com", "crtsh")), 3)
+    assert [d.host for d in third.added] == ["c.example.com"]
+    assert sorted(third.removed) == ["a.example.com", "b.example.com", "d.example.com"]
+    assert history(graph)["c.example.com"] == (1, 3, ["crtsh"], None)
+    graph.close()
+
+
+def test_reset_graph_is_not_diffed_against_old_fingerprints(tmp_path):
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    domains = scan(("a.example.com", "crtsh"), ("b.example.com", "crtsh"))
+    update(graph, domains, 1)
+    assert set(graph.load_fingerprints()) == {"a.example.com", "b.example.com"}
+
+    graph.reset()
+    assert graph.load_fingerprints() == {}
+    delta = update(graph, domains, 2)
+    assert len(delta.added) == 2
+    assert sorted(graph.iter_domains_host()) == ["a.example.com", "b.example.com", "example.com"]
+    graph.close()
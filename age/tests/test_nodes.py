@@ -0,0 +1,47 @@
+import json
+import pytest
+from dns_reccord_node import DNSReccordNode, EMPTY
+from dns_utils import parse_dns_line, parse_dnsr_line
+from domain_node import DomainNode
+
+
+def fields(node):
+    return {name: getattr(node, name) for name in type(node).__slots__}
+
+
+@pytest.mark.parametrize("data", [
+    {"host": "a.example.com", "status_code": "NOERROR", "a": ["10.0.0.1"], "aaaa": ["2001:db8::1"],
+     "cname": ["cdn.example.net"], "ns": ["ns1.example.com"], "mx": ["mx.example.com"], "txt": ["v=spf1 -all"],
+     "soa": [{"name": "example.com", "serial": 7}], "timestamp": "2025-01-01T00:00:00Z"},
+    {"host": "a.example.com", "status_code": "NXDOMAIN", "timestamp": "2025-01-01T00:00:00Z"},
+    {"host": "a.example.com", "status_code": None, "a": None, "cname": [], "soa": None, "timestamp": None},
+    {"host": "a.example.com"},
+])
+def test_dnsr_bytes_path_matches_parsed_records(data):
+    line = json.dumps(data).encode()
+    fast = DNSReccordNode.from_json_bytes(line)
+    assert fields(fast) == fields(DNSReccordNode(*parse_dnsr_line(line)))
+    assert fields(fast) == fields(DNSReccordNode(*parse_dnsr_line(line.decode())))
+    if not data.get("a"):
+        # missing and null record sets share the one empty tuple
+        assert fast.a is EMPTY
+
+
+@pytest.mark.parametrize("data", [
+    {"host": "a.example.com", "input": "example.com", "source": "crtsh"},
+    {"host": "a.example.com", "input": "example.com", "source": "crtsh", "extra": None},
+])
+def test_domain_bytes_path_matches_parsed_records(data):
+    line = json.dumps(data).encode()
+    assert fields(DomainNode.from_json_bytes(line)) == fields(DomainNode(*parse_dns_line(line)))
+
+
+@pytest.mark.parametrize("cls, line", [
+    (DomainNode, b'{"host": "a.example.com", "source": "crtsh"}'),
+    (DomainNode, b'{"host": "a.example.com", "input": null, "source": "crtsh"}'),
+    (DNSReccordNode, b'{"status_code": "NOERROR"}'),
+    (DNSReccordNode, b'{"host": "a.example.com"'),
+])
+def test_bytes_path_rejects_what_the_reader_counts_as_malformed(cls, line):
+    with pytest.raises((ValueError, KeyError, TypeError)):
+        cls.from_json_bytes(line)
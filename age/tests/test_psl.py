@@ -0,0 +1,25 @@
+import itertools
+import pytest
+from psl import parent_chain, parent_chains, registrable_domain
+
+# private suffixes (s3.amazonaws.com, github.io), wildcards (*.ck, *.compute.amazonaws.com) and an exception (!www.ck)
+HOSTS = ["amazonaws.com", "s3.amazonaws.com", "x.s3.amazonaws.com", "y.x.s3.amazonaws.com",
+         "github.io", "foo.github.io", "z.foo.github.io",
+         "b.compute.amazonaws.com", "a.b.compute.amazonaws.com", "q.a.b.compute.amazonaws.com",
+         "b.ck", "a.b.ck", "www.ck", "a.www.ck", "example.co.uk", "a.b.example.co.uk", "com", "x.com"]
+
+
+def test_private_suffix_chains():
+    assert parent_chain("s3.amazonaws.com") == ()
+    assert parent_chain("x.s3.amazonaws.com") == ("x.s3.amazonaws.com",)
+    assert registrable_domain("z.foo.github.io") == "foo.github.io"
+
+
+@pytest.mark.parametrize("hosts", [HOSTS, HOSTS[::-1], sorted(HOSTS, key=len)])
+def test_parent_chains_match_parent_chain(hosts):
+    assert parent_chains(hosts) == [parent_chain(host) for host in hosts]
+
+
+def test_parent_chains_match_parent_chain_in_every_order_of_one_zone():
+    for hosts in itertools.permutations(["amazonaws.com", "s3.amazonaws.com", "x.s3.amazonaws.com"]):
+        assert parent_chains(hosts) == [parent_chain(host) for host in hosts]
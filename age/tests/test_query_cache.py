@@ -0,0 +1,69 @@
+from query_cache import QueryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_results_are_copies():
+    cache = QueryCache()
+    first = cache.get_or_compute("hosts", ["Domain"], lambda: ["a.example.com"])
+    first.append("mutated")
+    second = cache.get_or_compute("hosts", ["Domain"], lambda: ["recomputed"])
+    assert second == ["a.example.com"]
+    second.clear()
+    assert cache.get_or_compute("hosts", ["Domain"], list) == ["a.example.com"]
+
+
+def test_invalidate_only_drops_reads_of_written_labels():
+    cache = QueryCache()
+    cache.get_or_compute("domains", ["Domain"], lambda: 1)
+    cache.get_or_compute("records", ["DNSReccord"], lambda: 2)
+    cache.invalidate("Domain")
+    assert cache.get_or_compute("domains", ["Domain"], lambda: 3) == 3
+    assert cache.get_or_compute("records", ["DNSReccord"], lambda: 4) == 2
+
+
+def test_read_racing_a_write_is_not_cached():
+    cache = QueryCache()
+
+    def read_during_write():
+        # the write commits and invalidates while this read is still running
+        cache.invalidate("Domain")
+        return "pre-commit rows"
+
+    assert cache.get_or_compute("domains", ["Domain"], read_during_write) == "pre-commit rows"
+    assert cache.get_or_compute("domains", ["Domain"], lambda: "committed rows") == "committed rows"
+
+
+def test_entries_expire():
+    clock = Clock()
+    cache = QueryCache(ttl=10, clock=clock)
+    cache.get_or_compute("domains", ["Domain"], lambda: 1)
+    clock.now = 11
+    assert cache.get_or_compute("domains", ["Domain"], lambda: 2) == 2
+    assert cache.info()["expired"] == 1
+
+
+def test_cache_is_bounded_by_rows():
+    cache = QueryCache(max_rows=10)
+    cache.get_or_compute("a", ["Domain"], lambda: list(range(4)))
+    cache.get_or_compute("b", ["Domain"], lambda: list(range(4)))
+    cache.get_or_compute("count", ["Domain"], lambda: 7)
+    assert cache.info()["rows"] == 9
+    # touching "a" makes "b" the least recently used
+    cache.get_or_compute("a", ["Domain"], list)
+    cache.get_or_compute("c", ["Domain"], lambda: list(range(3)))
+    assert cache.info()["rows"] == 8 and cache.info()["evictions"] == 1
+    assert cache.get_or_compute("b", ["Domain"], lambda: "recomputed") == "recomputed"
+
+    # a result larger than the whole cache is returned but never kept
+    assert len(cache.get_or_compute("huge", ["Domain"], lambda: list(range(11)))) == 11
+    assert cache.get_or_compute("huge", ["Domain"], lambda: "recomputed") == "recomputed"
+    cache.invalidate("Domain")
+    cache.get_or_compute("a", ["Domain"], lambda: [1])
+    assert cache.info()["rows"] <= 10
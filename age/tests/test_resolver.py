@@ -0,0 +1,37 @@
+import asyncio
+from resolver import resolve_into_graph, make_record
+
+
+async def stub_resolver(host):
+    if any(not label or len(label) > 63 for label in host.split(".")):
+        # what getaddrinfo raises for a name that cannot be IDNA encoded
+        raise UnicodeError("label empty or too long")
+    if host == "slow.example.com":
+        await asyncio.sleep(1)
+    return make_record(host, "NOERROR", a=["192.0.2.1"])
+
+
+def test_failed_lookups_are_recorded_and_the_run_continues():
+    hosts = ["a.example.com", ".example.com", "x" * 64 + ".example.com", "slow.example.com", "b.example.com"]
+    written = []
+    stats = asyncio.run(resolve_into_graph(hosts, written.extend, resolver=stub_resolver, concurrency=2,
+                                           timeout=0.05, batch_size=2))
+    statuses = {record.host: record.status_code for record in written}
+    assert len(written) == stats["written"] == len(hosts)
+    assert statuses[".example.com"] == statuses["x" * 64 + ".example.com"] == "ERROR"
+    assert statuses["slow.example.com"] == "TIMEOUT"
+    assert statuses["b.example.com"] == "NOERROR"
+    assert stats["ERROR"] == 2 and stats["TIMEOUT"] == 1
+
+
+def test_default_resolver_gets_the_lookup_timeout(monkeypatch):
+    import resolver
+    timeouts = []
+
+    def fake_default_resolver(timeout=resolver.DEFAULT_TIMEOUT):
+        timeouts.append(timeout)
+        return stub_resolver
+
+    monkeypatch.setattr(resolver, "default_resolver", fake_default_resolver)
+    asyncio.run(resolve_into_graph(["a.example.com"], [].extend, timeout=0.5))
+    assert timeouts == [0.5]
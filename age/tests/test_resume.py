@@ -0,0 +1,61 @@
+import json
+import random
+import pytest
+from checkpoint import open_checkpoint
+from dns_utils import eat_dns_file
+from sqlite_graph import SQLiteGraph
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(records, count):
+    for i, record in enumerate(records):
+        if i == count:
+            raise Interrupted()
+        yield record
+
+
+def write_scan(path, seed):
+    """Subfinder style lines where hosts, their parents and overlapping inputs come in random order."""
+    rng = random.Random(seed)
+    labels = ["a", "b", "c", "www", "api"]
+    lines = []
+    for _ in range(400):
+        base = rng.choice(["example.com", "example.org"])
+        host = ".".join(rng.choice(labels) for _ in range(rng.randint(0, 3))) + "." + base
+        host = host.lstrip(".")
+        _input = rng.choice([base, host]) if rng.random() < 0.1 else base
+        lines.append(json.dumps({"host": host, "input": _input, "source": rng.choice(["crtsh", "subfinder"])}))
+    path.write_text("\n".join(lines) + "\n")
+
+
+def snapshot(graph):
+    hosts = sorted(graph.iter_domains_host())
+    return (sorted(graph.iter_domain_rows()), sorted(graph.iter_subdomain_edges()),
+            [graph.subtree_stats(host) for host in hosts], sorted(graph.iter_descendants("example.com")))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("stop", [1, 37, 250])
+def test_interrupted_then_resumed_ingest_matches_a_clean_one(tmp_path, seed, stop):
+    scan = tmp_path / "dns.out.jsonl"
+    write_scan(scan, seed)
+
+    clean = SQLiteGraph(str(tmp_path / "clean.db"))
+    clean.sync_domain_nodes(eat_dns_file(str(scan)), batch_size=16)
+
+    resumed = SQLiteGraph(str(tmp_path / "resumed.db"))
+    checkpoint = open_checkpoint(resumed, "domains", str(scan))
+    with pytest.raises(Interrupted):
+        resumed.sync_domain_nodes(interrupt_after(eat_dns_file(str(scan), checkpoint=checkpoint), stop),
+                                  batch_size=16, checkpoint=checkpoint)
+    checkpoint = open_checkpoint(resumed, "domains", str(scan), resume=True)
+    assert checkpoint.records <= stop
+    resumed.sync_domain_nodes(eat_dns_file(str(scan), checkpoint=checkpoint), batch_size=16, checkpoint=checkpoint)
+
+    assert snapshot(resumed) == snapshot(clean)
+    assert resumed.load_checkpoint("domains").offset == scan.stat().st_size
+    clean.close()
+    resumed.close()
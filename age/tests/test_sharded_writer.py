@@ -0,0 +1,47 @@
+import threading
+from types import SimpleNamespace
+from domain_node import DomainNode
+from sharded_writer import sync_domain_nodes_sharded, shard_of
+from sqlite_graph import SQLiteGraph
+from psl import registrable_domain
+
+
+def domains(n):
+    return (DomainNode(f"h{i}.example{i % 7}.com", f"example{i % 7}.com", "subfinder") for i in range(n))
+
+
+def test_failing_store_reaches_the_producer():
+    def open_store():
+        raise RuntimeError("no connection")
+
+    errors = []
+
+    def produce():
+        try:
+            sync_domain_nodes_sharded(SimpleNamespace(size=2), domains(500), batch_size=4, open_store=open_store)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "producer blocked on a dead shard"
+    assert [str(e) for e in errors] == ["no connection"]
+
+
+def test_shards_write_everything(tmp_path):
+    stores = []
+
+    def open_store():
+        store = SQLiteGraph(str(tmp_path / f"shard{len(stores)}.db"))
+        stores.append(store)
+        return store
+
+    nodes, edges = sync_domain_nodes_sharded(SimpleNamespace(size=3), domains(100), batch_size=8,
+                                             open_store=open_store)
+    assert nodes == 107 and edges == 100
+
+
+def test_overlapping_inputs_share_a_shard():
+    key = registrable_domain("b.example.com")
+    assert shard_of(key, 8) == shard_of(registrable_domain("example.com"), 8)
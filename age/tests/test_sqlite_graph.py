@@ -0,0 +1,29 @@
+from domain_node import DomainNode
+from sqlite_graph import SQLiteGraph
+
+
+def domain_rows(graph):
+    return {row[0]: row[1:] for row in graph.iter_domain_rows()}
+
+
+def test_implicit_rows_never_downgrade_explicit_nodes(tmp_path):
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    graph.sync_domain_nodes([DomainNode("b.example.com", "example.com", "crtsh")])
+    before = domain_rows(graph)
+    # a fresh tree re-emits b.example.com as an implicit parent row
+    graph.sync_domain_nodes([DomainNode("a.b.example.com", "example.com", "subfinder")])
+    after = domain_rows(graph)
+    assert after["b.example.com"] == before["b.example.com"]
+    assert after["b.example.com"][0] == "crtsh"
+    assert not after["b.example.com"][2]
+    graph.close()
+
+
+def test_explicit_rows_upgrade_implicit_nodes(tmp_path):
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    graph.sync_domain_nodes([DomainNode("a.b.example.com", "example.com", "subfinder")])
+    assert domain_rows(graph)["b.example.com"][2]
+    graph.sync_domain_nodes([DomainNode("b.example.com", "example.com", "crtsh")])
+    source, _input, is_implicit, is_root = domain_rows(graph)["b.example.com"]
+    assert (source, is_implicit) == ("crtsh", 0)
+    graph.close()
@@ -0,0 +1,100 @@
+import random
+from dns_reccord_node import DNSReccordNode
+from domain_node import DomainNode
+from graph_store import reverse_host, rollup, split_shared, subtree_range
+from sqlite_graph import SQLiteGraph
+
+
+def record(host, status):
+    return DNSReccordNode(host, status, [], [], [], [], [], [], [], [], [], [], [], "2025-01-01")
+
+
+def test_reverse_host_and_range():
+    assert reverse_host("a.b.example.com") == "com.example.b.a"
+    low, high = subtree_range("example.com")
+    assert low < "com.example.a" < "com.example.zzz.a" < high
+    assert not low < "com.examples" < high
+
+
+def test_rollup_counts_into_every_proper_ancestor():
+    deltas = rollup([("com.example.a.x", "descendants", 1), ("com.example.b", "resolved", 1),
+                     ("com.example.a", "descendants", 1), ("com.example.b", "resolved", -1)])
+    assert deltas == [("com", 2, 0, 0), ("com.example", 2, 0, 0), ("com.example.a", 1, 0, 0)]
+
+
+def expected_stats(graph, host, statuses):
+    below = [other for other in graph.iter_domains_host() if other.endswith("." + host)]
+    return {"descendants": len(below),
+            "resolved": sum(statuses.get(other) == "NOERROR" for other in below),
+            "no_return": sum(statuses.get(other) == "NO_RETURN" for other in below)}
+
+
+def test_subtree_stats_match_a_recount(tmp_path):
+    rng = random.Random(7)
+    graph = SQLiteGraph(str(tmp_path / "graph.db"))
+    hosts = {".".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) + ".example.com" for _ in range(200)}
+    graph.sync_domain_nodes((DomainNode(host, "example.com", "subfinder") for host in sorted(hosts)), batch_size=16)
+
+    statuses = {}
+    for _ in range(3):
+        # statuses change between runs, the counters must move with them
+        batch = {host: rng.choice(["NOERROR", "NXDOMAIN", "SERVFAIL"]) for host in rng.sample(sorted(hosts), len(hosts) // 3)}
+        graph.sync_dnsr_nodes((record(host, status) for host, status in batch.items()), batch_size=16)
+        statuses.update(batch)
+    untried = sorted(hosts - set(statuses))
+    assert graph.mark_untried_as_no_return(untried) == len(untried)
+    statuses.update(dict.fromkeys(untried, "NO_RETURN"))
+
+    for host in sorted(graph.iter_domains_host()):
+        assert graph.subtree_stats(host) == expected_stats(graph, host, statuses), host
+    assert sorted(graph.iter_descendants("a.example.com")) == sorted(
+        host for host in graph.iter_domains_host() if host.endswith(".a.example.com"))
+    graph.close()
+
+
+def test_split_shared_separates_the_rows_above_a_registrable_domain():
+    deltas = rollup([("com.example.a.x", "descendants", 1), ("uk.co.example.b", "resolved", 1)])
+    local, shared = split_shared(deltas)
+    assert [row[0] for row in local] == ["com.example.a"]
+    assert [row[0] for row in shared] == ["com", "com.example", "uk", "uk.co", "uk.co.example"]
+    assert sorted(local + shared) == deltas
+
+
+class InterleavedConnection:
+    """Runs `after_commit` after every transaction, like a writer getting in between two chunks."""
+    def __init__(self, conn, after_commit):
+        self.conn = conn
+        self.after_commit = after_commit
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        result = self.conn.__exit__(*exc)
+        self.after_commit()
+        return result
+
+
+def test_chunked_dnsr_delete_keeps_counters_of_surviving_records(tmp_path):
+    path = str(tmp_path / "graph.db")
+    graph = SQLiteGraph(path)
+    hosts = [f"{name}.{parent}.example.com" for parent in "ab" for name in "cdefg"]
+    graph.sync_domain_nodes(DomainNode(host, "example.com", "subfinder") for host in hosts)
+    graph.sync_dnsr_nodes(record(host, "NOERROR") for host in hosts)
+
+    writer = SQLiteGraph(path)
+    survivors = iter(hosts[::3])
+    graph.conn = InterleavedConnection(graph.conn, lambda: writer.sync_dnsr_nodes(
+        [record(host, "NO_RETURN") for host in [next(survivors, None)] if host]))
+    assert graph.delete_all_dnsr_nodes(chunk_size=4) >= len(hosts)
+    graph.conn = graph.conn.conn
+
+    statuses = {host: status for host, status, _ in graph.iter_dnsr_nodes_with_status_code()}
+    assert statuses and set(statuses.values()) == {"NO_RETURN"}
+    for host in graph.iter_domains_host():
+        assert graph.subtree_stats(host) == expected_stats(graph, host, statuses), host
+    writer.close()
+    graph.close()
@@ -2,7 +2,8 @@ import networkx as nx
 from pyvis.network import Network
 from IPython.display import HTML, display
 from datetime import datetime
-from rich.pretty import pprint
+from domain_tree import DomainTree
+from lod import level_of_detail, load_domain_tree, LOD_MAX_DEPTH, LOD_MAX_CHILDREN
 
 
 def _create_domain_graph(graph_data):
@@ -95,3 +96,23 @@ def visualize_domain_and_dnsr_graph(domain_graph_data, dnsr_graph_data):
     display(HTML(filename))
     return filename
 
+
+def visualize_level_of_detail(tree: DomainTree, roots=None, max_depth=LOD_MAX_DEPTH,
+                              max_children=LOD_MAX_CHILDREN, expand=()):
+    """Render `level_of_detail` straight into pyvis, without a NetworkX graph."""
+    nodes, edges = level_of_detail(tree, roots, max_depth, max_children, expand)
+    net = Network(notebook=True, height='700px', width='100%', directed=True, cdn_resources='remote')
+    for node_id, attrs in nodes.items():
+        if attrs["aggregate"]:
+            net.add_node(node_id, label=f"{node_id}\n({attrs['count']} hosts)", color='#AAAAAA',
+                         size=min(15 + attrs["count"] ** 0.5, 60), shape='box')
+        else:
+            net.add_node(node_id, label=node_id, color='#FF0000' if attrs["is_root"] else '#0000FF',
+                         size=30 if attrs["is_root"] else 20)
+    for source, target in edges:
+        net.add_edge(source, target)
+
+    filename = f'domain_graph_lod_{datetime.now().strftime("%Y%m%d_%H%M%S")}.html'
+    net.write_html(filename)
+    display(HTML(filename))
+    return filename
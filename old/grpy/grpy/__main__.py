@@ -1,35 +1,6 @@
 import argparse
 from .db import Neo4jDB
-from .domain import DomainManager
-from .dns_record import DNSrecordManager, DNSRecord
-
-def ingest_file_dnsx(*, db: Neo4jDB, filename: str) -> None:
-    """Ingest DNS data from dnsx file"""
-    domain_mgr = DomainManager(db=db)
-    record_mgr = DNSrecordManager(db=db)
-    
-    print(f"\nIngesting data from {filename}...")
-    try:
-        with open(filename) as f:
-            for line in f:
-                parts = line.strip().split(" [")
-                if len(parts) != 3:
-                    continue
-                    
-                domain = parts[0]
-                record_type = parts[1].rstrip("]")
-                value = parts[2].rstrip("]")
-                
-                print(f"Found: {domain} {record_type} {value}")
-                
-                domain_base = domain.split(".")[-1]
-                domain_mgr.merge_link_to_top(domain_name=domain, top=domain_base)
-                
-                record = DNSRecord(name=domain, type_=record_type, values=[value])
-                record_mgr.merge_record(record=record)
-                
-    except Exception as e:
-        print(f"Error during ingestion: {e}")
+from .dnsx import ingest_file_dnsx, DEFAULT_BATCH_SIZE
 
 def clear_data(*, db: Neo4jDB):
     """Clear all data from the database"""
@@ -80,6 +51,8 @@ def setup_parser():
     ingest_parser.add_argument('file', nargs='?', default='testdata/fefe.de.dnsx', help='File to ingest')
     ingest_parser.add_argument('--format', choices=['dnsx'], default='dnsx', 
                               help='Input file format')
+    ingest_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                              help='Lines per write batch')
 
     return parser
 
@@ -98,7 +71,7 @@ def main():
     elif args.command == 'stats':
         print_stats(db=db)
     elif args.command == 'ingest':
-        ingest_file_dnsx(db=db, filename=args.file)
+        ingest_file_dnsx(db=db, filename=args.file, batch_size=args.batch_size)
     else:
         parser.print_help()
         return
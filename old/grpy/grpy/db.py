@@ -15,6 +15,14 @@ class Neo4jDB:
     def execute_many(self, *, query: str, params: Optional[Dict[str, Any]] = None) -> list:
         with self.driver.session() as session:
             return list(session.run(query=query, parameters=params or {}))
+
+    def session(self):
+        """A session to keep open across many writes, instead of one per query."""
+        return self.driver.session()
+
+    def write(self, *, session, query: str, parameters: Optional[Dict[str, Any]] = None) -> None:
+        """Run one write query in its own transaction on an existing session."""
+        session.execute_write(lambda tx: tx.run(query, parameters or {}).consume())
     
     def close(self):
         self.driver.close()
@@ -1,8 +1,11 @@
+import re
 from dataclasses import dataclass
 from typing import List
 
 DOMAIN_RECORD_TYPES = {'CNAME', 'MX', 'NS', 'SOA'}
 IP_RECORD_TYPES = {'A', 'AAAA'}
+# record types become relationship types / property names, so they are checked before use
+RECORD_TYPE = re.compile(r'^[A-Z][A-Z0-9]*$')
 
 @dataclass
 class DNSRecord:
@@ -57,4 +60,35 @@ class DNSrecordManager:
                     "type": record.type_,
                     "values": record.values
                 }
-            )
\ No newline at end of file
+            )
+
+    def merge_records(self, *, session, type_: str, rows: list) -> None:
+        """Batched writes for all records of one type.
+
+        IP and domain typed rows are {"name", "value"} pairs and become
+        `(DNSR)-[:TYPE]->(IP|Domain)` links; other types are {"name", "values"}
+        and are added to the DNSR property of that name.
+        """
+        if not RECORD_TYPE.match(type_):
+            raise ValueError(f"Invalid record type: {type_}")
+        if type_ in IP_RECORD_TYPES:
+            query = f"""
+            UNWIND $rows AS row
+            MERGE (d:DNSR {{name: row.name}})
+            MERGE (ip:IP {{address: row.value}})
+            MERGE (d)-[:{type_}]->(ip)
+            """
+        elif type_ in DOMAIN_RECORD_TYPES:
+            query = f"""
+            UNWIND $rows AS row
+            MERGE (d:DNSR {{name: row.name}})
+            MERGE (target:Domain {{name: row.value}})
+            MERGE (d)-[:{type_}]->(target)
+            """
+        else:
+            query = f"""
+            UNWIND $rows AS row
+            MERGE (d:DNSR {{name: row.name}})
+            SET d.{type_} = coalesce(d.{type_}, []) + [v IN row.values WHERE NOT v IN coalesce(d.{type_}, [])]
+            """
+        self.db.write(session=session, query=query, parameters={"rows": rows})
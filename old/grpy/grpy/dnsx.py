@@ -0,0 +1,86 @@
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set, Tuple
+
+from .db import Neo4jDB
+from .domain import DomainManager
+from .dns_record import DNSrecordManager, DOMAIN_RECORD_TYPES, IP_RECORD_TYPES
+
+DEFAULT_BATCH_SIZE = 5000
+
+# `name [TYPE] [value]`, as written by `dnsx -resp`
+DNSX_LINE = re.compile(r'^(\S+) \[([A-Z][A-Z0-9]*)\] \[(.*)\]\s*$')
+
+
+def parse_dnsx_line(line: str) -> Optional[Tuple[str, str, str]]:
+    """Split a dnsx text line into (name, type, value), None if it does not match."""
+    match = DNSX_LINE.match(line)
+    if match is None:
+        return None
+    return match.groups()
+
+
+@dataclass
+class DnsxBatch:
+    """Parsed dnsx lines grouped by what they are written as."""
+    links: Set[Tuple[str, str]] = field(default_factory=set)
+    links_by_type: Dict[str, Set[Tuple[str, str]]] = field(default_factory=dict)
+    values_by_type: Dict[str, Dict[str, list]] = field(default_factory=dict)
+    size: int = 0
+
+    def add(self, *, name: str, type_: str, value: str) -> None:
+        self.links.add((name, name.split(".")[-1]))
+        if type_ in IP_RECORD_TYPES or type_ in DOMAIN_RECORD_TYPES:
+            self.links_by_type.setdefault(type_, set()).add((name, value))
+        else:
+            values = self.values_by_type.setdefault(type_, {}).setdefault(name, [])
+            if value not in values:
+                values.append(value)
+        self.size += 1
+
+    def flush(self, *, session, domain_mgr: DomainManager, record_mgr: DNSrecordManager) -> None:
+        if self.links:
+            domain_mgr.merge_links_to_top(
+                session=session, rows=[{"domain": name, "top": top} for name, top in self.links])
+        for type_, pairs in self.links_by_type.items():
+            record_mgr.merge_records(
+                session=session, type_=type_, rows=[{"name": name, "value": value} for name, value in pairs])
+        for type_, values in self.values_by_type.items():
+            record_mgr.merge_records(
+                session=session, type_=type_, rows=[{"name": name, "values": v} for name, v in values.items()])
+
+
+def ingest_file_dnsx(*, db: Neo4jDB, filename: str, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Ingest a dnsx text file through one session, one transaction per batch and record type."""
+    domain_mgr = DomainManager(db=db)
+    record_mgr = DNSrecordManager(db=db)
+    stats = {"lines": 0, "records": 0, "skipped": 0, "batches": 0}
+
+    print(f"\nIngesting data from {filename}...")
+    start = time.perf_counter()
+    with db.session() as session, open(filename) as f:
+        batch = DnsxBatch()
+        for line in f:
+            stats["lines"] += 1
+            parsed = parse_dnsx_line(line)
+            if parsed is None:
+                stats["skipped"] += 1
+                continue
+            name, type_, value = parsed
+            batch.add(name=name, type_=type_, value=value)
+            if batch.size >= batch_size:
+                batch.flush(session=session, domain_mgr=domain_mgr, record_mgr=record_mgr)
+                stats["records"] += batch.size
+                stats["batches"] += 1
+                batch = DnsxBatch()
+        if batch.size:
+            batch.flush(session=session, domain_mgr=domain_mgr, record_mgr=record_mgr)
+            stats["records"] += batch.size
+            stats["batches"] += 1
+
+    elapsed = time.perf_counter() - start
+    rate = stats["lines"] / elapsed if elapsed > 0 else 0
+    print(f"Ingested {stats['records']} records from {stats['lines']} lines "
+          f"({stats['skipped']} skipped) in {stats['batches']} batches, {elapsed:.2f}s ({rate:.0f} lines/sec)")
+    return stats
@@ -33,6 +33,19 @@ class DomainManager:
             }
         )
 
+    def merge_links_to_top(self, *, session, rows: list) -> None:
+        """Batched `merge_link_to_top` for a list of {"domain", "top"} rows."""
+        self.db.write(
+            session=session,
+            query="""
+            UNWIND $rows AS row
+            MERGE (d:Domain {name: row.domain})
+            MERGE (t:Domain {name: row.top})
+            MERGE (d)-[:PART_OF]->(t)
+            """,
+            parameters={"rows": rows}
+        )
+
     def expand_paths(self, nodes: list) -> list:
         paths = []
         for i in range(len(nodes)):
@@ -0,0 +1,74 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("neo4j")
+
+from grpy.dnsx import DnsxBatch, ingest_file_dnsx, parse_dnsx_line
+
+
+class RecordingDB:
+    """Stands in for Neo4jDB, keeping every batched write instead of sending it."""
+
+    def __init__(self):
+        self.writes = []
+        self.sessions = 0
+
+    @contextmanager
+    def session(self):
+        self.sessions += 1
+        yield "session"
+
+    def write(self, *, session, query, parameters):
+        self.writes.append((query, parameters["rows"]))
+
+    def rows(self, marker):
+        return [row for query, rows in self.writes if marker in query for row in rows]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("a.example.com [A] [10.0.0.1]\n", ("a.example.com", "A", "10.0.0.1")),
+    ("a.example.com [AAAA] [2001:db8::1]", ("a.example.com", "AAAA", "2001:db8::1")),
+    ("www.example.com [CNAME] [cdn.example.net]  \n", ("www.example.com", "CNAME", "cdn.example.net")),
+    ("example.com [TXT] [v=spf1 include:[x] -all]", ("example.com", "TXT", "v=spf1 include:[x] -all")),
+    ("example.com [MX] []", ("example.com", "MX", "")),
+])
+def test_parse_dnsx_line(line, expected):
+    assert parse_dnsx_line(line) == expected
+
+
+@pytest.mark.parametrize("line", [
+    "", "\n", "a.example.com", "a.example.com [A]", "a.example.com [a] [10.0.0.1]",
+    "a.example.com [A] 10.0.0.1", "[A] [10.0.0.1]", "a.example.com  [A] [10.0.0.1]",
+])
+def test_parse_dnsx_line_rejects_malformed(line):
+    assert parse_dnsx_line(line) is None
+
+
+def test_batch_groups_and_merges_records():
+    batch = DnsxBatch()
+    for line in ["a.example.com [A] [10.0.0.1]", "a.example.com [A] [10.0.0.1]", "a.example.com [A] [10.0.0.2]",
+                 "a.example.com [CNAME] [b.example.net]", "a.example.com [TXT] [one]",
+                 "a.example.com [TXT] [two]", "a.example.com [TXT] [one]", "b.example.org [TXT] [x]"]:
+        name, type_, value = parse_dnsx_line(line)
+        batch.add(name=name, type_=type_, value=value)
+    assert batch.size == 8
+    assert batch.links == {("a.example.com", "com"), ("b.example.org", "org")}
+    assert batch.links_by_type == {"A": {("a.example.com", "10.0.0.1"), ("a.example.com", "10.0.0.2")},
+                                   "CNAME": {("a.example.com", "b.example.net")}}
+    # other types collect distinct values per name, in order of appearance
+    assert batch.values_by_type == {"TXT": {"a.example.com": ["one", "two"], "b.example.org": ["x"]}}
+
+
+def test_ingest_flushes_in_batches(tmp_path):
+    path = tmp_path / "dnsx.txt"
+    lines = [f"h{i}.example.com [A] [10.0.0.{i}]" for i in range(5)] + ["garbage"] + ["h0.example.com [TXT] [t]"]
+    path.write_text("\n".join(lines) + "\n")
+    db = RecordingDB()
+
+    stats = ingest_file_dnsx(db=db, filename=str(path), batch_size=2)
+    assert stats == {"lines": 7, "records": 6, "skipped": 1, "batches": 3}
+    assert db.sessions == 1
+    assert sorted(row["value"] for row in db.rows(":IP")) == [f"10.0.0.{i}" for i in range(5)]
+    assert db.rows("SET d.TXT") == [{"name": "h0.example.com", "values": ["t"]}]
+    assert {(row["domain"], row["top"]) for row in db.rows("PART_OF")} == {(f"h{i}.example.com", "com") for i in range(5)}